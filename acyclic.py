@@ -0,0 +1,261 @@
+"""Cycle detection for project graphs.
+
+`TopologicalOrder` keeps a topological order of a DAG under edge insertions
+and deletions (Pearce-Kelly): adding u -> v only searches the nodes whose
+position lies between v and u, and reorders just those. An edge that would
+close a cycle is rejected with the cycle it would create.
+
+`find_cycles` is the bulk check for whole documents (saves, imports, LLM
+output): one Tarjan pass finds every strongly connected component, and one
+cycle is reported per component.
+"""
+
+
+class CycleError(ValueError):
+    """An edge that would close a cycle; `cycle` lists the node ids, first == last."""
+
+    def __init__(self, cycle):
+        super().__init__('Edge would create a cycle: ' + ' -> '.join(map(str, cycle)))
+        self.cycle = cycle
+
+
+def _endpoints(edge):
+    return str(edge.get('from')), str(edge.get('to'))
+
+
+class TopologicalOrder:
+    """Dynamic topological order over string node ids."""
+
+    def __init__(self):
+        self.children = {}
+        self.parents = {}
+        self.position = {}
+        self._next = 0
+
+    @classmethod
+    def from_graph_data(cls, nodes, edges, order=None):
+        """Build the order for an acyclic graph given as request/project data.
+
+        `order` is a previously stored node order, used as is when it is still
+        consistent with the edges. Raises CycleError if the graph has a cycle.
+        """
+        self = cls()
+        for node in nodes:
+            self.children.setdefault(str(node['id']), set())
+            self.parents.setdefault(str(node['id']), set())
+        for edge in edges:
+            v, w = _endpoints(edge)
+            for node in (v, w):
+                self.children.setdefault(node, set())
+                self.parents.setdefault(node, set())
+            self.children[v].add(w)
+            self.parents[w].add(v)
+        if order is not None and set(order) == set(self.children):
+            self.position = {node: i for i, node in enumerate(order)}
+            if all(self.position[v] < self.position[w] for v in self.children for w in self.children[v]):
+                self._next = len(order)
+                return self
+        cycles = find_cycles(nodes, edges)
+        if cycles:
+            raise CycleError(cycles[0])
+        self.position = {node: i for i, node in enumerate(self._kahn())}
+        self._next = len(self.position)
+        return self
+
+    def _kahn(self):
+        indegree = {node: len(parents) for node, parents in self.parents.items()}
+        ready = [node for node, degree in indegree.items() if degree == 0]
+        order = []
+        while ready:
+            node = ready.pop()
+            order.append(node)
+            for child in self.children[node]:
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    ready.append(child)
+        return order
+
+    def order(self):
+        """Return the node ids in topological order."""
+        return sorted(self.position, key=self.position.get)
+
+    def add_node(self, node):
+        if node not in self.position:
+            self.children[node] = set()
+            self.parents[node] = set()
+            self.position[node] = self._next
+            self._next += 1
+
+    def remove_node(self, node):
+        for child in self.children.pop(node, ()):
+            self.parents[child].discard(node)
+        for parent in self.parents.pop(node, ()):
+            self.children[parent].discard(node)
+        self.position.pop(node, None)
+
+    def remove_edge(self, v, w):
+        self.children.get(v, set()).discard(w)
+        self.parents.get(w, set()).discard(v)
+
+    def add_edge(self, v, w):
+        """Add v -> w, or raise CycleError (leaving the order unchanged) if it closes a cycle."""
+        self.add_node(v)
+        self.add_node(w)
+        if w in self.children[v]:
+            return
+        if v == w:
+            raise CycleError([v, v])
+        lower, upper = self.position[w], self.position[v]
+        if lower < upper:
+            # Only the nodes placed between w and v can be affected
+            forward = self._search(w, self.children, lambda p: p < upper, target=v)
+            backward = self._search(v, self.parents, lambda p: p > lower)
+            self._reorder(backward, forward)
+        self.children[v].add(w)
+        self.parents[w].add(v)
+
+    def _search(self, start, neighbours, inside, target=None):
+        # Depth-first search through the nodes whose position is `inside` the
+        # affected range; reaching `target` means the new edge closes a cycle
+        via = {start: None}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for neighbour in neighbours[node]:
+                if neighbour == target:
+                    path = [node]
+                    while via[path[-1]] is not None:
+                        path.append(via[path[-1]])
+                    raise CycleError([target] + path[::-1] + [target])
+                if neighbour not in via and inside(self.position[neighbour]):
+                    via[neighbour] = node
+                    stack.append(neighbour)
+        return list(via)
+
+    def _reorder(self, backward, forward):
+        # Reuse the positions of both sets: ancestors of v first, then descendants of w
+        position = self.position
+        backward.sort(key=position.get)
+        forward.sort(key=position.get)
+        slots = sorted(position[node] for node in backward + forward)
+        for node, slot in zip(backward + forward, slots):
+            position[node] = slot
+
+    def apply_changes(self, old_content, new_content):
+        """Update the order from one version of a document to the next.
+
+        Removals go first so an edge that is replaced in the same change does
+        not count against the new one. Raises CycleError on the first added
+        edge that closes a cycle.
+        """
+        old_nodes = {str(node['id']) for node in old_content.get('nodes', [])}
+        new_nodes = {str(node['id']) for node in new_content.get('nodes', [])}
+        old_edges = {_endpoints(edge) for edge in old_content.get('edges', [])}
+        new_edges = {_endpoints(edge) for edge in new_content.get('edges', [])}
+        for v, w in old_edges - new_edges:
+            self.remove_edge(v, w)
+        for node in old_nodes - new_nodes:
+            self.remove_node(node)
+        for node in sorted(new_nodes - old_nodes):
+            self.add_node(node)
+        for v, w in sorted(new_edges - old_edges):
+            self.add_edge(v, w)
+
+    def to_dict(self):
+        return {'order': self.order()}
+
+
+def drop_cycle_edges(edges):
+    """Split `edges` into those that can be kept and those that close a cycle.
+
+    Edges are added in order and each one that would close a cycle is set
+    aside, so one pass returns an acyclic edge list and, for every dropped
+    edge, {'edge': edge, 'cycle': [...]}.
+    """
+    order = TopologicalOrder()
+    kept = []
+    dropped = []
+    for edge in edges:
+        try:
+            order.add_edge(*_endpoints(edge))
+        except CycleError as e:
+            dropped.append({'edge': edge, 'cycle': e.cycle})
+            continue
+        kept.append(edge)
+    return kept, dropped
+
+
+def find_cycles(nodes, edges):
+    """Return one cycle (list of node ids, first == last) per cyclic component.
+
+    Uses Tarjan's strongly connected components, so the whole graph is
+    checked in O(V+E) and every independent cycle shows up in the report.
+    """
+    children = {str(node['id']): [] for node in nodes}
+    for edge in edges:
+        v, w = _endpoints(edge)
+        children.setdefault(v, []).append(w)
+        children.setdefault(w, [])
+    index = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+    for root in children:
+        if root in index:
+            continue
+        work = [(root, iter(children[root]))]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, neighbours = work[-1]
+            advanced = False
+            for neighbour in neighbours:
+                if neighbour not in index:
+                    index[neighbour] = low[neighbour] = counter
+                    counter += 1
+                    stack.append(neighbour)
+                    on_stack.add(neighbour)
+                    work.append((neighbour, iter(children[neighbour])))
+                    advanced = True
+                    break
+                if neighbour in on_stack:
+                    low[node] = min(low[node], index[neighbour])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                component = set()
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.add(member)
+                    if member == node:
+                        break
+                if len(component) > 1 or node in children[node]:
+                    components.append(component)
+    return [_cycle_in(children, component) for component in components]
+
+
+def _cycle_in(children, component):
+    # Shortest cycle through the component's first node, by breadth-first search
+    start = min(component)
+    via = {start: None}
+    queue = [start]
+    for node in queue:
+        for child in children[node]:
+            if child == start:
+                path = [node]
+                while via[path[-1]] is not None:
+                    path.append(via[path[-1]])
+                return path[::-1] + [start]
+            if child in component and child not in via:
+                via[child] = node
+                queue.append(child)
+    return [start, start]
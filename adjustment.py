@@ -0,0 +1,413 @@
+"""Reachability-based d-separation and adjustment set criteria.
+
+Validity checks run in O(V+E): instead of enumerating the paths between
+cause and outcome, we walk the graph once ("Bayes-ball") and collect every
+node that is reachable from the cause along an active trail. Minimal
+adjustment sets are enumerated as vertex separators with polynomial delay.
+
+The public functions take and return the original string node ids; the
+traversals themselves run on the integer nodes of a `graph.Graph`.
+"""
+import collections
+import heapq
+import itertools
+import logging
+import time
+
+from metrics import AUGMENTING_PATHS, SEPARATORS_CHECKED, SETS_FOUND, TRAIL_STEPS, VALIDITY_CHECKS
+
+NO_CUT = (-1, -1)
+ALL_CHILDREN = -1
+
+
+class DeadlineExceeded(Exception):
+    """Raised inside the enumeration once its `deadline` has passed."""
+
+
+def _check_deadline(deadline):
+    if deadline is not None and time.monotonic() >= deadline:
+        raise DeadlineExceeded()
+
+
+def _cut_view(graph, cut):
+    """Return (parents, children) functions that hide the `cut` arc(s).
+
+    `cut` is a (source, target) pair of ints; target ALL_CHILDREN hides every
+    arc out of source. This is how the backdoor and single-door graphs are
+    obtained without copying the DAG.
+    """
+    cut_source, cut_target = cut
+    if cut_source < 0:
+        return graph.parents, graph.children
+    cut_children = set(graph.children(cut_source)) if cut_target == ALL_CHILDREN else {cut_target}
+
+    def parents(v):
+        if v in cut_children:
+            return [p for p in graph.parents(v) if p != cut_source]
+        return graph.parents(v)
+
+    def children(v):
+        if v == cut_source:
+            return [c for c in graph.children(v) if c not in cut_children]
+        return graph.children(v)
+
+    return parents, children
+
+
+def reachable(graph, source, observed, cut=NO_CUT):
+    """Return the ints connected to `source` by an active trail given `observed`."""
+    parents, children = _cut_view(graph, cut)
+    observed = set(observed)
+    observed_ancestors = graph.ancestors(observed)
+    result = set()
+    visited_up = bytearray(len(graph))
+    visited_down = bytearray(len(graph))
+    # 'up' means we reached the node from one of its children, 'down' from a parent
+    stack = [(source, True)]
+    steps = 0
+    while stack:
+        v, up = stack.pop()
+        visited = visited_up if up else visited_down
+        if visited[v]:
+            continue
+        visited[v] = 1
+        steps += 1
+        if v not in observed:
+            result.add(v)
+        if up and v not in observed:
+            stack.extend((p, True) for p in parents(v))
+            stack.extend((c, False) for c in children(v))
+        elif not up:
+            if v not in observed:
+                stack.extend((c, False) for c in children(v))
+            if v in observed_ancestors:
+                stack.extend((p, True) for p in parents(v))
+    TRAIL_STEPS.inc(steps)
+    return result
+
+
+def d_separated(graph, source, target, observed, cut=NO_CUT):
+    """Check whether the ints `source` and `target` are d-separated by `observed`."""
+    return target not in reachable(graph, source, observed, cut)
+
+
+def forbidden_nodes(graph, cause, outcome, effect_type='total'):
+    """Return the ints that may never appear in an adjustment set."""
+    if effect_type == 'direct':
+        return graph.descendants([outcome]) | {cause}
+    return graph.descendants([cause]) | {outcome}
+
+
+def criterion_cut(cause, outcome, effect_type='total'):
+    """Return the arc(s) the criterion removes before testing d-separation.
+
+    The backdoor criterion (total effect) removes every arc out of the cause;
+    the single-door criterion (direct effect) removes only cause -> outcome.
+    """
+    if effect_type == 'direct':
+        return (cause, outcome)
+    return (cause, ALL_CHILDREN)
+
+
+def is_valid_adjustment_set(graph, cause, outcome, adjustment_set, effect_type='total'):
+    """Check an adjustment set for the effect of `cause` on `outcome`.
+
+    For the total effect this is the backdoor criterion: no descendant of the
+    cause, and the set d-separates cause and outcome once the cause's outgoing
+    arcs are removed. For the direct effect it is the single-door criterion: no
+    descendant of the outcome, and d-separation once cause -> outcome is removed.
+    """
+    cause = graph.index[cause]
+    outcome = graph.index[outcome]
+    adjustment_set = {graph.index[node] for node in adjustment_set}
+    valid = not adjustment_set & forbidden_nodes(graph, cause, outcome, effect_type) and \
+        d_separated(graph, cause, outcome, adjustment_set, criterion_cut(cause, outcome, effect_type))
+    VALIDITY_CHECKS.inc(valid=str(valid).lower())
+    return valid
+
+
+def moral_ancestral_graph(graph, vs, cut=NO_CUT, deadline=None):
+    """Return the moralised graph of the ancestors of the ints `vs` as {int: set of ints}.
+
+    Raises DeadlineExceeded if `deadline` passes while it is being built.
+    """
+    parents_of = _cut_view(graph, cut)[0]
+    ancestors = set()
+    stack = list(vs)
+    while stack:
+        v = stack.pop()
+        if v not in ancestors:
+            ancestors.add(v)
+            stack.extend(parents_of(v))
+    _check_deadline(deadline)
+    neighbours = {v: set() for v in ancestors}
+    for v in ancestors:
+        _check_deadline(deadline)
+        parents = list(parents_of(v))
+        for i, parent in enumerate(parents):
+            neighbours[v].add(parent)
+            neighbours[parent].add(v)
+            for other in parents[i + 1:]:
+                neighbours[parent].add(other)
+                neighbours[other].add(parent)
+    return neighbours
+
+
+def iter_minimal_adjustment_sets(graph, cause, outcome, effect_type='total', deadline=None):
+    """Yield every minimal adjustment set for the effect of `cause` on `outcome`.
+
+    Minimal adjustment sets are exactly the minimal cause/outcome vertex
+    separators of the moralised ancestral graph (under the criterion's arc
+    removal) that avoid the forbidden nodes. Each separator is identified by
+    its cause-side component; growing that component by one separator node
+    and taking the closest separator towards the outcome reaches every other
+    one. A set is yielded when it is taken off the queue, so the delay between
+    two results is a single expansion, O(V * (V+E)). Once `deadline` (a
+    time.monotonic() value) passes, DeadlineExceeded is raised, even before
+    the first set.
+    """
+    if cause == outcome:
+        return
+    ids = graph.ids
+    cause = graph.index[cause]
+    outcome = graph.index[outcome]
+    moral = moral_ancestral_graph(graph, [cause, outcome], criterion_cut(cause, outcome, effect_type), deadline)
+    forbidden = forbidden_nodes(graph, cause, outcome, effect_type) - {cause}
+
+    def absorb(side):
+        # Forbidden nodes can never separate, so they always join the cause side
+        stack = list(side)
+        while stack:
+            v = stack.pop()
+            for neighbour in moral[v]:
+                if neighbour in forbidden and neighbour not in side:
+                    if neighbour == outcome:
+                        return None
+                    side.add(neighbour)
+                    stack.append(neighbour)
+        return side
+
+    def closest_separator(side):
+        # The minimal separator nearest to `side`: the border of the outcome's
+        # component once all neighbours of `side` are removed
+        border = set()
+        for v in side:
+            border.update(moral[v])
+        border -= side
+        if outcome in border:
+            return None
+        component = _component(moral, outcome, border)
+        separator = set()
+        for v in component:
+            separator.update(moral[v])
+        return frozenset(separator - component)
+
+    start = absorb({cause})
+    first = closest_separator(start) if start is not None else None
+    if first is None:
+        return
+    # Seed with a minimum-size separator as well, so the first set out is a
+    # smallest one; after that the smallest set discovered so far goes next
+    seeds = {first, _minimum_separator(moral, cause, outcome, forbidden, deadline)}
+    seen = set(seeds)
+    counter = itertools.count()
+    queue = [(len(separator), next(counter), separator) for separator in seeds]
+    heapq.heapify(queue)
+    while queue:
+        separator = heapq.heappop(queue)[2]
+        SETS_FOUND.inc()
+        yield {ids[v] for v in separator}
+        cause_side = _component(moral, cause, separator)
+        SEPARATORS_CHECKED.inc(len(separator))
+        for v in separator:
+            _check_deadline(deadline)
+            side = absorb(cause_side | {v})
+            if side is None:
+                continue
+            candidate = closest_separator(side)
+            if candidate is not None and candidate not in seen:
+                seen.add(candidate)
+                heapq.heappush(queue, (len(candidate), next(counter), candidate))
+
+
+def iter_adjustment_sets(graph, outcome, causes, effect_type='total', deadline=None):
+    """Yield the distinct minimal adjustment sets over all `causes`, lazily.
+
+    Sets come out as sorted lists of node ids, smallest first for each cause.
+    A cause needing no adjustment, having no causal path to the outcome, or
+    that cannot be analysed (e.g. an unknown node id) contributes nothing.
+    DeadlineExceeded is passed on to the caller.
+    """
+    seen = set()
+    for cause in causes:
+        # First check if adjustment is possible/needed
+        if cause == outcome:
+            logging.info("Cause and outcome are the same node - no adjustment needed")
+            continue
+        try:
+            # Check if there is any causal path
+            if not graph.is_ancestor_of(graph.index[cause], graph.index[outcome]):
+                logging.info(f"No causal path exists between {cause} and {outcome}")
+                continue
+            for adjustment_set in iter_minimal_adjustment_sets(graph, cause, outcome, effect_type, deadline):
+                if not adjustment_set:
+                    logging.info(f"No non-causal paths from {cause} need to be blocked")
+                    break
+                key = frozenset(adjustment_set)
+                if key not in seen:
+                    seen.add(key)
+                    yield sorted(adjustment_set)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logging.warning(f"Warning: Error calculating adjustment set for cause {cause}: {str(e)}")
+
+
+def find_adjustment_sets(graph, outcome, causes, effect_type='total', limit=None, deadline=None):
+    """Collect minimal adjustment sets over all `causes`, stopping early if asked.
+
+    Args:
+        graph: The graph.Graph object
+        outcome: The outcome node
+        causes: The cause nodes
+        effect_type: 'total' (backdoor criterion) or 'direct' (single-door criterion)
+        limit: Stop after this many sets
+        deadline: time.monotonic() value after which enumeration stops, even
+            before the first set is found
+
+    Returns:
+        The sets found and whether enumeration stopped early.
+    """
+    adjustment_sets = []
+    try:
+        for adjustment_set in iter_adjustment_sets(graph, outcome, causes, effect_type, deadline):
+            adjustment_sets.append(adjustment_set)
+            if limit is not None and len(adjustment_sets) >= limit:
+                return adjustment_sets, True
+            if deadline is not None and time.monotonic() >= deadline:
+                return adjustment_sets, True
+    except DeadlineExceeded:
+        return adjustment_sets, True
+    logging.debug('Adjustment sets for %s -> %s: %s', causes, outcome, adjustment_sets)
+    return adjustment_sets, False
+
+
+def result_limit(options):
+    """Read the result cap from request options: `mode='first'`, `limit` or `max_results`.
+
+    Raises ValueError unless the cap is absent or a positive whole number.
+    """
+    if options.get('mode') == 'first':
+        return 1
+    limit = options.get('limit', options.get('max_results'))
+    if limit is None:
+        return None
+    if isinstance(limit, str) and limit.strip().isdigit():
+        limit = int(limit)
+    if not isinstance(limit, int) or isinstance(limit, bool) or limit < 1:
+        raise ValueError('limit must be a positive whole number')
+    return limit
+
+
+def _minimum_separator(moral, cause, outcome, forbidden, deadline=None):
+    """Return a minimum-size cause/outcome separator avoiding `forbidden`.
+
+    Max-flow over the node-split moral graph: every allowed node has unit
+    capacity, forbidden nodes and edges are uncrossable, and the saturated
+    nodes on the source side of the final residual graph form the cut.
+    Dinic's algorithm augments along every shortest path of a phase at once,
+    O(E sqrt(V)) on unit capacities. Raises DeadlineExceeded if `deadline`
+    passes first.
+    """
+    infinite = len(moral) + 1
+    nodes = list(moral)
+    position = {v: i for i, v in enumerate(nodes)}
+    # Node i becomes 2i (in) and 2i + 1 (out); arc e's reverse is e ^ 1
+    heads = []
+    capacity = []
+    arcs = [[] for _ in range(2 * len(nodes))]
+
+    def add(u, w, c):
+        arcs[u].append(len(heads))
+        heads.append(w)
+        capacity.append(c)
+        arcs[w].append(len(heads))
+        heads.append(u)
+        capacity.append(0)
+
+    for i, v in enumerate(nodes):
+        _check_deadline(deadline)
+        add(2 * i, 2 * i + 1, infinite if v in forbidden or v == cause else 1)
+        for w in moral[v]:
+            add(2 * i + 1, 2 * position[w], infinite)
+    source = 2 * position[cause] + 1
+    sink = 2 * position[outcome]
+    flow = 0
+    while True:
+        _check_deadline(deadline)
+        level = [-1] * len(arcs)
+        level[source] = 0
+        queue = collections.deque([source])
+        while queue:
+            u = queue.popleft()
+            for e in arcs[u]:
+                if capacity[e] > 0 and level[heads[e]] < 0:
+                    level[heads[e]] = level[u] + 1
+                    queue.append(heads[e])
+        if level[sink] < 0:
+            break
+        # Augment along level-increasing paths until none is left; `next_arc`
+        # skips arcs already found to lead nowhere in this phase
+        next_arc = [0] * len(arcs)
+        while flow < infinite:
+            path = []
+            u = source
+            while u != sink:
+                while next_arc[u] < len(arcs[u]):
+                    e = arcs[u][next_arc[u]]
+                    if capacity[e] > 0 and level[heads[e]] == level[u] + 1:
+                        break
+                    next_arc[u] += 1
+                else:
+                    if u == source:
+                        break
+                    # Dead end: retreat and never try this node again in the phase
+                    level[u] = -1
+                    e = path.pop()
+                    u = heads[e ^ 1]
+                    next_arc[u] += 1
+                    continue
+                path.append(e)
+                u = heads[e]
+            if u != sink:
+                break
+            # Every path crosses a unit-capacity node, so it carries one unit
+            for e in path:
+                capacity[e] -= 1
+                capacity[e ^ 1] += 1
+            flow += 1
+            _check_deadline(deadline)
+        if flow >= infinite:
+            break
+    AUGMENTING_PATHS.inc(flow)
+    reached = {source}
+    stack = [source]
+    while stack:
+        u = stack.pop()
+        for e in arcs[u]:
+            if capacity[e] > 0 and heads[e] not in reached:
+                reached.add(heads[e])
+                stack.append(heads[e])
+    return frozenset(v for i, v in enumerate(nodes) if 2 * i in reached and 2 * i + 1 not in reached)
+
+
+def _component(neighbours, start, excluded):
+    component = {start}
+    stack = [start]
+    while stack:
+        v = stack.pop()
+        for neighbour in neighbours[v]:
+            if neighbour not in component and neighbour not in excluded:
+                component.add(neighbour)
+                stack.append(neighbour)
+    return component
@@ -0,0 +1,77 @@
+"""Process-pool fan-out for batches of adjustment-set queries on one graph.
+
+The graph is built once by the caller and handed to each worker process
+when the pool starts, so individual queries only carry their outcome,
+causes and options. Workers come from a fork server rather than from the
+(multi-threaded) web worker itself, and the pool is terminated when the
+batch ends, so a query still running at the timeout is killed, not left
+behind.
+"""
+import multiprocessing
+import time
+
+from adjustment import find_adjustment_sets, result_limit
+
+# forkserver is POSIX only; elsewhere workers are spawned
+_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+_CONTEXT = multiprocessing.get_context(_START_METHOD)
+if _START_METHOD == 'forkserver':
+    # Forked workers start with the analysis code already imported
+    _CONTEXT.set_forkserver_preload(['batch'])
+
+_worker_graph = None
+
+
+def _init_worker(graph):
+    global _worker_graph
+    _worker_graph = graph
+
+
+def run_query(graph, query, deadline=None):
+    """Answer one batch query against `graph`, returning a JSON-ready dict."""
+    outcome = str(query.get('outcome'))
+    causes = [str(c) for c in query.get('causes', [])]
+    unknown = [n for n in causes + [outcome] if n not in graph]
+    if unknown:
+        return {'success': False, 'error': f'Unknown nodes: {unknown}'}
+    adjustment_sets, truncated = find_adjustment_sets(
+        graph, outcome, causes, query.get('effect_type', 'total'), result_limit(query), deadline)
+    return {'success': True, 'adjustment_sets': adjustment_sets, 'truncated': truncated}
+
+
+def _run_in_worker(task):
+    i, query, deadline = task
+    try:
+        return i, run_query(_worker_graph, query, deadline)
+    except Exception as e:
+        return i, {'success': False, 'error': str(e)}
+
+
+def run_batch(graph, queries, timeout, workers):
+    """Yield (index, result) pairs for `queries` as they finish.
+
+    Queries still running when `timeout` seconds have passed are reported
+    with `timed_out` set instead of failing the batch, and their worker is
+    killed. Enumeration inside a worker also stops at the deadline, so slow
+    queries return what they found so far whenever they can.
+    """
+    if not queries:
+        return
+    deadline = time.monotonic() + timeout
+    workers = max(1, min(workers, len(queries)))
+    pool = _CONTEXT.Pool(workers, initializer=_init_worker, initargs=(graph,))
+    try:
+        results = pool.imap_unordered(_run_in_worker, [(i, query, deadline) for i, query in enumerate(queries)])
+        pending = set(range(len(queries)))
+        try:
+            while pending:
+                # A little grace so queries that stop at the deadline can still report
+                i, result = results.next(timeout=max(0, deadline + 1 - time.monotonic()))
+                pending.discard(i)
+                yield i, result
+        except multiprocessing.TimeoutError:
+            for i in sorted(pending):
+                yield i, {'success': False, 'error': 'Query timed out', 'timed_out': True}
+    finally:
+        # Also reached when the client goes away mid-stream
+        pool.terminate()
@@ -0,0 +1,6 @@
+"""Performance benchmarks for the analysis code and the web routes.
+
+Run a benchmark module directly, e.g. ``python -m benchmarks.graph_core``;
+``python -m benchmarks.suite`` runs the whole suite on the synthetic
+workloads in ``benchmarks.workloads`` and can compare against a baseline.
+"""
@@ -0,0 +1,54 @@
+"""Per-step traversal cost: node scan with has_arc vs CSR adjacency.
+
+The old path search expanded a node by scanning every node in the DAG and
+calling has_arc in both directions, so one step cost O(V). The CSR graph
+expands a node by slicing its children and parents, O(degree).
+
+    python -m benchmarks.graph_core
+"""
+import random
+import time
+
+from graph import build_graph
+
+
+def random_dag(n, average_degree=3, seed=0):
+    rng = random.Random(seed)
+    p = min(1.0, average_degree / max(n - 1, 1))
+    nodes = [{'id': i} for i in range(n)]
+    edges = [{'from': i, 'to': j} for i in range(n) for j in range(i + 1, n) if rng.random() < p]
+    return nodes, edges
+
+
+def scan_step(node_ids, arcs, current):
+    # What find_causal_paths/find_noncausal_paths did for every expansion
+    return [n for n in node_ids if (current, n) in arcs or (n, current) in arcs]
+
+
+def csr_step(graph, current):
+    return list(graph.children(current)) + list(graph.parents(current))
+
+
+def per_step(fn, args, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(*args)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    print(f"{'nodes':>6} {'edges':>7} {'scan us/step':>13} {'csr us/step':>12} {'speedup':>8}")
+    for n in (50, 200, 1000, 5000):
+        nodes, edges = random_dag(n)
+        graph = build_graph(nodes, edges)
+        node_ids = graph.nodes
+        arcs = set(graph.arcs)
+        current = n // 2
+        repeat = max(10, 20000 // n)
+        scan = per_step(scan_step, (node_ids, arcs, str(current)), repeat)
+        csr = per_step(csr_step, (graph, current), repeat * 100)
+        print(f"{n:>6} {len(edges):>7} {scan:>13.2f} {csr:>12.3f} {scan / csr:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
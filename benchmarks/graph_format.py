@@ -0,0 +1,49 @@
+"""Size and speed of the packed graph format against the JSON export.
+
+    python -m benchmarks.graph_format
+"""
+import json
+import time
+
+from benchmarks.graph_core import random_dag
+from graph_format import PackedGraph, decode_graph, encode_graph
+
+
+def editor_graph(n):
+    # Shaped like the editor's data: string ids, labels, titles and uuid-like edge ids
+    nodes, edges = random_dag(n)
+    nodes = [{'id': f'node-{node["id"]}', 'label': f'Variable {node["id"]}', 'title': f'Notes on {node["id"]}',
+              'x': node['id'] * 1.5, 'y': -node['id']} for node in nodes]
+    edges = [{'from': f'node-{edge["from"]}', 'to': f'node-{edge["to"]}', 'id': f'{i:08x}-edge', 'arrows': 'to'}
+             for i, edge in enumerate(edges)]
+    return {'nodes': nodes, 'edges': edges}
+
+
+def timed(fn, *args, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+
+def main():
+    print(f"{'edges':>7} {'format':>12} {'bytes':>10} {'write ms':>9} {'read ms':>8} {'sources ms':>11}")
+    for n in (1000, 7000):
+        content = editor_graph(n)
+        data, write = timed(lambda: json.dumps(content, indent=2).encode())
+        _, read = timed(json.loads, data)
+        _, arrays = timed(lambda: [(e['from'], e['to']) for e in json.loads(data)['edges']])
+        print(f"{len(content['edges']):>7} {'json':>12} {len(data):>10} {write:>9.1f} {read:>8.1f} {arrays:>11.1f}")
+        for compress in (False, True):
+            data, write = timed(encode_graph, content, compress)
+            assert decode_graph(data) == content
+            _, read = timed(decode_graph, data)
+            _, arrays = timed(lambda: PackedGraph(data).sources)
+            name = 'packed+zlib' if compress else 'packed'
+            print(f"{len(content['edges']):>7} {name:>12} {len(data):>10} {write:>9.1f} {read:>8.1f} {arrays:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""Load test: concurrent clients saving and loading projects over HTTP.
+
+Every client logs in as its own user, then saves (``/save_project``) and
+loads (``/projects/<id>``) a few projects in a loop for a fixed time.
+Reports throughput, latency percentiles and errors per operation.
+
+Against a running server:
+
+    python -m benchmarks.load --url http://localhost:5000 --clients 32
+
+Or let it start one on a fresh SQLite file, to compare serving setups:
+
+    python -m benchmarks.load --serve dev          # python app.py's server, Config
+    python -m benchmarks.load --serve production   # gunicorn.conf.py, ProductionConfig
+
+Set BENCHMARK_DATABASE_URL to load test the started server on another
+database, e.g. Postgres.
+"""
+import argparse
+import collections
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from benchmarks.suite import ROOT, percentile
+from benchmarks.workloads import generate
+
+DEV_SERVER = "from app import create_app; create_app().run(port={port}, threaded=True)"
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(mode, workers, threads):
+    """Start a server on a free port; return (process, base URL, temporary directory)."""
+    tmp = tempfile.TemporaryDirectory()
+    port = _free_port()
+    env = dict(os.environ, DATABASE_URL=os.environ.get('BENCHMARK_DATABASE_URL',
+                                                       f"sqlite:///{os.path.join(tmp.name, 'load.db')}"),
+               LLM_CACHE_PATH='', OPENALEX_CACHE_PATH='', OPENALEX_OFFLINE='1',
+               PORT=str(port), WEB_CONCURRENCY=str(workers), WEB_THREADS=str(threads))
+    if mode == 'dev':
+        command = [sys.executable, '-c', DEV_SERVER.format(port=port)]
+    else:
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}', 'wsgi:app']
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            requests.get(f'{url}/login', timeout=1)
+            return process, url, tmp
+        except requests.ConnectionError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError(f'The {mode} server did not start')
+            time.sleep(0.2)
+
+
+class Client(threading.Thread):
+
+    def __init__(self, url, index, content, stop, write_ratio, projects, run_id):
+        super().__init__(daemon=True)
+        self.url = url
+        self.index = index
+        self.content = content
+        self.stop = stop
+        self.write_ratio = write_ratio
+        self.names = [f'load-{run_id}-{index}-{i}' for i in range(projects)]
+        self.username = f'load-{run_id}-{index}'
+        self.session = requests.Session()
+        self.rng = random.Random(index)
+        self.latencies = collections.defaultdict(list)
+        self.errors = collections.Counter()
+
+    def login(self):
+        credentials = {'username': self.username, 'password': 'load'}
+        self.session.post(f'{self.url}/register', data=credentials)
+        self.session.post(f'{self.url}/login', data=credentials)
+
+    def save(self, name):
+        response = self.session.post(f'{self.url}/save_project', json={'name': name, 'content': self.content})
+        return response, response.json().get('id') if response.status_code == 200 else None
+
+    def run(self):
+        ids = {}
+        while not self.stop.is_set():
+            name = self.rng.choice(self.names)
+            write = name not in ids or self.rng.random() < self.write_ratio
+            operation = 'save' if write else 'load'
+            started = time.perf_counter()
+            try:
+                if write:
+                    response, project_id = self.save(name)
+                    if project_id is not None:
+                        ids[name] = project_id
+                else:
+                    response = self.session.get(f'{self.url}/projects/{ids[name]}')
+            except requests.RequestException as e:
+                self.errors[f'{operation}: {type(e).__name__}'] += 1
+                continue
+            elapsed = time.perf_counter() - started
+            if response.status_code == 200:
+                self.latencies[operation].append(elapsed * 1000)
+            else:
+                self.errors[f'{operation}: HTTP {response.status_code}'] += 1
+
+
+def run(url, clients, duration, nodes, write_ratio, projects):
+    content = generate('gpt_like', nodes).content
+    run_id = f'{int(time.time()):x}'
+    stop = threading.Event()
+    threads = [Client(url, i, content, stop, write_ratio, projects, run_id) for i in range(clients)]
+    for client in threads:
+        client.login()
+    started = time.perf_counter()
+    for client in threads:
+        client.start()
+    time.sleep(duration)
+    stop.set()
+    for client in threads:
+        client.join()
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    errors = collections.Counter()
+    for client in threads:
+        errors.update(client.errors)
+    for operation in ('save', 'load'):
+        ordered = sorted(latency for client in threads for latency in client.latencies[operation])
+        if not ordered:
+            continue
+        results[operation] = {
+            'requests': len(ordered),
+            'per_second': round(len(ordered) / elapsed, 1),
+            'p50_ms': round(percentile(ordered, 50), 2),
+            'p90_ms': round(percentile(ordered, 90), 2),
+            'p99_ms': round(percentile(ordered, 99), 2),
+        }
+    return {'clients': clients, 'duration': round(elapsed, 2), 'nodes': nodes, 'write_ratio': write_ratio,
+            'results': results, 'errors': dict(errors)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help='base URL of a running server')
+    target.add_argument('--serve', choices=('dev', 'production'), help='start a server to test')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='gunicorn workers (--serve)')
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn threads per worker (--serve)')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=10, help='seconds of load')
+    parser.add_argument('--nodes', type=int, default=100, help='nodes in each saved graph')
+    parser.add_argument('--write-ratio', type=float, default=0.5, help='share of requests that save')
+    parser.add_argument('--projects', type=int, default=3, help='projects per client')
+    parser.add_argument('--out', help='write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    process = tmp = None
+    url = args.url
+    if args.serve:
+        process, url, tmp = start_server(args.serve, args.workers, args.threads)
+    try:
+        report = run(url.rstrip('/'), args.clients, args.duration, args.nodes, args.write_ratio, args.projects)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(10)
+            tmp.cleanup()
+    report['server'] = args.serve or url
+
+    print(f"{'operation':<10} {'requests':>9} {'per s':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}")
+    for operation, result in report['results'].items():
+        print(f"{operation:<10} {result['requests']:>9} {result['per_second']:>8.1f} {result['p50_ms']:>9.2f} "
+              f"{result['p90_ms']:>9.2f} {result['p99_ms']:>9.2f}")
+    for error, count in sorted(report['errors'].items()):
+        print(f'{count:>6} x {error}')
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,362 @@
+"""Benchmark suite: the analysis code and the HTTP routes on synthetic DAGs.
+
+Runs every case on every workload (see workloads.py), records latency
+percentiles and peak traced memory, and writes them to JSON. With
+``--compare`` the results are checked against a stored baseline and the
+exit status is 1 if anything got slower or bigger than the threshold.
+
+    python -m benchmarks.suite --out baseline.json
+    python -m benchmarks.suite --compare baseline.json
+    python -m benchmarks.suite --sizes 10,1000 --kinds confounded --only 'http.*'
+    python -m benchmarks.suite --compare baseline.json --results other.json
+
+The HTTP cases drive a logged-in Flask test client against a fresh
+in-memory SQLite database (or BENCHMARK_DATABASE_URL). The startup cases
+time fresh interpreters importing the app, building it and answering a
+first request; one more run under ``python -X importtime`` records where
+the import time goes, by package, in the output's ``meta``. A full run takes
+several minutes: on the 10k-node confounded and gpt_like workloads every
+adjustment-set sample runs to its 5 s time limit (ADJUSTMENT_TIME_LIMIT).
+Narrow it with --sizes, --kinds and --only.
+"""
+import argparse
+import datetime
+import fnmatch
+import io
+import itertools
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from benchmarks.workloads import GENERATORS, SIZES, generate
+
+# Requests as the editor sends them: a few sets, bounded time
+ADJUSTMENT_LIMIT = 10
+ADJUSTMENT_TIME_LIMIT = 5
+MIN_SAMPLES = 3
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# What a server process does before it can answer anything
+STARTUP_SCRIPTS = {
+    'startup.create_app': 'from app import create_app; create_app()',
+    'startup.first_request': "from app import create_app; create_app().test_client().get('/login')",
+}
+IMPORT_TIME_PACKAGES = 20
+
+
+def _isolate():
+    # Never touch the development database or the on-disk caches
+    os.environ['DATABASE_URL'] = os.environ.get('BENCHMARK_DATABASE_URL', 'sqlite://')
+    os.environ['LLM_CACHE_PATH'] = ''
+    os.environ['OPENALEX_CACHE_PATH'] = ''
+    os.environ['OPENALEX_OFFLINE'] = '1'
+
+
+def analysis_cases(workload):
+    """Yield (name, callable) for the analysis functions, called directly."""
+    from acyclic import find_cycles
+    from adjustment import find_adjustment_sets, is_valid_adjustment_set
+    from graph import build_graph
+    from layout import sugiyama_layout
+
+    nodes, edges = workload.content['nodes'], workload.content['edges']
+    outcome = str(workload.query['outcome'])
+    causes = [str(c) for c in workload.query['causes']]
+
+    def adjustment_sets():
+        deadline = time.monotonic() + ADJUSTMENT_TIME_LIMIT
+        return find_adjustment_sets(build_graph(nodes, edges), outcome, causes, 'total', ADJUSTMENT_LIMIT, deadline)
+
+    # The parents of the cause block every backdoor path, so this is a valid set to check
+    candidate = {str(edge['from']) for edge in edges if str(edge['to']) == causes[0]}
+
+    yield 'build_graph', lambda: build_graph(nodes, edges)
+    yield 'find_cycles', lambda: find_cycles(nodes, edges)
+    yield 'find_adjustment_sets', adjustment_sets
+    yield 'is_valid_adjustment_set', \
+        lambda: is_valid_adjustment_set(build_graph(nodes, edges), causes[0], outcome, candidate)
+    yield 'sugiyama_layout', lambda: sugiyama_layout(build_graph(nodes, edges))
+
+
+class BenchmarkClient:
+    """A logged-in Flask test client on its own database."""
+
+    def __init__(self):
+        _isolate()
+        from app import create_app
+        from models import db, User
+
+        self.app = app = create_app()
+        self.adjustment_cache = app.extensions['autodag'].adjustment_cache
+        with app.app_context():
+            if User.query.filter_by(username='benchmark').first() is None:
+                user = User(username='benchmark')
+                user.set_password('benchmark')
+                db.session.add(user)
+                db.session.commit()
+        self.client = app.test_client()
+        self.client.post('/login', data={'username': 'benchmark', 'password': 'benchmark'})
+
+    def post(self, path, **kwargs):
+        response = self.client.post(path, **kwargs)
+        if response.status_code != 200:
+            raise RuntimeError(f'{path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}')
+        return response
+
+    def cases(self, workload):
+        """Yield (name, callable) for the HTTP routes."""
+        from graph_format import MIMETYPE, encode_graph
+
+        content = workload.content
+        request = dict(content, outcome=workload.query['outcome'], causes=workload.query['causes'],
+                       limit=ADJUSTMENT_LIMIT, time_limit=ADJUSTMENT_TIME_LIMIT)
+        names = (f'benchmark-{workload.kind}-{workload.size}-{i}' for i in itertools.count())
+        as_json = json.dumps(content).encode()
+        packed = encode_graph(content)
+
+        def adjustment_set():
+            self.adjustment_cache.clear()
+            return self.post('/get_adjustment_set', json=request)
+
+        def upload(data, filename):
+            return self.post('/import_graph', data={'file': (io.BytesIO(data), filename)},
+                             content_type='multipart/form-data')
+
+        yield 'http.get_adjustment_set', adjustment_set
+        yield 'http.get_adjustment_set.cached', lambda: self.post('/get_adjustment_set', json=request)
+        yield 'http.save_project', lambda: self.post('/save_project', json={'name': next(names), 'content': content})
+        yield 'http.export_graph.json', lambda: self.post('/export_graph', json=content)
+        yield 'http.export_graph.packed', lambda: self.post('/export_graph', json=content, headers={'Accept': MIMETYPE})
+        yield 'http.import_graph.json', lambda: upload(as_json, 'graph.json')
+        yield 'http.import_graph.packed', lambda: upload(packed, 'graph.dagb')
+
+
+def startup_cases():
+    """Yield (name, callable) for cold starts, each in a fresh interpreter."""
+    _isolate()
+    for name, script in STARTUP_SCRIPTS.items():
+        yield name, lambda script=script: subprocess.run([sys.executable, '-c', script], cwd=ROOT, check=True)
+
+
+def import_times():
+    """Return the app's import time in total and for its most expensive packages.
+
+    Self times from ``python -X importtime`` are summed per top-level
+    package, so a heavy dependency shows up however deep it is imported.
+    """
+    _isolate()
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPTS['startup.create_app']],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stderr
+    packages = {}
+    total = 0
+    for line in stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.split('|')
+        if len(fields) != 3 or not fields[0].strip().split(':')[-1].strip().isdigit():
+            continue
+        self_us = int(fields[0].split(':')[-1])
+        package = fields[2].strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+        total += self_us
+    top = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:IMPORT_TIME_PACKAGES]
+    return {'total_ms': round(total / 1000, 1), 'packages_ms': {name: round(us / 1000, 1) for name, us in top}}
+
+
+def percentile(ordered, q):
+    """Linearly interpolated percentile `q` (0-100) of sorted samples."""
+    rank = (len(ordered) - 1) * q / 100
+    low = math.floor(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def measure(fn, repeat, budget, trace_memory=True):
+    """Time `fn` up to `repeat` times (at least MIN_SAMPLES, then within `budget` seconds).
+
+    A warm-up call comes first, and one more call under tracemalloc measures
+    peak memory so allocation tracing does not skew the timings. A case whose
+    warm-up alone exceeds the budget keeps that one sample and skips the
+    memory measurement (`peak_memory_bytes` is None), as do cases run
+    with `trace_memory` off, such as those in other processes.
+    """
+    start = time.perf_counter()
+    fn()
+    warm_up = time.perf_counter() - start
+    samples = []
+    peak = None
+    if warm_up > budget:
+        samples.append(warm_up)
+    else:
+        started = time.perf_counter()
+        while len(samples) < repeat and (len(samples) < MIN_SAMPLES or time.perf_counter() - started < budget):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+        if trace_memory:
+            tracemalloc.start()
+            try:
+                fn()
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+    ordered = sorted(s * 1000 for s in samples)
+    return {
+        'samples': len(ordered),
+        'min_ms': round(ordered[0], 4),
+        'p50_ms': round(percentile(ordered, 50), 4),
+        'p90_ms': round(percentile(ordered, 90), 4),
+        'p99_ms': round(percentile(ordered, 99), 4),
+        'max_ms': round(ordered[-1], 4),
+        'mean_ms': round(sum(ordered) / len(ordered), 4),
+        'peak_memory_bytes': peak,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _report(key, result):
+    peak = result['peak_memory_bytes']
+    print(f"{key:<58} {result['samples']:>5} {result['p50_ms']:>10.3f} {result['p90_ms']:>10.3f} "
+          f"{result['p99_ms']:>10.3f} {'-' if peak is None else f'{peak / 1024:.1f}':>10}", flush=True)
+
+
+def _selected(key, patterns):
+    return not patterns or any(fnmatch.fnmatch(key, pattern) for pattern in patterns)
+
+
+def run(kinds, sizes, patterns, repeat, budget, seed, http=True, startup=True):
+    results = {}
+    imports = None
+    print(f"{'case':<58} {'n':>5} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'peak KiB':>10}")
+    if startup and any(_selected(key, patterns) for key in STARTUP_SCRIPTS):
+        # First, while nothing from the app is imported in this process
+        for key, fn in startup_cases():
+            if _selected(key, patterns):
+                results[key] = measure(fn, repeat, budget, trace_memory=False)
+                _report(key, results[key])
+        imports = import_times()
+    client = BenchmarkClient() if http else None
+    for kind in kinds:
+        for size in sizes:
+            workload = generate(kind, size, seed)
+            cases = analysis_cases(workload)
+            if client is not None:
+                cases = itertools.chain(cases, client.cases(workload))
+            for name, fn in cases:
+                key = f'{name}/{kind}/{size}'
+                if _selected(key, patterns):
+                    results[key] = measure(fn, repeat, budget)
+                    _report(key, results[key])
+    if imports is not None:
+        heaviest = ', '.join(f'{name} {ms:.0f}' for name, ms in list(imports['packages_ms'].items())[:8])
+        print(f"Import time {imports['total_ms']:.0f} ms; by package (ms): {heaviest}")
+    return {
+        'meta': {
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': seed,
+            'repeat': repeat,
+            'budget': budget,
+            'import_time': imports,
+        },
+        'results': results,
+    }
+
+
+def _kib(size):
+    return '-' if size is None else f'{size / 1024:.0f}'
+
+
+def compare(baseline, current, threshold=0.2, min_delta_ms=0.1, min_delta_bytes=64 * 1024):
+    """Return the cases whose median time or peak memory grew by more than `threshold`.
+
+    Changes smaller than `min_delta_ms` / `min_delta_bytes` are ignored as
+    noise. Prints one line per case found in both runs.
+    """
+    regressions = []
+    print(f"{'case':<58} {'p50 ms':>18} {'ratio':>7} {'peak KiB':>20} {'ratio':>7}")
+    for key, result in current['results'].items():
+        base = baseline['results'].get(key)
+        if base is None:
+            continue
+        time_ratio = result['p50_ms'] / base['p50_ms'] if base['p50_ms'] else 1.0
+        slower = time_ratio > 1 + threshold and result['p50_ms'] - base['p50_ms'] > min_delta_ms
+        # Memory is not measured for cases slower than the budget
+        peak, base_peak = result['peak_memory_bytes'], base['peak_memory_bytes']
+        memory_ratio = peak / base_peak if peak is not None and base_peak else 1.0
+        bigger = memory_ratio > 1 + threshold and peak - base_peak > min_delta_bytes
+        if slower or bigger:
+            regressions.append(key)
+            status = 'REGRESSION'
+        elif time_ratio < 1 / (1 + threshold):
+            status = 'faster'
+        else:
+            status = ''
+        memory = f"{_kib(base_peak):>9} -> {_kib(peak):<9}"
+        print(f"{key:<58} {base['p50_ms']:>8.3f} -> {result['p50_ms']:<8.3f}{time_ratio:>6.2f}x "
+              f"{memory}{memory_ratio:>6.2f}x {status}")
+    missing = sorted(set(baseline['results']) - set(current['results']))
+    if missing:
+        print(f'{len(missing)} baseline case(s) not run')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--kinds', default=','.join(GENERATORS), help='comma-separated workload generators')
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)), help='comma-separated node counts')
+    parser.add_argument('--only', action='append', default=[],
+                        help="glob on 'case/kind/size', e.g. 'http.*/gpt_like/*' (repeatable)")
+    parser.add_argument('--repeat', type=int, default=30, help='timed calls per case at most')
+    parser.add_argument('--budget', type=float, default=2.0, help='seconds per case once MIN_SAMPLES are in')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-http', action='store_true', help='skip the HTTP routes')
+    parser.add_argument('--no-startup', action='store_true', help='skip the cold start cases and import times')
+    parser.add_argument('--out', help='write the results to this JSON file')
+    parser.add_argument('--compare', metavar='BASELINE', help='flag regressions against this results file')
+    parser.add_argument('--results', help='compare this results file instead of running the suite')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative growth (0.2 = 20%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=0.1, help='ignore smaller changes in median time')
+    args = parser.parse_args(argv)
+
+    if args.results:
+        with open(args.results) as f:
+            current = json.load(f)
+    else:
+        kinds = [kind for kind in args.kinds.split(',') if kind]
+        unknown = [kind for kind in kinds if kind not in GENERATORS]
+        if unknown:
+            parser.error(f'unknown workload(s): {", ".join(unknown)}')
+        sizes = [int(size) for size in args.sizes.split(',') if size]
+        current = run(kinds, sizes, args.only, args.repeat, args.budget, args.seed, http=not args.no_http,
+                      startup=not args.no_startup)
+        if args.out:
+            with open(args.out, 'w') as f:
+                json.dump(current, f, indent=2)
+            print(f'Wrote {len(current["results"])} results to {args.out}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f'{len(regressions)} regression(s) beyond {args.threshold:.0%}: {", ".join(regressions)}')
+            return 1
+        print('No regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""Seeded synthetic DAGs for the benchmarks.
+
+Every generator takes a node count and a seed, always returns the same
+graph for the same arguments, and picks a cause/outcome query that
+exercises the adjustment set search:
+
+- ``erdos_renyi``: G(n, p) over a random topological order.
+- ``layered``: nodes in consecutive layers, parents mostly one layer up.
+- ``confounded``: one cause and one outcome sharing a dense web of
+  common causes, the worst case for enumerating adjustment sets.
+- ``gpt_like``: shaped like LLM output, with string ids, labels,
+  annotations and edge ids, a few hubs, and one outcome most arrows lead
+  to.
+
+Graphs are in the editor's JSON shape, {"nodes": [...], "edges": [...]}.
+"""
+import collections
+import math
+import random
+
+Workload = collections.namedtuple('Workload', 'kind size content query')
+
+SIZES = (10, 100, 1000, 10000)
+
+
+def _content(nodes, arcs, label=str):
+    return {
+        'nodes': [{'id': node, 'label': label(node)} for node in nodes],
+        'edges': [{'id': f'e{i}', 'from': v, 'to': w} for i, (v, w) in enumerate(arcs)],
+    }
+
+
+def _sparse_pairs(n, p, rng):
+    # Pairs (i, j), i < j, each with probability p, in O(n + edges) by
+    # skipping a geometrically distributed number of pairs at a time
+    if p >= 1:
+        yield from ((i, j) for j in range(n) for i in range(j))
+        return
+    if p <= 0:
+        return
+    log_q = math.log(1 - p)
+    j, i = 1, -1
+    while j < n:
+        i += 1 + int(math.log(1 - rng.random()) / log_q)
+        while i >= j and j < n:
+            i -= j
+            j += 1
+        if j < n:
+            yield i, j
+
+
+def erdos_renyi(n, seed=0, average_degree=3):
+    rng = random.Random(seed)
+    order = list(range(n))
+    rng.shuffle(order)
+    arcs = [(order[i], order[j]) for i, j in _sparse_pairs(n, min(1.0, average_degree / max(n - 1, 1)), rng)]
+    # Outcome last in the order; the cause is its earliest parent, so it has the most ancestors
+    position = {node: i for i, node in enumerate(order)}
+    outcome = order[-1]
+    parents = [v for v, w in arcs if w == outcome]
+    cause = min(parents, key=position.get) if parents else order[0]
+    return Workload('erdos_renyi', n, _content(range(n), arcs, lambda v: f'X{v}'),
+                    {'outcome': outcome, 'causes': [cause]})
+
+
+def layered(n, seed=0, fan_in=2):
+    rng = random.Random(seed)
+    width = max(2, round(math.sqrt(n) * 2))
+    layers = [list(range(start, min(start + width, n))) for start in range(0, n, width)]
+    arcs = []
+    for depth in range(1, len(layers)):
+        for node in layers[depth]:
+            parents = set()
+            for _ in range(fan_in):
+                # Mostly the layer just above, sometimes further up
+                up = 1 + int(rng.expovariate(2.0))
+                parents.add(rng.choice(layers[max(0, depth - up)]))
+            arcs.extend((parent, node) for parent in sorted(parents))
+    outcome = layers[-1][0]
+    parents = [v for v, w in arcs if w == outcome]
+    cause = parents[0] if parents else layers[0][0]
+    return Workload('layered', n, _content(range(n), arcs, lambda v: f'L{v}'),
+                    {'outcome': outcome, 'causes': [cause]})
+
+
+def confounded(n, seed=0, density=0.3):
+    rng = random.Random(seed)
+    cause, outcome = 0, 1
+    mediators = list(range(2, 2 + max(1, n // 20)))[:max(0, n - 2)]
+    confounders = list(range(2 + len(mediators), n))
+    arcs = [(cause, outcome)]
+    previous = cause
+    for mediator in mediators:
+        arcs.append((previous, mediator))
+        previous = mediator
+    if mediators:
+        arcs.append((previous, outcome))
+    # Confounders feed both ends and each other (earlier to later). On large
+    # graphs the ends get about 4 sqrt(n) parents each, and each confounder
+    # about 8 links to other confounders: thousands of common parents make
+    # the moralised graph quadratic and exhaust memory rather than time.
+    shared = min(density, 4 / math.sqrt(max(len(confounders), 1)))
+    p = min(density, 8 / max(len(confounders), 1))
+    for confounder in confounders:
+        if rng.random() < shared:
+            arcs.append((confounder, cause))
+        if rng.random() < shared:
+            arcs.append((confounder, outcome))
+    arcs.extend((confounders[i], confounders[j]) for i, j in _sparse_pairs(len(confounders), p, rng))
+    labels = {cause: 'Treatment', outcome: 'Outcome'}
+    return Workload('confounded', n, _content(range(n), arcs, lambda v: labels.get(v, f'C{v}')),
+                    {'outcome': outcome, 'causes': [cause]})
+
+
+ADJECTIVES = ('chronic', 'early', 'household', 'maternal', 'low', 'high', 'social', 'dietary', 'regional', 'genetic')
+NOUNS = ('smoking', 'income', 'stress', 'exercise', 'education', 'pollution', 'obesity', 'sleep', 'inflammation',
+         'blood pressure', 'alcohol use', 'access to care')
+
+
+def gpt_like(n, seed=0):
+    rng = random.Random(seed)
+    ids = [f'{rng.getrandbits(64):016x}' for _ in range(n)]
+    nodes = []
+    for i, node_id in enumerate(ids):
+        label = 'Outcome' if i == 0 else f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}'.capitalize()
+        nodes.append({'id': node_id, 'label': label,
+                      'title': f'{label} is linked to {rng.randint(2, 40)} studies in the literature.'})
+    # Newer nodes point at older ones, preferring well-connected targets, so
+    # the graph grows hubs and node 0 collects most paths, like a generated
+    # "what causes the outcome" graph
+    targets = [0]
+    arcs = []
+    for i in range(1, n):
+        heads = {rng.choice(targets) for _ in range(rng.randint(1, 3))}
+        for target in sorted(heads):
+            arcs.append((i, target))
+            targets.append(target)
+        targets.append(i)
+    edges = [{'id': f'{rng.getrandbits(128):032x}', 'from': ids[v], 'to': ids[w], 'arrows': 'to'} for v, w in arcs]
+    cause = next((v for v, w in arcs if w == 0), 0)
+    return Workload('gpt_like', n, {'nodes': nodes, 'edges': edges}, {'outcome': ids[0], 'causes': [ids[cause]]})
+
+
+GENERATORS = {
+    'erdos_renyi': erdos_renyi,
+    'layered': layered,
+    'confounded': confounded,
+    'gpt_like': gpt_like,
+}
+
+
+def generate(kind, n, seed=0):
+    """Return the `kind` workload with `n` nodes."""
+    return GENERATORS[kind](n, seed)
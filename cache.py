@@ -0,0 +1,131 @@
+"""Caches shared by the request handlers: in-process LRU and persistent SQLite."""
+from collections import OrderedDict
+import json
+import sqlite3
+import threading
+import time
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and approximate size.
+
+    The size of a value is the length of its JSON encoding, which is what the
+    cached analysis results are sent as anyway, unless `put` is given one.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key, value, size=None):
+        if size is None:
+            size = len(json.dumps(value))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._bytes -= self._entries.popitem(last=False)[1][1]
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class SQLiteTTLCache:
+    """Persistent JSON cache in a SQLite file with a TTL and an entry cap.
+
+    Entries older than `ttl` seconds are treated as missing; once more than
+    `max_entries` are stored, the least recently read ones are dropped. Each
+    thread gets its own connection, so the cache can be shared by pools.
+    """
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_entries=10000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute('SELECT value, stored_at FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None or row[1] + self.ttl <= now:
+                if row is not None:
+                    conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                with self._counter_lock:
+                    self.misses += 1
+                return default
+            conn.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (now, key))
+        with self._counter_lock:
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO entries (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value), now, now),
+            )
+            conn.execute(
+                'DELETE FROM entries WHERE key IN '
+                '(SELECT key FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM entries')
+
+    def stats(self):
+        with self._connect() as conn:
+            entries = conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        return {'entries': entries, 'hits': self.hits, 'misses': self.misses}
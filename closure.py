@@ -0,0 +1,113 @@
+"""Transitive-closure index of a DAG stored as one bitset row per node.
+
+Bit w of `descendants[v]` is set when w is reachable from v (v included),
+and likewise for `ancestors`. Rows are Python ints, so ancestor, descendant
+and mediator sets come from single AND/OR operations instead of a graph
+search per query.
+"""
+import json
+import struct
+import zlib
+
+# Stored form: header length and row width, then the header (the ids as
+# JSON) and every ancestor row followed by every descendant row, each row
+# little-endian in `width` bytes; all of it zlib-compressed
+_PREFIX = struct.Struct('<II')
+
+
+class ClosureIndex:
+    """Ancestor/descendant bitsets over the integer nodes of a `graph.Graph`.
+
+    The index round-trips through `to_bytes` / `from_bytes` so it can be
+    stored with a saved project; a graph whose structure changed gets a new
+    index from `from_graph`.
+    """
+    __slots__ = ('ids', 'ancestors', 'descendants')
+
+    def __init__(self, ids, arcs):
+        self.ids = list(ids)
+        children = [set() for _ in self.ids]
+        parents = [set() for _ in self.ids]
+        for v, w in arcs:
+            children[v].add(w)
+            parents[w].add(v)
+        order = topological_order(children, parents)
+        self.descendants = [0] * len(self.ids)
+        self.ancestors = [0] * len(self.ids)
+        for v in reversed(order):
+            row = 1 << v
+            for w in children[v]:
+                row |= self.descendants[w]
+            self.descendants[v] = row
+        for v in order:
+            row = 1 << v
+            for p in parents[v]:
+                row |= self.ancestors[p]
+            self.ancestors[v] = row
+
+    @classmethod
+    def from_graph(cls, graph):
+        return cls(graph.ids, ((v, w) for v in range(len(graph)) for w in graph.children(v)))
+
+    def ancestor_bits(self, vs):
+        row = 0
+        for v in vs:
+            row |= self.ancestors[v]
+        return row
+
+    def descendant_bits(self, vs):
+        row = 0
+        for v in vs:
+            row |= self.descendants[v]
+        return row
+
+    def mediator_bits(self, cause, outcome):
+        """Nodes on a directed path from cause to outcome, excluding both ends."""
+        return self.descendants[cause] & self.ancestors[outcome] & ~((1 << cause) | (1 << outcome))
+
+    def is_ancestor_of(self, v, w):
+        return bool(self.ancestors[w] >> v & 1)
+
+    def to_bytes(self):
+        header = json.dumps({'ids': self.ids}, separators=(',', ':')).encode()
+        width = (len(self.ids) + 7) // 8
+        rows = b''.join(row.to_bytes(width, 'little') for row in self.ancestors + self.descendants)
+        return zlib.compress(_PREFIX.pack(len(header), width) + header + rows, 1)
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = zlib.decompress(data)
+        header_size, width = _PREFIX.unpack_from(data)
+        start = _PREFIX.size + header_size
+        header = json.loads(data[_PREFIX.size:start])
+        index = cls.__new__(cls)
+        index.ids = header['ids']
+        n = len(index.ids)
+        rows = [int.from_bytes(data[i:i + width], 'little') for i in range(start, start + 2 * n * width, width)]
+        index.ancestors = rows[:n]
+        index.descendants = rows[n:]
+        return index
+
+
+def iter_bits(row):
+    """Yield the positions of the set bits of `row`, lowest first."""
+    while row:
+        low = row & -row
+        yield low.bit_length() - 1
+        row ^= low
+
+
+def topological_order(children, parents):
+    indegree = [len(p) for p in parents]
+    stack = [v for v, degree in enumerate(indegree) if degree == 0]
+    order = []
+    while stack:
+        v = stack.pop()
+        order.append(v)
+        for w in children[v]:
+            indegree[w] -= 1
+            if indegree[w] == 0:
+                stack.append(w)
+    if len(order) != len(children):
+        raise ValueError('Graph contains a cycle')
+    return order
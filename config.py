@@ -1,6 +1,53 @@
 import os
+from dotenv import load_dotenv
+
+# Load environment variables from .env file before Config reads them
+load_dotenv()
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///app.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    ADJUSTMENT_CACHE_ENTRIES = int(os.environ.get('ADJUSTMENT_CACHE_ENTRIES', 1024))
+    ADJUSTMENT_CACHE_BYTES = int(os.environ.get('ADJUSTMENT_CACHE_BYTES', 32 * 1024 * 1024))
+    BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', os.cpu_count() or 1))
+    BATCH_TIMEOUT = float(os.environ.get('BATCH_TIMEOUT', 30))
+    OPENALEX_BASE_URL = os.environ.get('OPENALEX_BASE_URL', 'https://api.openalex.org')
+    OPENALEX_TIMEOUT = float(os.environ.get('OPENALEX_TIMEOUT', 10))
+    OPENALEX_CONCURRENCY = int(os.environ.get('OPENALEX_CONCURRENCY', 5))
+    OPENALEX_RETRIES = int(os.environ.get('OPENALEX_RETRIES', 3))
+    OPENALEX_CACHE_PATH = os.environ.get('OPENALEX_CACHE_PATH', 'openalex_cache.db')  # Empty disables the cache
+    OPENALEX_CACHE_TTL = float(os.environ.get('OPENALEX_CACHE_TTL', 7 * 24 * 3600))
+    OPENALEX_CACHE_MAX_ENTRIES = int(os.environ.get('OPENALEX_CACHE_MAX_ENTRIES', 10000))
+    OPENALEX_OFFLINE = os.environ.get('OPENALEX_OFFLINE', '').lower() in ('1', 'true', 'yes')
+    GENERATION_WORKERS = int(os.environ.get('GENERATION_WORKERS', 2))
+    JOB_RETENTION = float(os.environ.get('JOB_RETENTION', 3600))
+    JOB_STALE_AFTER = float(os.environ.get('JOB_STALE_AFTER', 300))  # Seconds without an event; above OPENAI_TIMEOUT
+    OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-4')
+    OPENAI_TEMPERATURE = float(os.environ.get('OPENAI_TEMPERATURE', 0.7))
+    OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL')  # e.g. a local fake server for tests
+    OPENAI_TIMEOUT = float(os.environ.get('OPENAI_TIMEOUT', 120))
+    LLM_CACHE_PATH = os.environ.get('LLM_CACHE_PATH', 'llm_cache.db')  # Empty disables the cache
+    LLM_CACHE_TTL = float(os.environ.get('LLM_CACHE_TTL', 7 * 24 * 3600))
+    LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 1000))
+    NODE_SUGGESTIONS_PATH = os.environ.get('NODE_SUGGESTIONS_PATH', 'node_suggestions.json')
+    SUGGESTION_BOOST_TTL = float(os.environ.get('SUGGESTION_BOOST_TTL', 300))
+    PROFILING = os.environ.get('PROFILING', '').lower() in ('1', 'true', 'yes')  # Per-request timing and debug logs
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # Lets a scraper read /metrics without logging in
+    SQLITE_PRAGMAS = {}  # Applied on every SQLite connection, e.g. {'journal_mode': 'WAL'}
+    DB_POOL_SIZE = None  # None keeps SQLAlchemy's default pool
+
+class ProductionConfig(Config):
+    """Settings for serving with several workers and threads (see gunicorn.conf.py)."""
+    # Each request thread holds one connection; the overflow covers streamed
+    # responses and background jobs. Keep workers * (size + overflow) below
+    # the server's max_connections on Postgres.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', os.environ.get('WEB_THREADS', 8)))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 4))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # Seconds; under server-side idle timeouts
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 15000)),  # Milliseconds
+    }
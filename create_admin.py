@@ -1,8 +1,8 @@
-from app import app, db
-from models import User
+from app import create_app
+from models import db, User
 
 def create_admin_user(username, password):
-    with app.app_context():
+    with create_app().app_context():
         # Check if user already exists
         user = User.query.filter_by(username=username).first()
         if user:
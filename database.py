@@ -0,0 +1,43 @@
+"""Engine settings for serving many requests at once.
+
+`engine_options` turns the DB_POOL_* settings into SQLAlchemy pool
+arguments. `apply_sqlite_pragmas` sets pragmas on every new SQLite
+connection: in WAL mode readers no longer wait for a writer to commit,
+`synchronous=NORMAL` only syncs at checkpoints (a crash can lose the last
+commits but never corrupts the file), and `busy_timeout` makes a writer
+wait its turn instead of failing with "database is locked".
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def engine_options(config):
+    """Return the pool arguments for the configured database, or {} for the defaults."""
+    if config.get('DB_POOL_SIZE') is None:
+        return {}
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        # One shared in-memory connection; there is no pool to size
+        return {}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': True,
+    }
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Run `PRAGMA name=value` for each of `pragmas` on every connection `engine` opens."""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
@@ -0,0 +1,160 @@
+"""Compact integer-indexed DAG used by the analysis code.
+
+Node ids from the request are mapped once to dense ints and the arcs are
+packed into forward and reverse CSR (compressed sparse row) arrays, so a
+traversal step costs O(degree) instead of a scan over every node.
+"""
+from array import array
+import hashlib
+import json
+import logging
+
+from acyclic import CycleError, TopologicalOrder
+from closure import ClosureIndex, iter_bits
+
+
+class Graph:
+    """Immutable DAG with forward (children) and reverse (parents) CSR adjacency.
+
+    Nodes are the ints 0..n-1; `ids[v]` is the original string id and
+    `index[id]` maps back. Build instances with `build_graph`. Ancestor and
+    descendant queries go through a `ClosureIndex` built on first use.
+    """
+    __slots__ = ('ids', 'index', 'out_ptr', 'out_idx', 'in_ptr', 'in_idx', '_closure')
+
+    def __init__(self, ids, arcs):
+        self.ids = list(ids)
+        self.index = {node: v for v, node in enumerate(self.ids)}
+        self.out_ptr, self.out_idx = _pack(len(self.ids), arcs, 0)
+        self.in_ptr, self.in_idx = _pack(len(self.ids), arcs, 1)
+        self._closure = None
+
+    @property
+    def closure(self):
+        if self._closure is None:
+            self._closure = ClosureIndex.from_graph(self)
+        return self._closure
+
+    @closure.setter
+    def closure(self, index):
+        self._closure = index
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, node):
+        return node in self.index
+
+    @property
+    def nodes(self):
+        return list(self.ids)
+
+    @property
+    def arcs(self):
+        return [(self.ids[v], self.ids[w]) for v in range(len(self.ids)) for w in self.children(v)]
+
+    def children(self, v):
+        return self.out_idx[self.out_ptr[v]:self.out_ptr[v + 1]]
+
+    def parents(self, v):
+        return self.in_idx[self.in_ptr[v]:self.in_ptr[v + 1]]
+
+    def has_arc(self, v, w):
+        return w in self.children(v)
+
+    def ancestors(self, vs):
+        """Return the ancestors of the ints `vs`, including `vs` themselves."""
+        return set(iter_bits(self.closure.ancestor_bits(vs)))
+
+    def descendants(self, vs):
+        """Return the descendants of the ints `vs`, including `vs` themselves."""
+        return set(iter_bits(self.closure.descendant_bits(vs)))
+
+    def mediators(self, cause, outcome):
+        """Return the ints on a directed path from `cause` to `outcome`, excluding both."""
+        return set(iter_bits(self.closure.mediator_bits(cause, outcome)))
+
+    def is_ancestor_of(self, v, w):
+        return self.closure.is_ancestor_of(v, w)
+
+
+def build_graph(nodes, edges):
+    """Build a Graph from request data, skipping edges that would create a cycle."""
+    ids = []
+    index = {}
+    for node in nodes:
+        node_id = str(node['id'])
+        if node_id not in index:
+            index[node_id] = len(ids)
+            ids.append(node_id)
+    arcs = []
+    seen = set()
+    for edge in edges:
+        arc = (index.get(str(edge['from'])), index.get(str(edge['to'])))
+        if None not in arc and arc not in seen:
+            seen.add(arc)
+            arcs.append(arc)
+    if not _is_acyclic(len(ids), arcs):
+        arcs = _acyclic_subset(ids, arcs)
+    return Graph(ids, arcs)
+
+
+def structure_hash(nodes, edges):
+    """Return a canonical hash of the graph structure in request data.
+
+    Only node ids and edge endpoints count, so relabelling or annotating a
+    node does not change the hash, and neither does the order of the lists.
+    """
+    node_ids = sorted({str(node['id']) for node in nodes})
+    arcs = sorted({(str(edge['from']), str(edge['to'])) for edge in edges})
+    payload = json.dumps([node_ids, arcs], separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _pack(n, arcs, key):
+    # Counting sort of the arcs by their `key` end into (pointer, index) arrays
+    ptr = array('i', bytes(4 * (n + 1)))
+    for arc in arcs:
+        ptr[arc[key] + 1] += 1
+    for v in range(n):
+        ptr[v + 1] += ptr[v]
+    idx = array('i', bytes(4 * len(arcs)))
+    fill = ptr[:-1]
+    for arc in arcs:
+        v = arc[key]
+        idx[fill[v]] = arc[1 - key]
+        fill[v] += 1
+    return ptr, idx
+
+
+def _is_acyclic(n, arcs):
+    # Kahn's algorithm: every node is removed iff there is no cycle
+    indegree = [0] * n
+    children = [[] for _ in range(n)]
+    for v, w in arcs:
+        children[v].append(w)
+        indegree[w] += 1
+    stack = [v for v in range(n) if indegree[v] == 0]
+    removed = 0
+    while stack:
+        v = stack.pop()
+        removed += 1
+        for w in children[v]:
+            indegree[w] -= 1
+            if indegree[w] == 0:
+                stack.append(w)
+    return removed == n
+
+
+def _acyclic_subset(ids, arcs):
+    # Slow path for cyclic input: add arcs in order, dropping any that closes a cycle
+    order = TopologicalOrder()
+    kept = []
+    for v, w in arcs:
+        try:
+            order.add_edge(v, w)
+        except CycleError:
+            logging.warning(f"Warning: Could not add edge {ids[v]}->{ids[w]}: would create a cycle")
+            continue
+        kept.append((v, w))
+    return kept
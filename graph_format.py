@@ -0,0 +1,300 @@
+"""Compact binary interchange format for graphs.
+
+The JSON shape {"nodes": [...], "edges": [...]} is stored column by column:
+
+    header     magic, version, flags, counts and sizes (see HEADER)
+    nodes      int32 id, label, title, extra          (one column each)
+    edges      int32 source, target, id, extra
+    strings    uint32 start offsets, plus the end of the table
+    id kinds   uint8 per node, then uint8 per edge
+    blob       the strings in UTF-8, each followed by a NUL byte
+    extras     one JSON array
+
+Labels, titles and string ids are indexes into a deduplicated string table,
+integer ids are stored inline, and edge endpoints are node indexes, so the
+edge list is two packed int32 arrays that can be read in place, e.g.
+``np.frombuffer(PackedGraph(data).sources, dtype='<i4')``. Any other fields
+go into the extras array (the `extra` columns index it, -1 for none), which
+lets the format round-trip whatever the JSON export can hold. Everything
+after the header may be zlib-compressed. Integers are little-endian.
+"""
+import itertools
+import json
+import struct
+import sys
+import zlib
+from array import array
+
+MIMETYPE = 'application/vnd.autodag.graph'
+EXTENSION = '.dagb'
+MAGIC = b'DAGB'
+VERSION = 1
+COMPRESSED = 0x01
+# magic, version, flags, reserved, nodes, edges, strings, blob bytes, extras bytes, document extra
+HEADER = struct.Struct('<4sBBHIIIIIi')
+
+# How an id is stored in its int32 column
+MISSING, STRING, INTEGER, JSON = range(4)
+INT32_MIN, INT32_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+class GraphFormatError(ValueError):
+    """Data that is not a valid packed graph."""
+
+
+def is_packed(data):
+    """Whether `data` starts like a packed graph."""
+    return bytes(data[:len(MAGIC)]) == MAGIC
+
+
+class _Extras:
+
+    def __init__(self):
+        self.values = []
+        self._seen = {}
+
+    def add(self, element, packed):
+        if element.keys() <= packed:
+            return -1
+        rest = {key: value for key, value in element.items() if key not in packed}
+        try:
+            # Repeated extras (edge arrows, colours) are stored once; keyed on
+            # their JSON so that true, 1 and 1.0 stay apart
+            key = json.dumps(rest)
+            i = self._seen.get(key)
+        except (TypeError, ValueError):
+            key = i = None
+        if i is None:
+            i = len(self.values)
+            self.values.append(rest)
+            if key is not None:
+                self._seen[key] = i
+        return i
+
+
+def _int32s(values):
+    column = array('i', values)
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column.tobytes()
+
+
+def _pack_id(value, strings):
+    if type(value) is str:
+        return STRING, strings.setdefault(value, len(strings))
+    if type(value) is int and INT32_MIN <= value <= INT32_MAX:
+        return INTEGER, value
+    value = json.dumps(value)
+    return JSON, strings.setdefault(value, len(strings))
+
+
+def _pack_strings(strings):
+    text = '\0'.join(strings) + '\0' if strings else ''
+    blob = text.encode('utf-8')
+    lengths = (len(s) + 1 for s in strings) if len(blob) == len(text) else \
+        (len(s.encode('utf-8')) + 1 for s in strings)
+    return blob, itertools.accumulate(lengths, initial=0)
+
+
+def encode_graph(content, compress=True, level=1):
+    """Return `content` ({"nodes", "edges", ...}) as packed bytes."""
+    nodes = content.get('nodes', [])
+    edges = content.get('edges', [])
+    # The string table, in first-seen order: {string: index}
+    strings = {}
+    extras = _Extras()
+
+    # Ids that edges can point at, split by type so 1 and '1' stay apart
+    index = {str: {}, int: {}}
+    node_ids, node_kinds, labels, titles, node_extras = [], bytearray(), [], [], []
+    for i, node in enumerate(nodes):
+        if 'id' in node:
+            node_id = node['id']
+            kind, value = _pack_id(node_id, strings)
+            if type(node_id) in index:
+                index[type(node_id)].setdefault(node_id, i)
+        else:
+            kind, value = MISSING, -1
+        node_kinds.append(kind)
+        node_ids.append(value)
+        packed = {'id'}
+        label = node.get('label')
+        if type(label) is str:
+            labels.append(strings.setdefault(label, len(strings)))
+            packed.add('label')
+        else:
+            labels.append(-1)
+        title = node.get('title')
+        if type(title) is str:
+            titles.append(strings.setdefault(title, len(strings)))
+            packed.add('title')
+        else:
+            titles.append(-1)
+        node_extras.append(extras.add(node, packed))
+
+    sources, targets, edge_ids, edge_kinds, edge_extras = [], [], [], bytearray(), []
+    for edge in edges:
+        if 'id' in edge:
+            kind, value = _pack_id(edge['id'], strings)
+        else:
+            kind, value = MISSING, -1
+        edge_kinds.append(kind)
+        edge_ids.append(value)
+        packed = {'id'}
+        # Endpoints that are not exactly a node id stay in the extras
+        endpoint = edge.get('from')
+        i = index[type(endpoint)].get(endpoint, -1) if type(endpoint) in index else -1
+        sources.append(i)
+        if i >= 0:
+            packed.add('from')
+        endpoint = edge.get('to')
+        i = index[type(endpoint)].get(endpoint, -1) if type(endpoint) in index else -1
+        targets.append(i)
+        if i >= 0:
+            packed.add('to')
+        edge_extras.append(extras.add(edge, packed))
+
+    document = {key: value for key, value in content.items() if key not in ('nodes', 'edges')}
+    document_extra = extras.add(document, set())
+    blob, offsets = _pack_strings(list(strings))
+    extras_json = json.dumps(extras.values).encode('utf-8')
+    body = b''.join((
+        _int32s(node_ids), _int32s(labels), _int32s(titles), _int32s(node_extras),
+        _int32s(sources), _int32s(targets), _int32s(edge_ids), _int32s(edge_extras),
+        _int32s(offsets), bytes(node_kinds), bytes(edge_kinds), blob, extras_json,
+    ))
+    flags = 0
+    if compress:
+        body = zlib.compress(body, level)
+        flags |= COMPRESSED
+    header = HEADER.pack(MAGIC, VERSION, flags, 0, len(nodes), len(edges), len(strings), len(blob),
+                         len(extras_json), document_extra)
+    return header + body
+
+
+class PackedGraph:
+    """Read access to packed graph bytes.
+
+    The columns (`node_ids`, `labels`, `titles`, `sources`, `targets`, ...)
+    are int32 memoryviews into the data, or into the decompressed body when
+    it was compressed; nothing is copied or parsed until asked for.
+    """
+
+    def __init__(self, data):
+        view = memoryview(data)
+        if len(view) < HEADER.size or not is_packed(view):
+            raise GraphFormatError('Not a packed graph')
+        _, version, flags, _, n, m, count, blob_size, extras_size, self._document_extra = HEADER.unpack_from(view)
+        if version != VERSION:
+            raise GraphFormatError(f'Unsupported packed graph version {version}')
+        body = view[HEADER.size:]
+        size = 4 * (4 * n + 4 * m + count + 1) + n + m + blob_size + extras_size
+        if flags & COMPRESSED:
+            # Never inflate past the size the header promises
+            decompressor = zlib.decompressobj()
+            try:
+                body = memoryview(decompressor.decompress(body, size))
+            except zlib.error as e:
+                raise GraphFormatError(f'Corrupt packed graph: {e}')
+            if not decompressor.eof or decompressor.unconsumed_tail or decompressor.unused_data:
+                raise GraphFormatError('Corrupt packed graph: the body does not match the header')
+        if len(body) != size:
+            raise GraphFormatError('Truncated packed graph')
+        self.node_count = n
+        self.edge_count = m
+
+        columns = [self._int32s(body, 4 * i * n, n) for i in range(4)]
+        columns += [self._int32s(body, 4 * (4 * n + i * m), m) for i in range(4)]
+        self.node_ids, self.labels, self.titles, self.node_extras = columns[:4]
+        self.sources, self.targets, self.edge_ids, self.edge_extras = columns[4:]
+        pos = 4 * (4 * n + 4 * m)
+        self.offsets = self._int32s(body, pos, count + 1)
+        pos += 4 * (count + 1)
+        self.node_id_kinds = body[pos:pos + n]
+        self.edge_id_kinds = body[pos + n:pos + n + m]
+        pos += n + m
+        self.blob = body[pos:pos + blob_size]
+        self._extras = body[pos + blob_size:]
+
+    @staticmethod
+    def _int32s(body, start, count):
+        column = body[start:start + 4 * count].cast('i')
+        if sys.byteorder == 'big':
+            swapped = array('i', column)
+            swapped.byteswap()
+            return memoryview(swapped)
+        return column
+
+    def string(self, i):
+        """Return entry `i` of the string table."""
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1] - 1], 'utf-8')
+
+    def strings(self):
+        """Return the whole string table, decoded."""
+        strings = str(self.blob, 'utf-8').split('\0')[:-1]
+        if len(strings) != len(self.offsets) - 1:
+            # A string with a NUL of its own; fall back to the offsets
+            strings = [self.string(i) for i in range(len(self.offsets) - 1)]
+        return strings
+
+    def extras(self):
+        """Return the extras array, decoded."""
+        return json.loads(str(self._extras, 'utf-8')) if len(self._extras) else []
+
+    def to_content(self):
+        """Rebuild the {"nodes", "edges", ...} dict the data was encoded from."""
+        try:
+            return self._to_content()
+        except (IndexError, KeyError, UnicodeDecodeError, ValueError) as e:
+            raise GraphFormatError(f'Corrupt packed graph: {e}')
+
+    def _to_content(self):
+        strings = self.strings()
+        extras = self.extras()
+
+        def unpack_id(kind, value):
+            if kind == STRING:
+                return strings[value]
+            if kind == INTEGER:
+                return value
+            return json.loads(strings[value])
+
+        content = dict(extras[self._document_extra]) if self._document_extra >= 0 else {}
+        nodes = []
+        node_ids = []
+        for kind, value, label, title, extra in zip(self.node_id_kinds, self.node_ids, self.labels, self.titles,
+                                                    self.node_extras):
+            node = {}
+            node_id = None
+            if kind != MISSING:
+                node['id'] = node_id = strings[value] if kind == STRING else unpack_id(kind, value)
+            if label >= 0:
+                node['label'] = strings[label]
+            if title >= 0:
+                node['title'] = strings[title]
+            if extra >= 0:
+                node.update(extras[extra])
+            nodes.append(node)
+            node_ids.append(node_id)
+
+        edges = []
+        for kind, value, source, target, extra in zip(self.edge_id_kinds, self.edge_ids, self.sources, self.targets,
+                                                      self.edge_extras):
+            edge = {}
+            if kind != MISSING:
+                edge['id'] = strings[value] if kind == STRING else unpack_id(kind, value)
+            if source >= 0:
+                edge['from'] = node_ids[source]
+            if target >= 0:
+                edge['to'] = node_ids[target]
+            if extra >= 0:
+                edge.update(extras[extra])
+            edges.append(edge)
+        content['nodes'] = nodes
+        content['edges'] = edges
+        return content
+
+
+def decode_graph(data):
+    """Return the {"nodes", "edges", ...} dict packed in `data`."""
+    return PackedGraph(data).to_content()
@@ -0,0 +1,139 @@
+"""Row-per-node and row-per-edge copies of project graphs.
+
+`Project.content` stays the source of truth for loading a project; the
+ProjectNode and ProjectEdge rows mirror it so that searches, statistics and
+analysis can be answered in SQL without parsing the document. Rows are
+written in the same transaction as the content, and only the elements that
+changed since the previous content are touched. The project's closure index
+(ProjectClosure) is kept here too, rebuilt only when the structure changes.
+"""
+import json
+
+from sqlalchemy import delete, func, insert, or_, select
+
+from closure import ClosureIndex
+from graph import build_graph, structure_hash
+from models import ProjectClosure, ProjectNode, ProjectEdge
+
+# Stay well under SQLite's limit on bound parameters per statement
+CHUNK_SIZE = 500
+
+
+def _key(element):
+    # Elements are matched by id; the rare id-less edge is matched by value
+    if 'id' in element:
+        return str(element['id'])
+    return 'json:' + json.dumps(element, sort_keys=True)
+
+
+def _by_key(elements):
+    return {_key(element): element for element in elements}
+
+
+def node_row(project_id, node):
+    return {
+        'project_id': project_id,
+        'node_id': _key(node),
+        'label': node.get('label'),
+        'data': json.dumps(node),
+    }
+
+
+def edge_row(project_id, edge):
+    return {
+        'project_id': project_id,
+        'edge_id': _key(edge),
+        'source': str(edge.get('from')),
+        'target': str(edge.get('to')),
+        'data': json.dumps(edge),
+    }
+
+
+def _changes(old, new):
+    old, new = _by_key(old), _by_key(new)
+    removed = [key for key, element in old.items() if new.get(key) != element]
+    added = [element for key, element in new.items() if old.get(key) != element]
+    return removed, added
+
+
+def sync_graph_rows(session, project_id, old_content, new_content):
+    """Bring the rows of one project from `old_content` in line with `new_content`.
+
+    Pass None as `old_content` when the project has no rows yet.
+    """
+    old_content = old_content or {}
+    for model, key_column, row, name in (
+        (ProjectNode, ProjectNode.node_id, node_row, 'nodes'),
+        (ProjectEdge, ProjectEdge.edge_id, edge_row, 'edges'),
+    ):
+        removed, added = _changes(old_content.get(name, []), new_content.get(name, []))
+        for i in range(0, len(removed), CHUNK_SIZE):
+            session.execute(delete(model).where(
+                model.project_id == project_id, key_column.in_(removed[i:i + CHUNK_SIZE])))
+        rows = [row(project_id, element) for element in added]
+        for i in range(0, len(rows), CHUNK_SIZE):
+            session.execute(insert(model.__table__), rows[i:i + CHUNK_SIZE])
+
+
+def refresh_project_closure(project, content):
+    """Store the closure index of `content` with `project` unless its structure hash is unchanged.
+
+    Rebuilding takes less time than loading the stored index to patch it, so
+    a changed structure always gets a fresh index.
+    """
+    nodes = content.get('nodes', [])
+    edges = content.get('edges', [])
+    graph_hash = structure_hash(nodes, edges)
+    if project.closure is not None and project.closure.structure_hash == graph_hash:
+        return
+    data = ClosureIndex.from_graph(build_graph(nodes, edges)).to_bytes()
+    if project.closure is None:
+        project.closure = ProjectClosure(structure_hash=graph_hash, data=data)
+    else:
+        project.closure.structure_hash = graph_hash
+        project.closure.data = data
+
+
+def replace_graph_rows(session, project_id, content):
+    """Rewrite every row of one project from `content`."""
+    bulk_replace_graph_rows(session, {project_id: content})
+
+
+def bulk_replace_graph_rows(session, contents):
+    """Rewrite the rows of many projects at once from {project_id: content}."""
+    project_ids = list(contents)
+    for model in (ProjectNode, ProjectEdge):
+        for i in range(0, len(project_ids), CHUNK_SIZE):
+            session.execute(delete(model).where(model.project_id.in_(project_ids[i:i + CHUNK_SIZE])))
+    for model, row, name in ((ProjectNode, node_row, 'nodes'), (ProjectEdge, edge_row, 'edges')):
+        # Node ids are unique per project, so later duplicates replace earlier ones
+        rows = {}
+        for project_id, content in contents.items():
+            for element in content.get(name, []):
+                rows[(project_id, _key(element))] = row(project_id, element)
+        rows = list(rows.values())
+        for i in range(0, len(rows), CHUNK_SIZE):
+            session.execute(insert(model.__table__), rows[i:i + CHUNK_SIZE])
+
+
+def edges_touching(session, project_id, node_id):
+    """Return the stored edges into or out of `node_id`."""
+    query = select(ProjectEdge.data).where(
+        ProjectEdge.project_id == project_id,
+        or_(ProjectEdge.source == node_id, ProjectEdge.target == node_id),
+    )
+    return [json.loads(data) for data in session.scalars(query)]
+
+
+def degree_histogram(session, project_id, direction='in'):
+    """Return {degree: number of nodes} for in- or out-degree, computed in SQL."""
+    endpoint = ProjectEdge.target if direction == 'in' else ProjectEdge.source
+    degrees = (
+        select(ProjectNode.node_id, func.count(ProjectEdge.id).label('degree'))
+        .outerjoin(ProjectEdge, (ProjectEdge.project_id == ProjectNode.project_id) & (endpoint == ProjectNode.node_id))
+        .where(ProjectNode.project_id == project_id)
+        .group_by(ProjectNode.node_id)
+        .subquery()
+    )
+    query = select(degrees.c.degree, func.count()).group_by(degrees.c.degree).order_by(degrees.c.degree)
+    return {degree: count for degree, count in session.execute(query)}
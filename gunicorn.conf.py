@@ -0,0 +1,47 @@
+"""Gunicorn settings for `gunicorn -c gunicorn.conf.py wsgi:app`.
+
+Sizing:
+
+- Workers (WEB_CONCURRENCY, default: one per CPU). The analysis code is
+  pure Python and holds the GIL, so CPU-bound requests only run in
+  parallel across worker processes.
+- Threads per worker (WEB_THREADS, default 8). Most requests wait on the
+  database or stream a response, and a job's event stream holds a thread
+  until the job ends, so each worker serves several at once.
+- Database connections. Each worker has its own pool of DB_POOL_SIZE
+  (default WEB_THREADS) plus DB_MAX_OVERFLOW connections; on Postgres keep
+  workers * (pool size + overflow) below max_connections. SQLite runs in
+  WAL mode, which lets any number of readers work alongside the single
+  writer, but writes still take turns.
+- Batch requests start BATCH_WORKERS processes each; with several
+  workers, lower BATCH_WORKERS so they do not compete for the same CPUs.
+
+Caches and metrics are kept per worker. AI generation jobs run on the
+worker that received them, but their status and events are stored in the
+database, so any worker can serve the job routes. The event stream polls
+for new events and holds a thread for as long as the job runs.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 8))
+# Generous: adjustment set searches and batches may run for a while
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+accesslog = '-'
+
+
+def on_starting(server):
+    # create_app creates and upgrades the schema: do it once here, so the
+    # workers starting together find nothing left to alter
+    from app import create_app
+    from config import ProductionConfig
+    from models import db
+
+    app = create_app(ProductionConfig)
+    with app.app_context():
+        db.engine.dispose()
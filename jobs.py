@@ -0,0 +1,189 @@
+"""Background jobs for long-running requests such as AI graph generation.
+
+A job runs on a thread pool outside the request. It records an ordered list
+of events (progress messages, then a final result or error), which clients
+can poll through the status endpoint or follow as Server-Sent Events.
+
+Jobs and their events live in the database (the generation_job tables), so
+under several server processes any of them can report on a job, not only
+the one running it.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import json
+import logging
+import time
+import uuid
+
+from sqlalchemy import delete, insert, select, update
+
+from models import db, utcnow, GenerationJob, GenerationJobEvent
+
+job_table = GenerationJob.__table__
+event_table = GenerationJobEvent.__table__
+
+
+class Job:
+    """One background job: the running code writes its events, requests read them."""
+
+    def __init__(self, engine, id, owner_id, status='queued', result=None, error=None, poll_interval=0.25,
+                 stale_after=None):
+        self.engine = engine
+        self.id = id
+        self.owner_id = owner_id
+        self.status = status
+        self.result = result
+        self.error = error
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+
+    def emit(self, event, data):
+        """Record an event of any type, e.g. partial results streamed to the client."""
+        with self.engine.begin() as conn:
+            conn.execute(insert(event_table).values(job_id=self.id, event=event, data=json.dumps(data)))
+
+    def progress(self, stage, message, **data):
+        """Record a progress step; extra keyword data is passed to the client as is."""
+        self.emit('progress', dict(data, stage=stage, message=message))
+
+    def _set_status(self, conn, status, **values):
+        self.status = status
+        conn.execute(update(job_table).where(job_table.c.id == self.id).values(status=status, **values))
+
+    def start(self):
+        with self.engine.begin() as conn:
+            self._set_status(conn, 'running')
+
+    def finish(self, result):
+        self.result = result
+        with self.engine.begin() as conn:
+            self._set_status(conn, 'done', result=json.dumps(result), finished_at=utcnow())
+            conn.execute(insert(event_table).values(job_id=self.id, event='done', data=json.dumps(result)))
+
+    def fail(self, error):
+        self.error = error
+        with self.engine.begin() as conn:
+            self._set_status(conn, 'failed', error=error, finished_at=utcnow())
+            conn.execute(insert(event_table).values(job_id=self.id, event='error', data=json.dumps({'error': error})))
+
+    def abandon(self, error):
+        """Fail the job unless it already finished, e.g. when the process running it died."""
+        with self.engine.begin() as conn:
+            failed = conn.execute(
+                update(job_table)
+                .where(job_table.c.id == self.id, job_table.c.status.in_(('queued', 'running')))
+                .values(status='failed', error=error, finished_at=utcnow())
+            ).rowcount
+            if failed:
+                conn.execute(insert(event_table).values(job_id=self.id, event='error', data=json.dumps({'error': error})))
+        if failed:
+            self.status = 'failed'
+            self.error = error
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def to_dict(self):
+        with self.engine.connect() as conn:
+            progress = conn.execute(
+                select(event_table.c.data)
+                .where(event_table.c.job_id == self.id, event_table.c.event == 'progress')
+                .order_by(event_table.c.id.desc()).limit(1)
+            ).scalar()
+        return {
+            'id': self.id,
+            'status': self.status,
+            'progress': json.loads(progress) if progress is not None else None,
+            'result': self.result,
+            'error': self.error,
+        }
+
+    def events_after(self, last_id):
+        """Return [(event id, event, data)] for the events after `last_id`, oldest first."""
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                select(event_table.c.id, event_table.c.event, event_table.c.data)
+                .where(event_table.c.job_id == self.id, event_table.c.id > last_id)
+                .order_by(event_table.c.id)
+            ).all()
+        return [(row.id, row.event, json.loads(row.data)) for row in rows]
+
+    def stream(self, keepalive=15):
+        """Yield the job's events formatted as Server-Sent Events until it finishes.
+
+        A job with no new event for `stale_after` seconds is taken to have
+        lost its worker (a crash or restart) and is failed, which ends the
+        stream with an error event.
+        """
+        last_id = 0
+        quiet_since = last_event = time.monotonic()
+        while True:
+            new_events = self.events_after(last_id)
+            if not new_events and self.stale_after is not None and time.monotonic() - last_event >= self.stale_after:
+                error = f'No progress for {self.stale_after:g} seconds; the job was abandoned'
+                self.abandon(error)
+                # The final event, whoever wrote it; a job pruned meanwhile has none
+                new_events = self.events_after(last_id) or [(last_id, 'error', {'error': error})]
+            if not new_events:
+                if time.monotonic() - quiet_since >= keepalive:
+                    yield ': keepalive\n\n'
+                    quiet_since = time.monotonic()
+                time.sleep(self.poll_interval)
+                continue
+            for last_id, event, data in new_events:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+                if event in ('done', 'error'):
+                    return
+            quiet_since = last_event = time.monotonic()
+
+
+class JobQueue:
+    """Runs jobs on a bounded thread pool and keeps finished ones for `retention` seconds.
+
+    Jobs run inside an app context of `app`, on the process that submitted
+    them; `get` finds a job whichever process asks. Streams give up on a job
+    after `stale_after` seconds without an event (see Job.stream).
+    """
+
+    def __init__(self, app, workers=2, retention=3600, stale_after=None):
+        self.app = app
+        self.retention = retention
+        self.stale_after = stale_after
+        with app.app_context():
+            self.engine = db.engine
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+
+    def submit(self, owner_id, fn, *args):
+        """Start `fn(job, *args)` in the background; its return value becomes the job result."""
+        job = Job(self.engine, uuid.uuid4().hex, owner_id, stale_after=self.stale_after)
+        with self.engine.begin() as conn:
+            self._prune(conn)
+            conn.execute(insert(job_table).values(id=job.id, owner_id=owner_id, status=job.status, created_at=utcnow()))
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def get(self, job_id):
+        with self.engine.connect() as conn:
+            row = conn.execute(select(job_table).where(job_table.c.id == job_id)).first()
+        if row is None:
+            return None
+        return Job(self.engine, row.id, row.owner_id, row.status,
+                   json.loads(row.result) if row.result is not None else None, row.error,
+                   stale_after=self.stale_after)
+
+    def _run(self, job, fn, args):
+        try:
+            job.start()
+            with self.app.app_context():
+                result = fn(job, *args)
+            job.finish(result)
+        except Exception as e:
+            logging.error(f"Job {job.id} failed: {str(e)}")
+            job.fail(str(e))
+
+    def _prune(self, conn):
+        cutoff = utcnow() - timedelta(seconds=self.retention)
+        expired = select(job_table.c.id).where(job_table.c.finished_at < cutoff)
+        conn.execute(delete(event_table).where(event_table.c.job_id.in_(expired)))
+        conn.execute(delete(job_table).where(job_table.c.finished_at < cutoff))
@@ -0,0 +1,138 @@
+"""Layered (Sugiyama-style) layout of a DAG, computed with NumPy.
+
+The three classic phases run on whole arrays at a time:
+
+1. Layering: longest-path layers, peeled off the graph one source frontier
+   at a time.
+2. Crossing reduction: edges spanning several layers are split by dummy
+   nodes, then layers are reordered by barycentre in alternating sweeps.
+3. Coordinates: nodes are pulled towards the mean of their neighbours, and
+   running maxima and minima restore the minimum gap within each layer.
+
+Only the real nodes' positions are returned; the dummies just keep long
+edges straight and out of the way during ordering.
+"""
+import numpy as np
+
+
+def _arrays(graph):
+    n = len(graph)
+    out_ptr = np.frombuffer(graph.out_ptr, dtype=np.int32) if n else np.zeros(1, dtype=np.int32)
+    targets = np.frombuffer(graph.out_idx, dtype=np.int32).astype(np.int64) if len(graph.out_idx) else \
+        np.zeros(0, dtype=np.int64)
+    sources = np.repeat(np.arange(n), np.diff(out_ptr))
+    return n, sources, targets
+
+
+def assign_layers(n, sources, targets):
+    """Return the longest-path layer of every node (sources are layer 0)."""
+    layer = np.zeros(n, dtype=np.int64)
+    indegree = np.bincount(targets, minlength=n)
+    done = np.zeros(n, dtype=bool)
+    frontier = indegree == 0
+    depth = 0
+    while frontier.any():
+        layer[frontier] = depth
+        done |= frontier
+        leaving = frontier[sources]
+        indegree = indegree - np.bincount(targets[leaving], minlength=n)
+        frontier = (indegree == 0) & ~done
+        depth += 1
+    return layer
+
+
+def split_long_edges(n, sources, targets, layer):
+    """Insert dummy nodes so that every edge joins consecutive layers.
+
+    Returns (node count including dummies, edge sources, edge targets,
+    layer of every node).
+    """
+    span = layer[targets] - layer[sources]
+    long = span > 1
+    if not long.any():
+        return n, sources, targets, layer
+    short_sources, short_targets = sources[~long], targets[~long]
+    long_sources, long_targets, long_span = sources[long], targets[long], span[long]
+    # Edge i of span k becomes a chain source -> d1 -> ... -> d(k-1) -> target
+    dummies = long_span - 1
+    total = int(dummies.sum())
+    dummy_ids = n + np.arange(total)
+    edge_of = np.repeat(np.arange(len(long_span)), dummies)
+    first = np.concatenate(([0], np.cumsum(dummies)[:-1]))
+    step = np.arange(total) - first[edge_of] + 1
+    dummy_layer = layer[long_sources][edge_of] + step
+    chain_sources = np.where(step == 1, long_sources[edge_of], dummy_ids - 1)
+    last = step == dummies[edge_of]
+    all_sources = np.concatenate((short_sources, chain_sources, dummy_ids[last]))
+    all_targets = np.concatenate((short_targets, dummy_ids, long_targets))
+    return n + total, all_sources, all_targets, np.concatenate((layer, dummy_layer))
+
+
+def _rank_within_layers(layer, key):
+    """Return each node's position within its layer when sorted by `key`."""
+    order = np.lexsort((key, layer))
+    rank = np.empty_like(order)
+    counts = np.bincount(layer)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    rank[order] = np.arange(len(order)) - starts[layer[order]]
+    return rank
+
+
+def reduce_crossings(n, sources, targets, layer, sweeps=4):
+    """Order the nodes of each layer by barycentre sweeps; returns in-layer positions."""
+    position = _rank_within_layers(layer, np.arange(n)).astype(float)
+    depth = int(layer.max()) + 1 if n else 0
+    # Edges grouped by the layer they leave from
+    edge_layer = layer[sources]
+    by_layer = np.argsort(edge_layer, kind='stable')
+    bounds = np.searchsorted(edge_layer[by_layer], np.arange(depth + 1))
+    for sweep in range(sweeps):
+        downward = sweep % 2 == 0
+        for current in (range(1, depth) if downward else range(depth - 2, -1, -1)):
+            edges = by_layer[bounds[current - 1]:bounds[current]] if downward else \
+                by_layer[bounds[current]:bounds[current + 1]]
+            moving, fixed = (targets[edges], sources[edges]) if downward else (sources[edges], targets[edges])
+            nodes = np.flatnonzero(layer == current)
+            weight = np.bincount(moving, weights=position[fixed], minlength=n)[nodes]
+            degree = np.bincount(moving, minlength=n)[nodes]
+            # Nodes without neighbours on the fixed side keep their place
+            barycentre = np.where(degree > 0, weight / np.maximum(degree, 1), position[nodes])
+            order = np.lexsort((position[nodes], barycentre))
+            position[nodes[order]] = np.arange(len(nodes))
+    return position
+
+
+def assign_coordinates(n, sources, targets, layer, position, node_gap, iterations=8):
+    """Place nodes horizontally, keeping in-layer order and at least `node_gap` apart."""
+    x = position * node_gap
+    order = np.lexsort((position, layer))
+    sorted_layer = layer[order]
+    # Gap-free coordinates: x minus the room taken by the nodes to the left
+    offset = (np.arange(n) - np.searchsorted(sorted_layer, sorted_layer)) * node_gap
+    degree = np.bincount(sources, minlength=n) + np.bincount(targets, minlength=n)
+    for _ in range(iterations):
+        pull = np.bincount(sources, weights=x[targets], minlength=n) + \
+            np.bincount(targets, weights=x[sources], minlength=n)
+        x = np.where(degree > 0, (x + pull / np.maximum(degree, 1)) / 2, x)
+        free = x[order] - offset
+        # Restore the gap with a running maximum (pushing right) and a running
+        # minimum (pushing left) per layer; their mean keeps the gap and stays
+        # centred. Lifting each layer above the last makes one pass do all.
+        lift = sorted_layer * (free.max() - free.min() + 1)
+        right = np.maximum.accumulate(free + lift) - lift
+        left = np.minimum.accumulate((free + lift)[::-1])[::-1] - lift
+        x[order] = (right + left) / 2 + offset
+    return x - x.min()
+
+
+def sugiyama_layout(graph, node_gap=150, layer_gap=120, sweeps=4):
+    """Return {node id: {'x': x, 'y': y}} for a `graph.Graph`, layers running top to bottom."""
+    n, sources, targets = _arrays(graph)
+    if n == 0:
+        return {}
+    layer = assign_layers(n, sources, targets)
+    total, sources, targets, layer = split_long_edges(n, sources, targets, layer)
+    position = reduce_crossings(total, sources, targets, layer, sweeps)
+    x = assign_coordinates(total, sources, targets, layer, position, node_gap)
+    y = layer * layer_gap
+    return {graph.ids[v]: {'x': round(float(x[v]), 1), 'y': float(y[v])} for v in range(n)}
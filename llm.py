@@ -0,0 +1,348 @@
+"""GPT-backed graph generation.
+
+The completion is streamed and fed through an incremental JSON parser, so
+each node and edge can be handed to the caller as soon as its object is
+complete, and whatever parsed cleanly survives a truncated response.
+Complete responses are cached, and identical requests that arrive while one
+is in flight wait for it instead of calling the API again.
+"""
+from concurrent.futures import Future
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from openai import OpenAI
+
+from cache import SQLiteTTLCache
+
+
+class GraphStreamParser:
+    """Incrementally extract the elements of the 'nodes' and 'edges' arrays.
+
+    Text before the first '{' (prose, code fences) is skipped, as is anything
+    after the top-level object closes. `feed` returns the (kind, item) pairs
+    completed by the new text, where kind is 'node' or 'edge'.
+    """
+    KINDS = {'nodes': 'node', 'edges': 'edge'}
+
+    def __init__(self):
+        self.text = ''
+        self.nodes = []
+        self.edges = []
+        self.complete = False
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._key = None
+        self._item_start = None
+
+    def feed(self, chunk):
+        self.text += chunk
+        items = []
+        while self._pos < len(self.text) and not self.complete:
+            i = self._pos
+            char = self.text[i]
+            self._pos += 1
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_string = json.loads(self.text[self._string_start:i + 1])
+                continue
+            if not self._stack:
+                if char == '{':
+                    self._stack.append(char)
+                continue
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char == ':' and len(self._stack) == 1:
+                self._key = self._last_string
+            elif char in '{[':
+                self._stack.append(char)
+                if len(self._stack) == 3 and char == '{' and self._key in self.KINDS:
+                    self._item_start = i
+            elif char in '}]':
+                self._stack.pop()
+                if len(self._stack) == 2 and self._item_start is not None:
+                    item = self._parse(self.text[self._item_start:i + 1])
+                    self._item_start = None
+                    if item is not None:
+                        kind = self.KINDS[self._key]
+                        (self.nodes if kind == 'node' else self.edges).append(item)
+                        items.append((kind, item))
+                elif not self._stack:
+                    self.complete = True
+        return items
+
+    @staticmethod
+    def _parse(text):
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError:
+            return None
+        return item if isinstance(item, dict) else None
+
+    def result(self):
+        """Return the parsed graph: the whole object if it is valid JSON, else the items so far.
+
+        In the second case the result is marked `truncated`.
+        """
+        if self.complete:
+            start = self.text.find('{')
+            try:
+                return json.loads(self.text[start:self._pos])
+            except json.JSONDecodeError:
+                pass
+        return {'nodes': self.nodes, 'edges': self.edges, 'truncated': True}
+
+
+def build_graph_prompt(prompt, research_context):
+    # Format research context for the prompt
+    context_text = "\nRelevant Research Context:\n"
+    for paper in research_context:
+        context_text += f"\nTitle: {paper['title']}\nAbstract: {paper['abstract']}\n"
+    
+    logging.debug("Preparing GPT prompt with research context")
+    
+    # Prepare the prompt for GPT with the provided preamble and research context
+    gpt_prompt = f"""
+    You are an AI assistant and expert scientist, tasked with creating a comprehensive and detailed Directed Acyclic Graph (DAG) that illustrates causal mechanisms based on established scientific evidence. Your goal is to analyze the given prompt and generate a structured representation of the specific causal links described in the scientific literature, including relevant context, confounders, mediators, moderators, and indirect pathways. Sometimes, the scientific literature may not provide sufficient information to fully understand the causal relationships, and in those cases make sure you note so as to provide adequate context for the analysis (further instructions in the guidelines below). Sometimes the requests will be facetious, you can accommodate them and treat them as if they were serious, just make sure you note in the annotations that you are doing so.
+
+    The following research context has been gathered from relevant academic papers. Please use this information to inform and enhance the graph generation, incorporating key findings and relationships from these papers into the graph structure. Include references to these papers in the node titles where appropriate:{context_text}
+
+    Please follow these guidelines:
+
+    1. **Identify Key Concepts, Contextual Factors, and Confounders:**
+       - Extract specific factors, processes, outcomes, and context factors mentioned or implied in the prompt and research context.
+       - Include potential **confounders**, **mediators**, **moderators**, and other variables that may influence the causal relationships.
+       - Use your domain knowledge and the provided research context to include relevant intermediate steps and contextual factors supported by scientific evidence.
+       - Include as many factors as you can find that are supported by evidence.
+
+    2. **Determine Causal Relationships:**
+       - Map out how each concept, context factor, or event causally influences others.
+       - Include **direct and indirect pathways**, **interactions**, and complex relationships.
+       - Capture biological, chemical, environmental, social, economic, and behavioral mechanisms as appropriate.
+       - Always consider the existence of **intermediate steps** and **contextual factors** that may influence the causal relationships. For example, if age is a factor in the causal model, consider how it may influence the other factors and add edges as appropriate.
+
+    3. **Create a Detailed and Comprehensive DAG Structure:**
+       - Each node should represent a specific concept, factor, event, or variable.
+       - Include nodes for confounders, mediators, moderators, and other relevant variables.
+       - Each edge should represent a direct causal link from one node to another.
+       - The DAG should reflect the **complexity of the causal relationships**, including multiple pathways and interconnected nodes, not just a simple linear sequence.
+
+    4. **Ensure Graph Acyclicity:**
+       - The graph must be acyclic with no circular dependencies.
+       - Ensure that each node is connected to at least one other node.
+       - Avoid redundant edges and self-loops.
+       - If there is conflicting information that would lead to circular dependencies or cyclicity, prioritize the most important information and make a note in the annotations.
+
+    5. **Provide Clear Labels and Annotations:**
+       - **Nodes:**
+         - Include 'id', 'label', and 'title' for each node.
+         - 'label' should be concise yet descriptive.
+         - 'title' should provide a brief explanation and possibly a reference to real scientific evidence (e.g., "Socioeconomic status influences smoking rates [Smith et al., 2020]"). Make sure these are actual references to scientific literature, otherwise describe what you have found.
+
+    6. **Cite Sources:**
+       - When possible, reference scientific studies or reviews that support each causal link (use placeholder citations if necessary) in the 'title' field.
+       - Include references to the provided research context papers where relevant.
+
+    7. **Expand DAG**
+        - Once the DAG is complete, go through all the nodes and ask yourself the same questions about causation between them. For example, if a node represents age, you might want to include edges from age to health, age to income, and age to education if relevant.
+        - Expand the DAG by adding more nodes and edges to capture the full range of causal relationships.
+        - Always make sure this is done based on evidence and not based on assumptions.
+
+    8. **Output Format:**
+       - Return the result as a JSON object with two keys: **'nodes'** and **'edges'**.
+       - **'nodes'**: A list of objects, each with 'id', 'label', and 'title'.
+       - **'edges'**: A list of objects, each with 'from' and 'to' keys representing connections between nodes.
+
+    **Example Format:**
+
+    
+    {{
+      "nodes": [
+        {{"id": 1, "label": "Policy X Implementation", "title": "Introduction of Policy X to address issue Y"}},
+        {{"id": 2, "label": "Resource Allocation", "title": "Policy X reallocates resources - no available peer-review reference, blog post at https://address.com"}},
+        {{"id": 3, "label": "Service Access", "title": "Changes in access to services [Smith et al., 2020]"}},
+        {{"id": 4, "label": "Outcome Y", "title": "Impact on Outcome Y"}},
+        {{"id": 5, "label": "Socioeconomic Status", "title": "Influences access and effectiveness of Policy X [Marmot, 2005]"}},
+        {{"id": 6, "label": "Geographical Location", "title": "Affects policy implementation and service availability [Lee et al., 2019]"}},
+        {{"id": 7, "label": "Cultural Factors", "title": "Modulate response to Policy X [Garcia et al., 2018]"}},
+        {{"id": 8, "label": "Public Awareness", "title": "Awareness campaigns influence effectiveness [Nguyen et al., 2021]"}}
+      ],
+      "edges": [
+        {{"from": 1, "to": 2}},
+        {{"from": 2, "to": 3}},
+        {{"from": 3, "to": 4}},
+        {{"from": 5, "to": 3}},
+        {{"from": 6, "to": 1}},
+        {{"from": 7, "to": 3}},
+        {{"from": 8, "to": 3}},
+        {{"from": 5, "to": 4}},
+        {{"from": 6, "to": 4}},
+        {{"from": 7, "to": 4}}
+      ]
+    }} 
+
+
+**Based on the following prompt and research context, generate a detailed directed acyclic graph (DAG) structure accounting for all the instructions above:**
+
+Prompt: {prompt}"""
+    return gpt_prompt
+
+
+def generate_graph_data_with_gpt(prompt, research_context, on_item=None, client=None, model='gpt-4',
+                                 temperature=0.7, log_response=False):
+    """Generate graph data for `prompt`, streaming the completion.
+
+    `on_item(kind, item)` is called for every node or edge as soon as it has
+    been parsed. If the stream breaks off or ends in malformed JSON, the
+    nodes and edges parsed up to that point are returned. The response text
+    of a failed parse is only logged with `log_response`.
+    """
+    if client is None:
+        client = OpenAI(
+            api_key=os.environ.get('OPENAI_API_KEY'),
+            organization=os.environ.get('OPENAI_ORGANIZATION_KEY')
+        )
+    gpt_prompt = build_graph_prompt(prompt, research_context)
+
+    logging.info("Sending request to OpenAI")
+    parser = GraphStreamParser()
+    try:
+        stream = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": gpt_prompt}],
+            temperature=temperature,
+            stream=True,
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            for kind, item in parser.feed(chunk.choices[0].delta.content or ''):
+                if on_item is not None:
+                    on_item(kind, item)
+    except Exception as e:
+        if not parser.nodes:
+            logging.error(f"Error streaming GPT response: {str(e)}")
+            raise
+        logging.warning(f"GPT stream interrupted, keeping what was parsed: {str(e)}")
+    logging.info("Received response from OpenAI")
+
+    graph_data = parser.result()
+    if not graph_data.get('nodes'):
+        if log_response:
+            logging.info(f"Response text: {parser.text}")
+        raise Exception("Failed to parse GPT response into valid JSON")
+    logging.info(f"Successfully parsed graph data with {len(graph_data.get('nodes', []))} nodes and {len(graph_data.get('edges', []))} edges")
+    return graph_data
+
+
+class GraphGenerator:
+    """Cached, deduplicated front end to `generate_graph_data_with_gpt`.
+
+    Responses are cached under (model, prompt, research context, temperature)
+    for `cache`'s TTL; truncated responses are never cached. While a request
+    is in flight, identical ones wait for its result (single flight). Point
+    `base_url` at a fake OpenAI server to run without the real API. With
+    `log_responses`, unparseable responses are logged in full.
+    """
+
+    def __init__(self, model='gpt-4', temperature=0.7, base_url=None, timeout=120, cache=None, log_responses=False):
+        self.model = model
+        self.temperature = temperature
+        self.base_url = base_url
+        self.timeout = timeout
+        self.cache = cache
+        self.log_responses = log_responses
+        self.coalesced = 0
+        self._client = None
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        cache = None
+        if config['LLM_CACHE_PATH']:
+            cache = SQLiteTTLCache(
+                config['LLM_CACHE_PATH'],
+                ttl=config['LLM_CACHE_TTL'],
+                max_entries=config['LLM_CACHE_MAX_ENTRIES'],
+            )
+        return cls(
+            model=config['OPENAI_MODEL'],
+            temperature=config['OPENAI_TEMPERATURE'],
+            base_url=config['OPENAI_BASE_URL'],
+            timeout=config['OPENAI_TIMEOUT'],
+            cache=cache,
+            log_responses=config['PROFILING'],
+        )
+
+    @property
+    def client(self):
+        # Created on first use: the OpenAI client refuses to start without a key
+        if self._client is None:
+            self._client = OpenAI(
+                api_key=os.environ.get('OPENAI_API_KEY'),
+                organization=os.environ.get('OPENAI_ORGANIZATION_KEY'),
+                base_url=self.base_url or None,
+                timeout=self.timeout,
+            )
+        return self._client
+
+    def cache_key(self, prompt, research_context):
+        context_hash = hashlib.sha256(json.dumps(research_context, sort_keys=True).encode()).hexdigest()
+        key = json.dumps([self.model, prompt, context_hash, self.temperature])
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def generate(self, prompt, research_context, on_item=None):
+        """Return graph data for `prompt`, from the cache or a single shared API call.
+
+        `on_item` only sees streamed items when this call is the one talking to
+        the API; callers served from the cache or another in-flight request
+        get the complete result at once.
+        """
+        key = self.cache_key(prompt, research_context)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                logging.info("Serving graph generation from the LLM cache")
+                return cached
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            logging.info("Waiting for an identical graph generation already in flight")
+            return future.result()
+        try:
+            graph_data = generate_graph_data_with_gpt(
+                prompt, research_context, on_item, self.client, self.model, self.temperature, self.log_responses)
+            if self.cache is not None and not graph_data.get('truncated'):
+                self.cache.put(key, graph_data)
+            future.set_result(graph_data)
+            return graph_data
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def stats(self):
+        stats = self.cache.stats() if self.cache is not None else {}
+        with self._lock:
+            return dict(stats, in_flight=len(self._in_flight), coalesced=self.coalesced)
@@ -0,0 +1,258 @@
+"""Request, database and analysis metrics in the Prometheus text format.
+
+Metrics live in the process that records them: every server worker keeps
+its own and reports them on its own `/metrics`, and counts made in the
+batch worker processes are not included.
+
+`instrument_app` times every request by route and counts the SQL
+statements it runs (through SQLAlchemy cursor events). The analysis code
+counts its own work with the counters defined here.
+"""
+import bisect
+import logging
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PREFIX = 'autodag_'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(10))  # 256 B to 64 MiB
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = PREFIX + name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.labels)
+
+    def header(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}' for key, value in values]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # Per-bucket counts (the last one is +Inf), then the sum
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def render(self):
+        with self._lock:
+            values = sorted((key, list(counts)) for key, counts in self._values.items())
+        lines = []
+        for key, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = _format_labels(self.labels, key, [('le', _format_value(float(bound)))])
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labels, key)} {_format_value(counts[-1])}')
+            lines.append(f'{self.name}_count{_format_labels(self.labels, key)} {cumulative}')
+        return lines
+
+
+class Callback(_Metric):
+    """A metric whose samples are read when rendered: `fn()` yields ({label: value}, number)."""
+
+    def __init__(self, name, help, kind, fn, labels=()):
+        super().__init__(name, help, labels)
+        self.kind = kind
+        self.fn = fn
+
+    def render(self):
+        return [f'{self.name}{_format_labels(self.labels, self._key(labels))} {_format_value(value)}'
+                for labels, value in self.fn()]
+
+
+class Registry:
+
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.add(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self.add(Histogram(name, help, labels, buckets))
+
+    def callback(self, name, help, kind, fn, labels=()):
+        return self.add(Callback(name, help, kind, fn, labels))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            try:
+                samples = metric.render()
+            except Exception as e:
+                logging.warning(f"Could not collect {metric.name}: {str(e)}")
+                continue
+            lines.extend(metric.header())
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.counter('http_requests_total', 'Requests handled, by route and status.',
+                            ('method', 'route', 'status'))
+REQUEST_SECONDS = REGISTRY.histogram('http_request_duration_seconds',
+                                     'Time to produce a response (before streaming its body).', ('method', 'route'))
+REQUEST_BYTES = REGISTRY.histogram('http_request_size_bytes', 'Request body sizes.', ('route',), SIZE_BUCKETS)
+RESPONSE_BYTES = REGISTRY.histogram('http_response_size_bytes', 'Response body sizes (streamed bodies excluded).',
+                                    ('route',), SIZE_BUCKETS)
+REQUEST_QUERIES = REGISTRY.histogram('http_request_db_queries', 'SQL statements run per request.', ('route',),
+                                     COUNT_BUCKETS)
+DB_QUERIES = REGISTRY.counter('db_queries_total', 'SQL statements executed, by kind.', ('statement',))
+DB_QUERY_SECONDS = REGISTRY.histogram('db_query_duration_seconds', 'SQL statement execution time.', ('statement',),
+                                      QUERY_BUCKETS)
+
+TRAIL_STEPS = REGISTRY.counter('adjustment_trail_steps_total',
+                               'Nodes visited along active trails by the d-separation search.')
+SEPARATORS_CHECKED = REGISTRY.counter('adjustment_candidate_sets_total',
+                                      'Candidate separators derived while enumerating adjustment sets.')
+SETS_FOUND = REGISTRY.counter('adjustment_sets_found_total', 'Minimal adjustment sets returned.')
+AUGMENTING_PATHS = REGISTRY.counter('adjustment_augmenting_paths_total',
+                                    'Augmenting paths found by the minimum separator search.')
+VALIDITY_CHECKS = REGISTRY.counter('adjustment_validity_checks_total', 'Adjustment sets checked, by outcome.',
+                                   ('valid',))
+STORED_LOOKUPS = REGISTRY.counter('stored_index_lookups_total',
+                                  'Closure indexes and layouts stored with projects, by whether they could be used.',
+                                  ('index', 'result'))
+GENERATION_SECONDS = REGISTRY.histogram('graph_generation_phase_seconds', 'Time spent in each generation phase.',
+                                        ('phase',))
+
+
+def _statement_kind(statement):
+    words = statement[:64].split(None, 1)
+    kind = words[0].lower() if words else ''
+    return kind if kind in ('select', 'insert', 'update', 'delete') else 'other'
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    elapsed = time.perf_counter() - started
+    kind = _statement_kind(statement)
+    DB_QUERIES.inc(statement=kind)
+    DB_QUERY_SECONDS.observe(elapsed, statement=kind)
+    if has_request_context() and 'request_started' in g:
+        g.query_count += 1
+        g.query_seconds += elapsed
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    if context.connection is not None and context.connection.info.get('query_started'):
+        context.connection.info['query_started'].pop()
+
+
+def _route():
+    # The URL rule rather than the path, so /projects/1 and /projects/2 share a series
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def instrument_app(app):
+    """Record latency, sizes and query counts for every request to `app`.
+
+    With PROFILING set, each request is also logged with its timings.
+    """
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        g.query_count = 0
+        g.query_seconds = 0.0
+
+    @app.after_request
+    def record_request(response):
+        if 'request_started' not in g:
+            return response
+        elapsed = time.perf_counter() - g.pop('request_started')
+        route = _route()
+        REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+        REQUEST_SECONDS.observe(elapsed, method=request.method, route=route)
+        REQUEST_QUERIES.observe(g.query_count, route=route)
+        if request.content_length:
+            REQUEST_BYTES.observe(request.content_length, route=route)
+        if not response.is_streamed and response.content_length is not None:
+            RESPONSE_BYTES.observe(response.content_length, route=route)
+        if app.config.get('PROFILING'):
+            logging.info(f"{request.method} {request.path} {response.status_code} in {elapsed * 1000:.1f}ms, "
+                         f"{g.query_count} queries ({g.query_seconds * 1000:.1f}ms)")
+        return response
+
+    @app.teardown_request
+    def record_failure(exception):
+        # after_request does not run when the view raised
+        if exception is not None and 'request_started' in g:
+            elapsed = time.perf_counter() - g.pop('request_started')
+            REQUESTS.inc(method=request.method, route=_route(), status=500)
+            REQUEST_SECONDS.observe(elapsed, method=request.method, route=_route())
+
+    return app
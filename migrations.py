@@ -0,0 +1,79 @@
+"""Additive schema upgrades for databases created by older versions.
+
+`db.create_all()` creates missing tables but never changes existing ones,
+so columns added to a model later are listed here and added on startup.
+"""
+import json
+import logging
+
+from sqlalchemy import inspect, text
+
+
+def _backfill_project_counts(conn):
+    rows = conn.execute(text('SELECT id, content FROM project')).fetchall()
+    for project_id, content in rows:
+        try:
+            content = json.loads(content or '{}')
+        except ValueError:
+            continue
+        conn.execute(
+            text('UPDATE project SET node_count = :nodes, edge_count = :edges WHERE id = :id'),
+            {'nodes': len(content.get('nodes', [])), 'edges': len(content.get('edges', [])), 'id': project_id},
+        )
+
+
+# (table, column, column definition, backfill run after adding it), in the
+# order they were introduced
+COLUMNS = [
+    ('project', 'version', 'INTEGER NOT NULL DEFAULT 1', None),
+    ('project', 'node_count', 'INTEGER NOT NULL DEFAULT 0', _backfill_project_counts),
+    ('project', 'edge_count', 'INTEGER NOT NULL DEFAULT 0', None),
+    ('project', 'updated_at', 'DATETIME', None),
+]
+
+
+def _backfill_graph_rows(conn):
+    # Projects saved before the node/edge tables existed have no rows at all
+    from graph_store import replace_graph_rows
+    rows = conn.execute(text(
+        'SELECT id, content FROM project WHERE node_count + edge_count > 0 '
+        'AND id NOT IN (SELECT project_id FROM project_node) '
+        'AND id NOT IN (SELECT project_id FROM project_edge)'
+    )).fetchall()
+    for project_id, content in rows:
+        try:
+            content = json.loads(content or '{}')
+        except ValueError:
+            continue
+        replace_graph_rows(conn, project_id, content)
+    if rows:
+        logging.info(f"Backfilled node/edge rows for {len(rows)} projects")
+
+
+# Data backfills that check for themselves whether there is anything to do,
+# run on every startup after the columns above are in place
+BACKFILLS = [
+    _backfill_graph_rows,
+]
+
+
+def upgrade(engine):
+    """Add any listed column missing from an existing table, then run the backfills."""
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    added = []
+    with engine.begin() as conn:
+        for table, column, definition, backfill in COLUMNS:
+            if table not in tables:
+                continue
+            if column not in {c['name'] for c in inspector.get_columns(table)}:
+                logging.info(f"Adding column {table}.{column}")
+                conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {definition}'))
+                if backfill is not None:
+                    added.append(backfill)
+        # Backfills run once every column is in place, as they may set several
+        for backfill in added:
+            backfill(conn)
+        if 'project' in tables:
+            for backfill in BACKFILLS:
+                backfill(conn)
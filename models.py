@@ -1,9 +1,14 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from datetime import datetime, timezone
+import json
 
 db = SQLAlchemy()
 
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), index=True, unique=True)
@@ -22,3 +27,93 @@ class Project(db.Model):
     name = db.Column(db.String(64))
     content = db.Column(db.Text)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    # Bumped on every write; an UPDATE from a stale copy raises StaleDataError
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # Listing metadata, kept so the project list never has to read `content`
+    node_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    edge_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, default=utcnow, onupdate=utcnow, index=True)
+    closure = db.relationship('ProjectClosure', uselist=False, cascade='all, delete-orphan')
+    layout = db.relationship('ProjectLayout', uselist=False, cascade='all, delete-orphan')
+    order = db.relationship('ProjectOrder', uselist=False, cascade='all, delete-orphan')
+    nodes = db.relationship('ProjectNode', lazy='dynamic', cascade='all, delete-orphan')
+    edges = db.relationship('ProjectEdge', lazy='dynamic', cascade='all, delete-orphan')
+
+    __mapper_args__ = {'version_id_col': version}
+
+    def set_content(self, content):
+        self.content = json.dumps(content)
+        self.node_count = len(content.get('nodes', []))
+        self.edge_count = len(content.get('edges', []))
+
+    def to_summary(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'version': self.version,
+            'node_count': self.node_count,
+            'edge_count': self.edge_count,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+class ProjectClosure(db.Model):
+    """Ancestor/descendant closure index of a project's graph, rebuilt when its structure hash changes."""
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), primary_key=True)
+    structure_hash = db.Column(db.String(64))
+    # ClosureIndex.to_bytes(); only loaded when the hash matches the graph at hand
+    data = db.deferred(db.Column(db.LargeBinary))
+
+class ProjectOrder(db.Model):
+    """Topological order of a project's nodes, kept in step on save to check new edges."""
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), primary_key=True)
+    data = db.Column(db.Text)
+
+class ProjectLayout(db.Model):
+    """Computed node positions of a project, valid while its structure hash matches."""
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), primary_key=True)
+    structure_hash = db.Column(db.String(64), nullable=False)
+    data = db.Column(db.Text)
+
+class ProjectNode(db.Model):
+    """One node of a project's graph, mirrored from `Project.content` (see graph_store.py)."""
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), primary_key=True)
+    node_id = db.Column(db.String(255), primary_key=True)
+    label = db.Column(db.Text)
+    data = db.Column(db.Text)
+
+class ProjectEdge(db.Model):
+    """One edge of a project's graph, mirrored from `Project.content` (see graph_store.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    edge_id = db.Column(db.String(255), nullable=False)
+    # Keyed by attribute name so ORM and Core inserts take the same row dicts
+    source = db.Column('from_node', db.String(255), key='source', nullable=False)
+    target = db.Column('to_node', db.String(255), key='target', nullable=False)
+    data = db.Column(db.Text)
+
+    __table_args__ = (
+        db.Index('ix_project_edge_key', 'project_id', 'edge_id'),
+        db.Index('ix_project_edge_from_to', 'project_id', 'source', 'target'),
+        db.Index('ix_project_edge_to', 'project_id', 'target'),
+    )
+
+class GenerationJob(db.Model):
+    """A background job (see jobs.py), stored so every server process can report on it."""
+    id = db.Column(db.String(32), primary_key=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
+    status = db.Column(db.String(16), nullable=False)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=utcnow)
+    finished_at = db.Column(db.DateTime, index=True)
+
+class GenerationJobEvent(db.Model):
+    """One event of a job, in the order it was emitted."""
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(32), db.ForeignKey('generation_job.id', ondelete='CASCADE'), nullable=False)
+    event = db.Column(db.String(32), nullable=False)
+    data = db.Column(db.Text)
+
+    __table_args__ = (
+        db.Index('ix_generation_job_event_job', 'job_id', 'id'),
+    )
@@ -0,0 +1,130 @@
+"""OpenAlex client used to gather research context for graph generation.
+
+All calls share one pooled `requests.Session` with per-request timeouts and
+retries with exponential backoff, and the per-DOI lookups run concurrently.
+Successful responses can be kept in a persistent cache; in offline mode the
+cache is the only source and the network is never touched.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import logging
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from cache import SQLiteTTLCache
+
+
+class OpenAlexClient:
+    """Thin wrapper over the OpenAlex works API.
+
+    Point `base_url` at a local stub server, or set `offline` with a warm
+    `cache`, to run without network access.
+    """
+
+    def __init__(self, base_url='https://api.openalex.org', timeout=10, concurrency=5, retries=3, backoff=0.5,
+                 cache=None, offline=False):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.cache = cache
+        self.offline = offline
+        self.concurrency = max(1, concurrency)
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=('GET',),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @classmethod
+    def from_config(cls, config):
+        cache = None
+        if config['OPENALEX_CACHE_PATH']:
+            cache = SQLiteTTLCache(
+                config['OPENALEX_CACHE_PATH'],
+                ttl=config['OPENALEX_CACHE_TTL'],
+                max_entries=config['OPENALEX_CACHE_MAX_ENTRIES'],
+            )
+        return cls(
+            base_url=config['OPENALEX_BASE_URL'],
+            timeout=config['OPENALEX_TIMEOUT'],
+            concurrency=config['OPENALEX_CONCURRENCY'],
+            retries=config['OPENALEX_RETRIES'],
+            cache=cache,
+            offline=config['OPENALEX_OFFLINE'],
+        )
+
+    def _get(self, path, params=None):
+        # Keyed on the full URL, so stub servers and the real API never share entries
+        key = self.base_url + (f'{path}?{urlencode(sorted(params.items()))}' if params else path)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        if self.offline:
+            logging.info(f"OpenAlex offline mode: no cached response for {key}")
+            return None
+        response = self.session.get(f'{self.base_url}{path}', params=params, timeout=self.timeout)
+        if response.status_code != 200:
+            logging.warning(f"OpenAlex {path} returned {response.status_code}")
+            return None
+        data = response.json()
+        if self.cache is not None:
+            self.cache.put(key, data)
+        return data
+
+    def search_works(self, query, per_page=5):
+        """Return the raw search results for `query`, or [] if the search failed."""
+        try:
+            data = self._get('/works', {'search': query, 'per-page': per_page})
+        except requests.RequestException as e:
+            logging.warning(f"Error searching OpenAlex for {query!r}: {str(e)}")
+            return []
+        return data.get('results', []) if data else []
+
+    def get_work_by_doi(self, doi):
+        """Return the work record for `doi`, or None if it could not be fetched."""
+        try:
+            return self._get(f'/works/doi:{doi}')
+        except requests.RequestException as e:
+            logging.warning(f"Error fetching OpenAlex record for DOI {doi}: {str(e)}")
+            return None
+
+    def find_papers(self, query, per_page=5):
+        """Search for `query` and fetch each hit's DOI record concurrently.
+
+        Returns (papers, research_context): paper summaries for the client in
+        search order, and the title/abstract pairs that had an abstract.
+        """
+        results = self.search_works(query, per_page)
+        logging.info(f"OpenAlex found {len(results)} papers for {query!r}")
+        papers = [{
+            'title': paper.get('title'),
+            'year': paper.get('publication_year'),
+            'doi': paper.get('doi'),
+            'authors': [author.get('author', {}).get('display_name') for author in paper.get('authorships', [])[:3]],
+            'abstract': None
+        } for paper in results]
+
+        dois = [paper['doi'] for paper in papers if paper['doi']]
+        if dois:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(dois))) as executor:
+                records = dict(zip(dois, executor.map(self.get_work_by_doi, dois)))
+        else:
+            records = {}
+
+        research_context = []
+        for paper in papers:
+            record = records.get(paper['doi'])
+            if record:
+                paper['abstract'] = record.get('abstract')
+            if paper['abstract']:
+                research_context.append({'title': paper['title'], 'abstract': paper['abstract']})
+        return papers, research_context
@@ -0,0 +1,92 @@
+"""JSON-Patch-style operations on a project's graph content.
+
+Nodes and edges are addressed by id rather than by array position, so a
+patch stays valid however the client orders its data:
+
+    {"op": "add", "path": "/nodes/7", "value": {"label": "Smoking"}}
+    {"op": "replace", "path": "/nodes/7/label", "value": "Tobacco use"}
+    {"op": "remove", "path": "/edges/3f2a"}
+
+Ids in paths use JSON Pointer escaping (~0 for '~', ~1 for '/'). Removing a
+node also removes the edges attached to it.
+"""
+import copy
+
+COLLECTIONS = ('nodes', 'edges')
+
+
+class PatchError(ValueError):
+    """An operation that cannot be applied to the content."""
+
+
+def _parse_path(path):
+    if not isinstance(path, str) or not path.startswith('/'):
+        raise PatchError(f'Invalid path: {path!r}')
+    parts = [p.replace('~1', '/').replace('~0', '~') for p in path[1:].split('/')]
+    if parts[0] not in COLLECTIONS or len(parts) not in (2, 3) or not parts[1]:
+        raise PatchError(f'Invalid path: {path!r}')
+    return parts[0], parts[1], parts[2] if len(parts) == 3 else None
+
+
+def apply_patch(content, ops):
+    """Return a copy of `content` with `ops` applied in order.
+
+    Raises PatchError if any operation is malformed or does not fit the
+    content (adding an existing id, touching a missing one); `content`
+    itself is left unchanged either way.
+    """
+    if not isinstance(ops, list):
+        raise PatchError('ops must be a list')
+    # Index each collection by id, keeping insertion order for the result;
+    # id-less elements (imported edges) are kept but cannot be addressed
+    items = {
+        name: {str(item['id']) if 'id' in item else (None, i): item
+               for i, item in enumerate(copy.deepcopy(content.get(name, [])))}
+        for name in COLLECTIONS
+    }
+    for op in ops:
+        if not isinstance(op, dict):
+            raise PatchError(f'Invalid operation: {op!r}')
+        kind = op.get('op')
+        collection, item_id, field = _parse_path(op.get('path'))
+        elements = items[collection]
+        if kind == 'add' and field is None:
+            if item_id in elements:
+                raise PatchError(f'{collection[:-1].capitalize()} {item_id} already exists')
+            elements[item_id] = _element(op, item_id)
+            continue
+        if item_id not in elements:
+            raise PatchError(f'{collection[:-1].capitalize()} {item_id} does not exist')
+        if kind == 'remove' and field is None:
+            del elements[item_id]
+            if collection == 'nodes':
+                items['edges'] = {i: e for i, e in items['edges'].items()
+                                  if str(e.get('from')) != item_id and str(e.get('to')) != item_id}
+        elif kind == 'replace' and field is None:
+            elements[item_id] = _element(op, item_id)
+        elif field == 'id':
+            raise PatchError('Ids cannot be changed')
+        elif kind in ('add', 'replace'):
+            if 'value' not in op:
+                raise PatchError(f'Missing value for {op["path"]}')
+            elements[item_id][field] = op['value']
+        elif kind == 'remove':
+            elements[item_id].pop(field, None)
+        else:
+            raise PatchError(f'Unsupported operation: {kind!r}')
+    result = dict(content)
+    for name in COLLECTIONS:
+        result[name] = list(items[name].values())
+    return result
+
+
+def _element(op, item_id):
+    value = op.get('value')
+    if not isinstance(value, dict):
+        raise PatchError(f'Value for {op["path"]} must be an object')
+    value = dict(value)
+    # Keep the id's original type (vis.js ids may be numbers) when the value has one
+    if str(value.get('id', item_id)) != item_id:
+        raise PatchError(f'Value id does not match {op["path"]}')
+    value.setdefault('id', item_id)
+    return value
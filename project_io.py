@@ -0,0 +1,252 @@
+"""Streaming export and import of projects.
+
+Exports read rows from the database in chunks and write them out one
+project at a time, so memory use does not grow with the number of
+projects. The stored content is already JSON and is copied into the output
+without parsing it.
+
+Imports parse the upload incrementally and write projects in batches: one
+keyed query finds the existing projects of a batch, and everything goes
+into the caller's transaction.
+"""
+import codecs
+import gzip
+import io
+import json
+import time
+import zlib
+
+from sqlalchemy import select
+from sqlalchemy.orm import defer, selectinload
+
+from acyclic import find_cycles
+from graph_store import bulk_replace_graph_rows, refresh_project_closure
+from models import Project
+
+EXPORT_CHUNK_SIZE = 100
+
+
+def iter_project_rows(session, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield (name, content) for every project, fetching `chunk_size` rows at a time."""
+    query = select(Project.name, Project.content).order_by(Project.id).execution_options(yield_per=chunk_size)
+    for name, content in session.execute(query):
+        yield name, content
+
+
+def _record(name, content):
+    return '{"name": %s, "content": %s}' % (json.dumps(name), content or 'null')
+
+
+def iter_ndjson(rows):
+    """Write each project as one line of NDJSON."""
+    for name, content in rows:
+        yield _record(name, content) + '\n'
+
+
+def iter_json_array(rows):
+    """Write the projects as a single JSON array, one element per line."""
+    yield '['
+    separator = '\n'
+    for name, content in rows:
+        yield separator + _record(name, content)
+        separator = ',\n'
+    yield '\n]\n'
+
+
+def gzip_stream(chunks, level=6):
+    """Gzip a stream of text chunks on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class _JSONStream:
+    """Read consecutive JSON values and punctuation from a binary stream.
+
+    The buffer grows geometrically while a value is incomplete, so a large
+    value is parsed a bounded number of times.
+    """
+
+    def __init__(self, stream, chunk_size=1 << 16):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        if self._eof:
+            return False
+        self._buffer = self._buffer[self._pos:]
+        self._pos = 0
+        data = self._stream.read(max(self._chunk_size, len(self._buffer)))
+        self._eof = not data
+        self._buffer += self._decoder.decode(data, final=self._eof)
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character, or '' at the end."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in ' \t\r\n':
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f'Invalid JSON: expected {char!r} at {self.peek()!r}')
+        self._pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number or literal at the end of the buffer may continue in the next chunk
+            if end < len(self._buffer) or self._eof:
+                self._pos = end
+                return value
+            self._fill()
+
+
+def iter_import_records(stream, filename):
+    """Yield (name, content) pairs from an uploaded file, parsing it incrementally.
+
+    Accepts NDJSON or a JSON array of {"name", "content"} records (as written
+    by the export), a JSON object mapping names to contents, or a single
+    project object (one with "nodes" and "edges" lists) named after the
+    file. A trailing .gz is decompressed.
+    """
+    if filename.endswith('.gz'):
+        stream = gzip.GzipFile(fileobj=stream)
+        filename = filename[:-3]
+    if filename.endswith('.ndjson'):
+        for line in io.TextIOWrapper(stream, encoding='utf-8'):
+            if line.strip():
+                record = json.loads(line)
+                yield record.get('name'), record.get('content')
+        return
+
+    reader = _JSONStream(stream)
+    first = reader.peek()
+    if first == '[':
+        reader.expect('[')
+        if reader.peek() == ']':
+            return
+        while True:
+            record = reader.value()
+            if not isinstance(record, dict):
+                raise ValueError('Invalid project record')
+            yield record.get('name'), record.get('content')
+            if reader.peek() == ']':
+                return
+            reader.expect(',')
+    elif first == '{':
+        reader.expect('{')
+        if reader.peek() == '}':
+            return
+        # Whether this is one project or a map of them depends on all its keys
+        entries = []
+        while True:
+            key = reader.value()
+            reader.expect(':')
+            entries.append((key, reader.value()))
+            if reader.peek() == '}':
+                break
+            reader.expect(',')
+        content = dict(entries)
+        if isinstance(content.get('nodes'), list) and isinstance(content.get('edges'), list):
+            yield filename.rsplit('.', 1)[0], content
+        else:
+            yield from entries
+    else:
+        raise ValueError('Invalid JSON file')
+
+
+def validate_content(content):
+    """Return why `content` is not a storable graph, or None if it is."""
+    if not isinstance(content, dict):
+        return 'content is not an object'
+    for name in ('nodes', 'edges'):
+        if not isinstance(content.get(name, []), list):
+            return f'{name} is not a list'
+    if any(not isinstance(node, dict) or 'id' not in node for node in content.get('nodes', [])):
+        return 'every node needs an id'
+    if any(not isinstance(edge, dict) for edge in content.get('edges', [])):
+        return 'every edge must be an object'
+    cycles = find_cycles(content.get('nodes', []), content.get('edges', []))
+    if cycles:
+        return 'contains cycles: ' + '; '.join(' -> '.join(cycle) for cycle in cycles)
+    return None
+
+
+def bulk_import_projects(session, user_id, records, dry_run=False, batch_size=500, max_errors=20):
+    """Create or replace the user's projects from (name, content) records.
+
+    Works through `records` in batches within the session's transaction; the
+    caller commits, or rolls back for a dry run. With `dry_run` nothing is
+    written, but lookups and validation run as usual so the counts are what a
+    real import would do. Returns a report of counts, errors and time taken.
+    """
+    started = time.perf_counter()
+    report = {'created': 0, 'updated': 0, 'skipped': 0, 'errors': [], 'dry_run': dry_run}
+    batch = {}
+    seen = set()
+
+    def flush_batch():
+        existing = {}
+        names = list(batch)
+        for i in range(0, len(names), batch_size):
+            query = (select(Project)
+                     .where(Project.user_id == user_id, Project.name.in_(names[i:i + batch_size]))
+                     .options(defer(Project.content), selectinload(Project.closure)))
+            existing.update((project.name, project) for project in session.scalars(query))
+        projects = []
+        for name, content in batch.items():
+            project = existing.get(name)
+            # A dry run writes nothing, so earlier batches are remembered here
+            report['updated' if project is not None or name in seen else 'created'] += 1
+            seen.add(name)
+            if project is None and not dry_run:
+                project = Project(user_id=user_id, name=name)
+                session.add(project)
+            if not dry_run:
+                project.set_content(content)
+                refresh_project_closure(project, content)
+                projects.append((project, content))
+        if projects:
+            # One flush inserts the new projects and gives them ids for the rows
+            session.flush()
+            bulk_replace_graph_rows(session, {project.id: content for project, content in projects})
+        batch.clear()
+
+    for number, (name, content) in enumerate(records, 1):
+        error = 'missing name' if not isinstance(name, str) or not name else validate_content(content)
+        if error is not None:
+            report['skipped'] += 1
+            if len(report['errors']) < max_errors:
+                report['errors'].append(f'Project {number} ({name}): {error}')
+            continue
+        if name in batch:
+            # The same name twice in one batch: the later record wins
+            report['updated'] += 1
+            batch[name] = content
+            continue
+        batch[name] = content
+        if len(batch) >= batch_size:
+            flush_batch()
+    if batch:
+        flush_batch()
+    report['elapsed'] = round(time.perf_counter() - started, 3)
+    return report
@@ -0,0 +1,112 @@
+"""Long-lived objects shared by the requests of one app.
+
+Each app made by `create_app` gets a `Services` in
+``app.extensions['autodag']``. The OpenAlex client, the GPT generator and
+the node suggestions are only built (and their modules, which pull in
+requests and openai, only imported) the first time a request needs them,
+so the server starts without paying for features it has not used yet.
+"""
+import threading
+
+from flask import current_app, has_app_context
+
+from cache import LRUCache
+from metrics import REGISTRY
+
+
+class Services:
+
+    def __init__(self, config):
+        self.config = config
+        self.adjustment_cache = LRUCache(config['ADJUSTMENT_CACHE_ENTRIES'], config['ADJUSTMENT_CACHE_BYTES'])
+        self.suggestion_boosts = LRUCache(max_entries=1024)
+        # Parsed stored closure indexes by (project id, structure hash)
+        self.project_closures = LRUCache(max_entries=64, max_bytes=64 * 1024 * 1024)
+        self._openalex_client = None
+        self._graph_generator = None
+        self._suggestion_index = None
+        self._generation_jobs = None
+        self._lock = threading.Lock()
+
+    @property
+    def openalex_client(self):
+        with self._lock:
+            if self._openalex_client is None:
+                from openalex import OpenAlexClient
+                self._openalex_client = OpenAlexClient.from_config(self.config)
+            return self._openalex_client
+
+    @property
+    def graph_generator(self):
+        with self._lock:
+            if self._graph_generator is None:
+                from llm import GraphGenerator
+                self._graph_generator = GraphGenerator.from_config(self.config)
+            return self._graph_generator
+
+    @property
+    def suggestion_index(self):
+        with self._lock:
+            if self._suggestion_index is None:
+                from suggestions import SuggestionIndex
+                self._suggestion_index = SuggestionIndex(self.config['NODE_SUGGESTIONS_PATH'])
+            return self._suggestion_index
+
+    @property
+    def generation_jobs(self):
+        with self._lock:
+            if self._generation_jobs is None:
+                from jobs import JobQueue
+                self._generation_jobs = JobQueue(current_app._get_current_object(),
+                                                 self.config['GENERATION_WORKERS'], self.config['JOB_RETENTION'],
+                                                 self.config['JOB_STALE_AFTER'])
+            return self._generation_jobs
+
+    def graph_generator_stats(self):
+        """Counters of the GPT front end, without building it (and importing openai) just for them."""
+        if self._graph_generator is not None:
+            return self._graph_generator.stats()
+        stats = {'entries': 0, 'hits': 0, 'misses': 0} if self.config['LLM_CACHE_PATH'] else {}
+        return dict(stats, in_flight=0, coalesced=0)
+
+    def caches(self):
+        """Return {name: cache} for the caches built so far."""
+        caches = {'adjustment_sets': self.adjustment_cache, 'project_closures': self.project_closures}
+        if self._graph_generator is not None:
+            caches['llm'] = self._graph_generator.cache
+        if self._openalex_client is not None:
+            caches['openalex'] = self._openalex_client.cache
+        return {name: cache for name, cache in caches.items() if cache is not None}
+
+
+def services():
+    """Return the services of the current app."""
+    return current_app.extensions['autodag']
+
+
+def _current():
+    # Metrics are rendered inside a request; outside one there is nothing to report
+    return current_app.extensions.get('autodag') if has_app_context() else None
+
+
+def cache_lookups():
+    current = _current()
+    if current is None:
+        return
+    for name, cache in current.caches().items():
+        stats = cache.stats()
+        yield {'cache': name, 'result': 'hit'}, stats['hits']
+        yield {'cache': name, 'result': 'miss'}, stats['misses']
+
+
+def generations_in_flight():
+    current = _current()
+    if current is None or current._graph_generator is None:
+        return [({}, 0)]
+    return [({}, current._graph_generator.stats()['in_flight'])]
+
+
+REGISTRY.callback('cache_lookups_total', 'Cache lookups, by cache and result.', 'counter', cache_lookups,
+                  ('cache', 'result'))
+REGISTRY.callback('llm_generations_in_flight', 'Graph generations waiting on the OpenAI API.', 'gauge',
+                  generations_in_flight)
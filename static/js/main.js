@@ -20,16 +20,16 @@ document.addEventListener('DOMContentLoaded', () => {
 
     let nodes = new vis.DataSet();
     let edges = new vis.DataSet();
+    let currentProjectId = null;
+    // Last saved state of the current project, used to send saves as patches
+    let savedProject = null;
 
     let network = new vis.Network(graphDiv, { nodes, edges }, {
         manipulation: {
             enabled: true,
             addEdge: function(edgeData, callback) {
                 if (edgeData.from === edgeData.to) {
-                    var r = confirm("Do you want to connect the node to itself?");
-                    if (r === true) {
-                        callback(edgeData);
-                    }
+                    alert('A node cannot be connected to itself: the graph must stay acyclic');
                 }
                 else {
                     callback(edgeData);
@@ -66,6 +66,33 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
 
+    function diffCollection(collection, before, after) {
+        // JSON-Patch-style ops turning the saved `before` items into `after`, keyed by id
+        const ops = [];
+        const path = id => `/${collection}/${String(id).replace(/~/g, '~0').replace(/\//g, '~1')}`;
+        const previous = new Map(before.map(item => [String(item.id), item]));
+        after.forEach(item => {
+            const old = previous.get(String(item.id));
+            previous.delete(String(item.id));
+            if (!old) {
+                ops.push({ op: 'add', path: path(item.id), value: item });
+            } else if (JSON.stringify(old) !== JSON.stringify(item)) {
+                ops.push({ op: 'replace', path: path(item.id), value: item });
+            }
+        });
+        previous.forEach(item => ops.push({ op: 'remove', path: path(item.id) }));
+        return ops;
+    }
+
+    function projectSaved(data) {
+        if (data.success) {
+            alert('Project saved successfully');
+            loadProjects();
+        } else {
+            alert('Error saving project: ' + data.error);
+        }
+    }
+
     function saveProject() {
         const name = projectNameInput.value;
         const content = {
@@ -78,40 +105,140 @@ document.addEventListener('DOMContentLoaded', () => {
             return;
         }
 
+        if (savedProject && savedProject.id === currentProjectId && savedProject.name === name &&
+                hasIds(savedProject.content)) {
+            // Send only what changed since the last save or load
+            const ops = diffCollection('edges', savedProject.content.edges, content.edges);
+            ops.unshift(...diffCollection('nodes', savedProject.content.nodes, content.nodes));
+            fetch(`/projects/${currentProjectId}/patch`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({ version: savedProject.version, ops }),
+            })
+            .then(response => {
+                if (response.status === 400) {
+                    // The server could not apply the diff; send the whole graph instead
+                    saveWholeProject(name, content, savedProject.version);
+                    return null;
+                }
+                return response.json();
+            })
+            .then(data => {
+                if (!data) {
+                    return;
+                }
+                if (data.success) {
+                    savedProject = { id: currentProjectId, name, version: data.version, content };
+                }
+                projectSaved(data);
+            })
+            .catch(error => console.error('Error:', error));
+            return;
+        }
+
+        saveWholeProject(name, content, savedProject && savedProject.name === name ? savedProject.version : null);
+    }
+
+    function hasIds(content) {
+        // Elements stored without an id (imports, generated graphs) can only be replaced by a full save
+        const hasId = item => item.id !== undefined && item.id !== null;
+        return content.nodes.every(hasId) && content.edges.every(hasId);
+    }
+
+    function saveWholeProject(name, content, version) {
         fetch('/save_project', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ name, content }),
+            body: JSON.stringify({ name, content, version }),
         })
         .then(response => response.json())
         .then(data => {
             if (data.success) {
-                alert('Project saved successfully');
-                loadProjects();
+                currentProjectId = data.id;
+                savedProject = { id: data.id, name, version: data.version, content };
             }
+            projectSaved(data);
         })
         .catch(error => console.error('Error:', error));
     }
 
-    function loadProjects() {
-        fetch('/get_projects')
+    function applyServerLayout(projectId = null) {
+        // Lay the graph out on the server and pin the nodes there instead of
+        // running the physics simulation, which stalls on large graphs
+        fetch('/layout', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ nodes: nodes.get(), edges: edges.get(), project_id: projectId }),
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                return;
+            }
+            network.setOptions({ physics: false });
+            nodes.getIds().forEach(id => {
+                const position = data.positions[String(id)];
+                if (position) {
+                    network.moveNode(id, position.x, position.y);
+                }
+            });
+            network.fit();
+        })
+        .catch(error => console.error('Error:', error));
+    }
+
+    function openProject(projectId) {
+        // The list only carries metadata; fetch the graph itself on demand
+        fetch(`/projects/${projectId}`)
+        .then(response => response.json())
+        .then(project => {
+            if (!project.success) {
+                alert('Error loading project: ' + project.error);
+                return;
+            }
+            nodes.clear();
+            edges.clear();
+            nodes.add(project.content.nodes);
+            edges.add(project.content.edges);
+            projectNameInput.value = project.name;
+            currentProjectId = project.id;
+            savedProject = { id: project.id, name: project.name, version: project.version, content: project.content };
+            applyServerLayout(project.id);
+        })
+        .catch(error => console.error('Error:', error));
+    }
+
+    function loadProjects(page = 1) {
+        fetch(`/projects?page=${page}`)
         .then(response => response.json())
-        .then(projects => {
-            projectsList.innerHTML = '';
-            projects.forEach(project => {
+        .then(data => {
+            if (page === 1) {
+                projectsList.innerHTML = '';
+            }
+            const moreButton = projectsList.querySelector('.load-more');
+            if (moreButton) {
+                moreButton.remove();
+            }
+            data.projects.forEach(project => {
                 const button = document.createElement('button');
                 button.textContent = project.name;
-                button.addEventListener('click', () => {
-                    nodes.clear();
-                    edges.clear();
-                    nodes.add(project.content.nodes);
-                    edges.add(project.content.edges);
-                    projectNameInput.value = project.name;
-                });
+                button.title = `${project.node_count} nodes, ${project.edge_count} edges`;
+                button.addEventListener('click', () => openProject(project.id));
                 projectsList.appendChild(button);
             });
+            if (data.page < data.pages) {
+                const button = document.createElement('button');
+                button.className = 'load-more';
+                button.textContent = 'Load more...';
+                button.addEventListener('click', () => loadProjects(page + 1));
+                projectsList.appendChild(button);
+            }
         })
         .catch(error => console.error('Error:', error));
     }
@@ -134,6 +261,34 @@ document.addEventListener('DOMContentLoaded', () => {
         .catch(error => console.error('Error:', error));
     }
 
+    const labelSuggestions = document.getElementById('node-label-suggestions');
+    let suggestTimer = null;
+    nodeLabelInput.addEventListener('input', () => {
+        // Autocomplete from the suggestion index, debounced while typing
+        clearTimeout(suggestTimer);
+        const query = nodeLabelInput.value.trim();
+        if (query.length < 2) {
+            labelSuggestions.innerHTML = '';
+            return;
+        }
+        suggestTimer = setTimeout(() => {
+            fetch(`/suggest?q=${encodeURIComponent(query)}&fuzzy=1`)
+            .then(response => response.json())
+            .then(data => {
+                labelSuggestions.innerHTML = '';
+                data.suggestions.forEach(node => {
+                    const option = document.createElement('option');
+                    option.value = node.label;
+                    if (node.annotation) {
+                        option.label = node.annotation;
+                    }
+                    labelSuggestions.appendChild(option);
+                });
+            })
+            .catch(error => console.error('Error:', error));
+        }, 150);
+    });
+
     function exportGraph() {
         const graphData = {
             nodes: nodes.get(),
@@ -187,6 +342,103 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    function renderPapers(papers) {
+        const relatedPapersDiv = document.getElementById('related-papers');
+        relatedPapersDiv.innerHTML = ''; // Clear existing papers
+        
+        if (papers && papers.length > 0) {
+            papers.forEach(paper => {
+                const paperDiv = document.createElement('div');
+                paperDiv.className = 'paper-item';
+                
+                const title = document.createElement('div');
+                title.className = 'paper-title';
+                title.textContent = paper.title;
+                
+                const authors = document.createElement('div');
+                authors.className = 'paper-authors';
+                authors.textContent = paper.authors ? paper.authors.join(', ') : 'Unknown authors';
+                
+                const year = document.createElement('div');
+                year.className = 'paper-year';
+                year.textContent = `Published: ${paper.year || 'Year unknown'}`;
+                
+                const doi = document.createElement('a');
+                doi.className = 'paper-doi';
+                if (paper.doi) {
+                    doi.href = paper.doi.startsWith('http') ? paper.doi : `https://doi.org/${paper.doi}`;
+                    doi.textContent = 'View Paper';
+                    doi.target = '_blank';
+                }
+                
+                paperDiv.appendChild(title);
+                paperDiv.appendChild(authors);
+                paperDiv.appendChild(year);
+                if (paper.doi) {
+                    paperDiv.appendChild(doi);
+                }
+                
+                relatedPapersDiv.appendChild(paperDiv);
+            });
+        } else {
+            relatedPapersDiv.innerHTML = '<div class="paper-item">No related papers found.</div>';
+        }
+    }
+
+    function showGenerationStatus(message) {
+        const relatedPapersDiv = document.getElementById('related-papers');
+        relatedPapersDiv.innerHTML = '';
+        const statusDiv = document.createElement('div');
+        statusDiv.className = 'paper-item';
+        statusDiv.textContent = message;
+        relatedPapersDiv.appendChild(statusDiv);
+    }
+
+    function followGenerationJob(jobId) {
+        // Generation runs as a background job; follow its progress over SSE
+        const source = new EventSource(`/admin/jobs/${jobId}/events`);
+        let streaming = false;
+        function addStreamed(dataSet, item) {
+            // Draw nodes and edges as GPT produces them, replacing the old graph
+            if (!streaming) {
+                streaming = true;
+                nodes.clear();
+                edges.clear();
+            }
+            dataSet.update(item);
+        }
+        source.addEventListener('node', event => addStreamed(nodes, JSON.parse(event.data)));
+        source.addEventListener('edge', event => addStreamed(edges, JSON.parse(event.data)));
+        source.addEventListener('progress', event => {
+            const progress = JSON.parse(event.data);
+            if (progress.papers) {
+                renderPapers(progress.papers);
+            } else {
+                showGenerationStatus(progress.message);
+            }
+        });
+        source.addEventListener('done', event => {
+            source.close();
+            const result = JSON.parse(event.data);
+            nodes.clear();
+            edges.clear();
+            nodes.add(result.graph_data.nodes);
+            edges.add(result.graph_data.edges);
+            applyServerLayout();
+            renderPapers(result.papers);
+            if (result.dropped_edges && result.dropped_edges.length) {
+                alert(`Graph generated; ${result.dropped_edges.length} edge(s) that would have created a cycle were left out`);
+            } else {
+                alert('Graph generated successfully');
+            }
+        });
+        source.addEventListener('error', event => {
+            source.close();
+            const error = event.data ? JSON.parse(event.data).error : 'Lost connection to the server';
+            alert('Error generating graph: ' + error);
+        });
+    }
+
     function generateGraph() {
         const prompt = adminPromptInput.value;
         if (!prompt) {
@@ -204,54 +456,8 @@ document.addEventListener('DOMContentLoaded', () => {
         .then(response => response.json())
         .then(data => {
             if (data.success) {
-                nodes.clear();
-                edges.clear();
-                nodes.add(data.graph_data.nodes);
-                edges.add(data.graph_data.edges);
-                
-                // Update related papers section
-                const relatedPapersDiv = document.getElementById('related-papers');
-                relatedPapersDiv.innerHTML = ''; // Clear existing papers
-                
-                if (data.papers && data.papers.length > 0) {
-                    data.papers.forEach(paper => {
-                        const paperDiv = document.createElement('div');
-                        paperDiv.className = 'paper-item';
-                        
-                        const title = document.createElement('div');
-                        title.className = 'paper-title';
-                        title.textContent = paper.title;
-                        
-                        const authors = document.createElement('div');
-                        authors.className = 'paper-authors';
-                        authors.textContent = paper.authors ? paper.authors.join(', ') : 'Unknown authors';
-                        
-                        const year = document.createElement('div');
-                        year.className = 'paper-year';
-                        year.textContent = `Published: ${paper.year || 'Year unknown'}`;
-                        
-                        const doi = document.createElement('a');
-                        doi.className = 'paper-doi';
-                        if (paper.doi) {
-                            doi.href = paper.doi.startsWith('http') ? paper.doi : `https://doi.org/${paper.doi}`;
-                            doi.textContent = 'View Paper';
-                            doi.target = '_blank';
-                        }
-                        
-                        paperDiv.appendChild(title);
-                        paperDiv.appendChild(authors);
-                        paperDiv.appendChild(year);
-                        if (paper.doi) {
-                            paperDiv.appendChild(doi);
-                        }
-                        
-                        relatedPapersDiv.appendChild(paperDiv);
-                    });
-                } else {
-                    relatedPapersDiv.innerHTML = '<div class="paper-item">No related papers found.</div>';
-                }
-                
-                alert('Graph generated successfully');
+                showGenerationStatus('Graph generation queued...');
+                followGenerationJob(data.job_id);
             } else {
                 alert('Error generating graph: ' + data.error);
             }
@@ -358,7 +564,9 @@ document.addEventListener('DOMContentLoaded', () => {
                 edges: edges.get(),
                 outcome: outcome,
                 causes: causes,
-                effect_type: effectType
+                effect_type: effectType,
+                project_id: currentProjectId,
+                mode: 'first'
             })
         })
         .then(response => response.json())
@@ -0,0 +1,139 @@
+"""In-memory index over the node suggestion vocabulary.
+
+The suggestion file is parsed once and indexed three ways: the labels in
+sorted order (whole-label prefix search), every word of every label in
+sorted order (word prefix search), and posting lists of character trigrams
+(fuzzy search). The file is reloaded when its modification time changes.
+"""
+import bisect
+import collections
+import json
+import os
+import re
+import threading
+
+WORD = re.compile(r'\w+')
+# Bounds the work a very short query can cause on a large vocabulary
+SCAN_FACTOR = 20
+
+
+def normalise(text):
+    return ' '.join(WORD.findall(text.lower()))
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SuggestionIndex:
+    """Ranked autocomplete over the suggestions in a JSON file.
+
+    The file holds {"nodes": [{"label": ..., "annotation": ...}, ...]}.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = {'nodes': []}
+        self._mtime = None
+        self._lock = threading.Lock()
+        # (entries, labels, words, positions, trigram postings, trigram counts)
+        self._index = ([], [], [], {}, {}, [])
+        self.reload_if_changed()
+
+    def reload_if_changed(self):
+        """Rebuild the index if the file changed since it was last read."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self._build(data.get('nodes', []))
+            self.data = data
+            self._mtime = mtime
+
+    def _build(self, nodes):
+        entries = []
+        seen = set()
+        for node in nodes:
+            key = normalise(node.get('label', ''))
+            if key and key not in seen:
+                seen.add(key)
+                entries.append((key, node))
+        labels = sorted((key, i) for i, (key, _) in enumerate(entries))
+        words = sorted((word, i) for i, (key, _) in enumerate(entries) for word in set(key.split()))
+        postings = collections.defaultdict(list)
+        gram_counts = []
+        for i, (key, _) in enumerate(entries):
+            grams = trigrams(key)
+            gram_counts.append(len(grams))
+            for gram in grams:
+                postings[gram].append(i)
+        positions = {key: i for i, (key, _) in enumerate(entries)}
+        # Swap everything in at once so concurrent readers see one version
+        self._index = (entries, labels, words, positions, dict(postings), gram_counts)
+
+    def __len__(self):
+        return len(self._index[0])
+
+    @staticmethod
+    def _prefix_range(keys, prefix, limit):
+        start = bisect.bisect_left(keys, (prefix,))
+        for key, i in keys[start:start + limit]:
+            if not key.startswith(prefix):
+                break
+            yield i
+
+    def suggest(self, query, limit=10, fuzzy=False, boosts=None):
+        """Return up to `limit` suggestions for `query`, best first.
+
+        Labels starting with the query rank above labels with a word starting
+        with it, which rank above fuzzy (trigram) matches. Within a rank,
+        labels in `boosts` ({normalised label: weight}) come first, then
+        shorter labels.
+        """
+        self.reload_if_changed()
+        entries, labels, words, positions, postings, gram_counts = self._index
+        query = normalise(query)
+        if not query:
+            return []
+        boosts = boosts or {}
+        scan = limit * SCAN_FACTOR
+        scores = {}
+        for i in self._prefix_range(labels, query, scan):
+            scores[i] = 3
+        last_word = query.split()[-1]
+        for i in self._prefix_range(words, last_word, scan):
+            if i not in scores and query in entries[i][0]:
+                scores[i] = 2
+        # Boosted labels may lie beyond the scanned part of a long range
+        for key in boosts:
+            i = positions.get(key)
+            if i is not None and i not in scores:
+                if key.startswith(query):
+                    scores[i] = 3
+                elif f' {query}' in f' {key}':
+                    scores[i] = 2
+        if fuzzy and len(scores) < limit:
+            for i, similarity in self._similar(query, postings, gram_counts):
+                scores.setdefault(i, similarity)
+        ranked = sorted(scores, key=lambda i: (-scores[i], -boosts.get(entries[i][0], 0), len(entries[i][0])))
+        return [entries[i][1] for i in ranked[:limit]]
+
+    @staticmethod
+    def _similar(query, postings, gram_counts, threshold=0.3):
+        # Jaccard similarity of trigram sets, counted through the posting lists
+        grams = trigrams(query)
+        counts = collections.Counter()
+        for gram in grams:
+            counts.update(postings.get(gram, ()))
+        for i, shared in counts.items():
+            similarity = shared / (len(grams) + gram_counts[i] - shared)
+            if similarity >= threshold:
+                yield i, similarity
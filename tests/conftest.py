@@ -0,0 +1,27 @@
+"""An app on an in-memory database, and a client logged in to it."""
+import pytest
+
+from app import create_app
+from models import db, User
+
+
+@pytest.fixture
+def app():
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'LLM_CACHE_PATH': '',
+        'OPENALEX_CACHE_PATH': '',
+    })
+    with app.app_context():
+        user = User(username='test', is_admin=True)
+        user.set_password('test')
+        db.session.add(user)
+        db.session.commit()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post('/login', data={'username': 'test', 'password': 'test'})
+    return client
@@ -0,0 +1,82 @@
+"""Cycle detection and the dynamic topological order, checked against networkx."""
+import random
+
+import pytest
+
+from acyclic import CycleError, TopologicalOrder, drop_cycle_edges, find_cycles
+
+nx = pytest.importorskip('networkx')
+
+
+def random_graph(seed, n=12):
+    rng = random.Random(seed)
+    nodes = [{'id': i} for i in range(n)]
+    edges = [{'from': v, 'to': w} for v in range(n) for w in range(n) if rng.random() < 0.08]
+    return nodes, edges
+
+
+def to_networkx(nodes, edges):
+    graph = nx.DiGraph()
+    graph.add_nodes_from(str(node['id']) for node in nodes)
+    graph.add_edges_from((str(edge['from']), str(edge['to'])) for edge in edges)
+    return graph
+
+
+def assert_is_cycle(graph, cycle):
+    assert cycle[0] == cycle[-1]
+    assert all(graph.has_edge(v, w) for v, w in zip(cycle, cycle[1:]))
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_find_cycles(seed):
+    nodes, edges = random_graph(seed)
+    graph = to_networkx(nodes, edges)
+    cycles = find_cycles(nodes, edges)
+    components = [c for c in nx.strongly_connected_components(graph)
+                  if len(c) > 1 or graph.has_edge(next(iter(c)), next(iter(c)))]
+    # One cycle per cyclic strongly connected component
+    assert len(cycles) == len(components)
+    for cycle in cycles:
+        assert_is_cycle(graph, cycle)
+    assert sorted(min(c) for c in components) == sorted(cycle[0] for cycle in cycles)
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_topological_order_under_edge_changes(seed):
+    rng = random.Random(seed)
+    order = TopologicalOrder()
+    graph = nx.DiGraph()
+    for _ in range(80):
+        v, w = (str(node) for node in rng.sample(range(10), 2))
+        if graph.has_edge(v, w) and rng.random() < 0.3:
+            order.remove_edge(v, w)
+            graph.remove_edge(v, w)
+            continue
+        graph.add_edge(v, w)
+        closes_cycle = not nx.is_directed_acyclic_graph(graph)
+        try:
+            order.add_edge(v, w)
+        except CycleError as e:
+            assert closes_cycle
+            assert e.cycle[0] == e.cycle[-1] == v
+            graph.remove_edge(v, w)
+        else:
+            assert not closes_cycle
+        position = {node: i for i, node in enumerate(order.order())}
+        assert all(position[a] < position[b] for a, b in graph.edges)
+
+
+def test_from_graph_data_reuses_a_stored_order_only_if_it_fits():
+    nodes = [{'id': node} for node in 'abc']
+    edges = [{'from': 'a', 'to': 'b'}, {'from': 'b', 'to': 'c'}]
+    assert TopologicalOrder.from_graph_data(nodes, edges, ['a', 'b', 'c']).order() == ['a', 'b', 'c']
+    assert TopologicalOrder.from_graph_data(nodes, edges, ['c', 'b', 'a']).order() == ['a', 'b', 'c']
+    with pytest.raises(CycleError):
+        TopologicalOrder.from_graph_data(nodes, edges + [{'from': 'c', 'to': 'a'}])
+
+
+def test_drop_cycle_edges():
+    edges = [{'from': 'a', 'to': 'b'}, {'from': 'b', 'to': 'c'}, {'from': 'c', 'to': 'a'}]
+    kept, dropped = drop_cycle_edges(edges)
+    assert kept == edges[:2]
+    assert dropped == [{'edge': edges[2], 'cycle': ['c', 'a', 'b', 'c']}]
@@ -0,0 +1,85 @@
+"""Adjustment-set enumeration against brute force on small random DAGs."""
+import itertools
+import random
+import time
+
+import pytest
+
+from adjustment import find_adjustment_sets, is_valid_adjustment_set, iter_minimal_adjustment_sets
+from graph import build_graph
+
+
+def random_dag(seed, max_nodes=7):
+    rng = random.Random(seed)
+    n = rng.randint(3, max_nodes)
+    density = rng.uniform(0.1, 0.7)
+    order = list(range(n))
+    rng.shuffle(order)
+    nodes = [{'id': f'n{i}'} for i in range(n)]
+    edges = [{'from': f'n{order[i]}', 'to': f'n{order[j]}'}
+             for i in range(n) for j in range(i + 1, n) if rng.random() < density]
+    return nodes, edges
+
+
+def minimal_sets_by_brute_force(graph, cause, outcome, effect_type):
+    others = [node for node in graph.ids if node not in (cause, outcome)]
+    valid = [frozenset(candidate) for size in range(len(others) + 1)
+             for candidate in itertools.combinations(others, size)
+             if is_valid_adjustment_set(graph, cause, outcome, set(candidate), effect_type)]
+    return {candidate for candidate in valid if not any(other < candidate for other in valid)}
+
+
+@pytest.mark.parametrize('seed', range(40))
+@pytest.mark.parametrize('effect_type', ['total', 'direct'])
+def test_enumeration_matches_brute_force(seed, effect_type):
+    graph = build_graph(*random_dag(seed))
+    for cause, outcome in itertools.permutations(graph.ids, 2):
+        found = [frozenset(s) for s in iter_minimal_adjustment_sets(graph, cause, outcome, effect_type)]
+        expected = minimal_sets_by_brute_force(graph, cause, outcome, effect_type)
+        assert len(found) == len(set(found))
+        assert set(found) == expected
+        if found:
+            assert len(found[0]) == min(map(len, expected))
+
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('effect_type', ['total', 'direct'])
+def test_validity_matches_networkx(seed, effect_type):
+    nx = pytest.importorskip('networkx')
+    nodes, edges = random_dag(seed, max_nodes=6)
+    graph = build_graph(nodes, edges)
+    dag = nx.DiGraph()
+    dag.add_nodes_from(graph.ids)
+    dag.add_edges_from((edge['from'], edge['to']) for edge in edges)
+    for cause, outcome in itertools.permutations(graph.ids, 2):
+        cut = dag.copy()
+        if effect_type == 'total':
+            forbidden = nx.descendants(dag, cause) | {cause}
+            cut.remove_edges_from(list(dag.out_edges(cause)))
+        else:
+            forbidden = nx.descendants(dag, outcome) | {outcome, cause}
+            if cut.has_edge(cause, outcome):
+                cut.remove_edge(cause, outcome)
+        others = [node for node in graph.ids if node not in (cause, outcome)]
+        for size in range(len(others) + 1):
+            for candidate in map(set, itertools.combinations(others, size)):
+                expected = not candidate & forbidden and nx.is_d_separator(cut, {cause}, {outcome}, candidate)
+                assert is_valid_adjustment_set(graph, cause, outcome, candidate, effect_type) == expected
+
+
+def test_limit_returns_the_smallest_sets_first():
+    # Z1 and Z2 both confound X -> Y; W sits on the only other backdoor path through Z2
+    nodes = [{'id': node} for node in ('X', 'Y', 'Z1', 'Z2', 'W')]
+    edges = [{'from': v, 'to': w} for v, w in
+             [('X', 'Y'), ('Z1', 'X'), ('Z1', 'Y'), ('Z2', 'W'), ('W', 'X'), ('Z2', 'Y')]]
+    graph = build_graph(nodes, edges)
+    all_sets, truncated = find_adjustment_sets(graph, 'Y', ['X'])
+    assert not truncated
+    assert sorted(map(sorted, all_sets)) == [['W', 'Z1'], ['Z1', 'Z2']]
+    first, truncated = find_adjustment_sets(graph, 'Y', ['X'], limit=1)
+    assert truncated and len(first) == 1 and first[0] in all_sets
+
+
+def test_a_passed_deadline_stops_before_the_first_set():
+    graph = build_graph(*random_dag(1))
+    assert find_adjustment_sets(graph, 'n0', ['n1'], deadline=time.monotonic() - 1) == ([], True)
@@ -0,0 +1,7 @@
+"""Admin endpoints."""
+
+
+def test_cache_stats_do_not_build_the_graph_generator(app, client):
+    response = client.get('/admin/cache_stats')
+    assert response.json['llm'] == {'in_flight': 0, 'coalesced': 0}
+    assert app.extensions['autodag']._graph_generator is None
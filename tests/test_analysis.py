@@ -0,0 +1,51 @@
+"""Adjustment-set endpoints of the analysis blueprint."""
+import pytest
+
+GRAPH = {
+    'nodes': [{'id': 'Z'}, {'id': 'X'}, {'id': 'Y'}],
+    'edges': [{'from': 'Z', 'to': 'X'}, {'from': 'Z', 'to': 'Y'}, {'from': 'X', 'to': 'Y'}],
+}
+
+
+def query(client, **options):
+    return client.post('/get_adjustment_set', json=dict(GRAPH, outcome='Y', causes=['X'], **options))
+
+
+def test_adjustment_set(client):
+    response = query(client)
+    assert response.json['adjustment_sets'] == [['Z']]
+    assert response.json['truncated'] is False
+    assert query(client).json['cached'] is True
+
+
+def test_limit(client):
+    assert query(client, limit=1).json['adjustment_sets'] == [['Z']]
+    assert query(client, mode='first').json['adjustment_sets'] == [['Z']]
+    assert query(client, limit='2').json['success'] is True
+
+
+@pytest.mark.parametrize('limit', ['abc', 0, -1, 1.5, True])
+def test_bad_limit_is_rejected(client, limit):
+    response = query(client, limit=limit)
+    assert response.status_code == 400
+    assert response.json['error'] == 'limit must be a positive whole number'
+
+
+def test_bad_limit_in_a_batch_is_rejected(client):
+    response = client.post('/get_adjustment_sets_batch', json=dict(
+        GRAPH, queries=[{'outcome': 'Y', 'causes': ['X']}, {'outcome': 'Y', 'causes': ['X'], 'limit': 0}]))
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('outcome, causes', [('Q', ['X']), ('Y', ['X', 'Q'])])
+def test_unknown_nodes_are_rejected(client, outcome, causes):
+    response = client.post('/get_adjustment_set', json=dict(GRAPH, outcome=outcome, causes=causes))
+    assert response.status_code == 400
+    assert response.json['error'] == "Unknown nodes: ['Q']"
+    # Not cached as an empty answer either
+    assert client.post('/get_adjustment_set', json=dict(GRAPH, outcome=outcome, causes=causes)).status_code == 400
+
+
+def test_check_adjustment_set_rejects_unknown_nodes(client):
+    response = client.post('/check_adjustment_set', json=dict(GRAPH, outcome='Y', causes=['X'], adjustment_set=['Q']))
+    assert response.status_code == 400
@@ -0,0 +1,46 @@
+"""The bitset closure index, checked against networkx."""
+import random
+
+import pytest
+
+from closure import ClosureIndex, iter_bits
+from graph import build_graph
+
+nx = pytest.importorskip('networkx')
+
+
+def random_dag(seed, n=30):
+    rng = random.Random(seed)
+    order = list(range(n))
+    rng.shuffle(order)
+    nodes = [{'id': i} for i in range(n)]
+    edges = [{'from': order[i], 'to': order[j]} for i in range(n) for j in range(i + 1, n) if rng.random() < 0.1]
+    return nodes, edges
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_rows_match_networkx(seed):
+    nodes, edges = random_dag(seed)
+    graph = build_graph(nodes, edges)
+    dag = nx.DiGraph()
+    dag.add_nodes_from(graph.ids)
+    dag.add_edges_from((str(edge['from']), str(edge['to'])) for edge in edges)
+    index = ClosureIndex.from_graph(graph)
+    for v, node in enumerate(graph.ids):
+        assert {graph.ids[w] for w in iter_bits(index.descendants[v])} == nx.descendants(dag, node) | {node}
+        assert {graph.ids[w] for w in iter_bits(index.ancestors[v])} == nx.ancestors(dag, node) | {node}
+    cause, outcome = graph.index['0'], graph.index['1']
+    on_paths = {graph.ids[w] for w in iter_bits(index.mediator_bits(cause, outcome))}
+    assert on_paths == (nx.descendants(dag, '0') & nx.ancestors(dag, '1')) - {'0', '1'}
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_bytes_round_trip(seed):
+    index = ClosureIndex.from_graph(build_graph(*random_dag(seed, n=100)))
+    loaded = ClosureIndex.from_bytes(index.to_bytes())
+    assert (loaded.ids, loaded.ancestors, loaded.descendants) == (index.ids, index.ancestors, index.descendants)
+
+
+def test_cycles_are_rejected():
+    with pytest.raises(ValueError):
+        ClosureIndex(['a', 'b'], [(0, 1), (1, 0)])
@@ -0,0 +1,79 @@
+"""Round trips and corrupt input for the packed graph format."""
+import struct
+import zlib
+
+import pytest
+
+from graph_format import HEADER, MAGIC, PackedGraph, GraphFormatError, decode_graph, encode_graph, is_packed
+
+CONTENTS = [
+    {'nodes': [], 'edges': []},
+    {'nodes': [{'id': 1, 'label': 'Smoking'}, {'id': 2, 'label': 'Cancer', 'title': 'Lung cancer'}],
+     'edges': [{'id': 'e1', 'from': 1, 'to': 2}]},
+    # String and integer ids that look alike stay apart, as do missing ids
+    {'nodes': [{'id': '1', 'label': 'A'}, {'id': 1, 'label': 'B'}, {'label': 'no id'}],
+     'edges': [{'from': '1', 'to': 1}, {'from': 1, 'to': '1', 'id': 7}]},
+    # Ids outside int32, non-ASCII text, extra fields and document-level keys
+    {'nodes': [{'id': 2 ** 40, 'label': 'Größe ✓', 'x': 1.5, 'color': {'bg': '#fff'}},
+               {'id': None, 'label': ''}, {'id': 'a\u0000b'}],
+     'edges': [{'from': 2 ** 40, 'to': 'a\u0000b', 'weight': True}, {'from': 'missing', 'to': 2 ** 40}],
+     'meta': {'author': 'x'}},
+    # Equal-comparing extras of different JSON types are kept apart
+    {'nodes': [{'id': 1, 'flag': True}, {'id': 2, 'flag': 1}, {'id': 3, 'flag': 1.0}], 'edges': []},
+]
+
+
+@pytest.mark.parametrize('content', CONTENTS)
+@pytest.mark.parametrize('compress', [True, False])
+def test_round_trip(content, compress):
+    data = encode_graph(content, compress=compress)
+    assert is_packed(data)
+    decoded = decode_graph(data)
+    assert decoded == content
+    assert [type(node.get('flag')) for node in decoded['nodes']] == [type(node.get('flag')) for node in content['nodes']]
+
+
+def test_edges_can_be_read_in_place():
+    content = {'nodes': [{'id': i} for i in range(5)], 'edges': [{'from': i, 'to': i + 1} for i in range(4)]}
+    graph = PackedGraph(encode_graph(content))
+    assert list(graph.sources) == [0, 1, 2, 3]
+    assert list(graph.targets) == [1, 2, 3, 4]
+
+
+def corrupt(data):
+    # (description, bytes) for damaged versions of `data`
+    header = bytearray(data[:HEADER.size])
+    bad_version = bytearray(header)
+    bad_version[len(MAGIC)] = 99
+    return [
+        ('empty', b''),
+        ('not packed', b'{"nodes": []}'),
+        ('header only', bytes(header)),
+        ('bad version', bytes(bad_version) + data[HEADER.size:]),
+        ('truncated', data[:-3]),
+        ('trailing bytes', data + b'\x00'),
+        ('garbled body', bytes(header) + b'\xff' * (len(data) - HEADER.size)),
+    ]
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_corrupt_input_is_rejected(compress):
+    data = encode_graph(CONTENTS[3], compress=compress)
+    for description, damaged in corrupt(data):
+        with pytest.raises(GraphFormatError):
+            decode_graph(damaged)
+
+
+def test_decompression_stops_at_the_size_in_the_header():
+    # A small header in front of a body that inflates to 100 MB
+    header = HEADER.pack(MAGIC, 1, 1, 0, 1, 0, 1, 2, 2, -1)
+    bomb = header + zlib.compress(b'\x00' * (100 * 1024 * 1024), 9)
+    with pytest.raises(GraphFormatError):
+        PackedGraph(bomb)
+
+
+def test_header_counts_must_match_the_body():
+    data = bytearray(encode_graph(CONTENTS[1], compress=False))
+    struct.pack_into('<I', data, 8, 1000)  # node count
+    with pytest.raises(GraphFormatError):
+        decode_graph(bytes(data))
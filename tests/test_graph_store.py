@@ -0,0 +1,62 @@
+"""Node/edge rows and the stored closure index kept by graph_store."""
+from sqlalchemy import select
+
+from graph_store import (bulk_replace_graph_rows, degree_histogram, edges_touching, refresh_project_closure,
+                         sync_graph_rows)
+from models import db, Project, ProjectNode, ProjectEdge
+
+OLD = {
+    'nodes': [{'id': 1, 'label': 'A'}, {'id': 2, 'label': 'B'}, {'id': 3, 'label': 'C'}],
+    'edges': [{'id': 'e1', 'from': 1, 'to': 2}, {'id': 'e2', 'from': 2, 'to': 3}, {'from': 1, 'to': 3}],
+}
+NEW = {
+    'nodes': [{'id': 1, 'label': 'A2'}, {'id': 3, 'label': 'C'}, {'id': 4, 'label': 'D'}],
+    'edges': [{'id': 'e2', 'from': 4, 'to': 3}, {'from': 1, 'to': 3}, {'id': 'e3', 'from': 1, 'to': 4}],
+}
+
+
+def rows(project_id):
+    nodes = db.session.execute(select(ProjectNode.node_id, ProjectNode.label, ProjectNode.data)
+                               .where(ProjectNode.project_id == project_id)).all()
+    edges = db.session.execute(select(ProjectEdge.edge_id, ProjectEdge.source, ProjectEdge.target, ProjectEdge.data)
+                               .where(ProjectEdge.project_id == project_id)).all()
+    return sorted(nodes), sorted(edges)
+
+
+def new_project(name, content):
+    project = Project(user_id=1, name=name)
+    project.set_content(content)
+    db.session.add(project)
+    db.session.flush()
+    return project
+
+
+def test_sync_matches_a_full_rewrite(app):
+    with app.app_context():
+        synced, rewritten = new_project('synced', OLD), new_project('rewritten', NEW)
+        bulk_replace_graph_rows(db.session, {synced.id: OLD})
+        sync_graph_rows(db.session, synced.id, OLD, NEW)
+        bulk_replace_graph_rows(db.session, {rewritten.id: NEW})
+        assert rows(synced.id) == rows(rewritten.id)
+        assert len(rows(synced.id)[0]) == 3 and len(rows(synced.id)[1]) == 3
+
+
+def test_edge_and_degree_queries(app):
+    with app.app_context():
+        project = new_project('p', NEW)
+        bulk_replace_graph_rows(db.session, {project.id: NEW})
+        assert sorted(edge.get('id', '') for edge in edges_touching(db.session, project.id, '4')) == ['e2', 'e3']
+        assert degree_histogram(db.session, project.id, 'in') == {0: 1, 1: 1, 2: 1}
+        assert degree_histogram(db.session, project.id, 'out') == {0: 1, 1: 1, 2: 1}
+
+
+def test_closure_is_only_rebuilt_when_the_structure_changes(app):
+    with app.app_context():
+        project = new_project('p', OLD)
+        refresh_project_closure(project, OLD)
+        data = project.closure.data
+        relabelled = dict(OLD, nodes=[dict(node, label=node['label'] + '!') for node in OLD['nodes']])
+        refresh_project_closure(project, relabelled)
+        assert project.closure.data is data
+        refresh_project_closure(project, NEW)
+        assert project.closure.data != data
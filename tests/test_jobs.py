@@ -0,0 +1,47 @@
+"""Background jobs and their event streams."""
+import threading
+
+from sqlalchemy import insert
+
+from jobs import JobQueue, job_table
+from models import utcnow
+
+
+def events(stream):
+    return [chunk.split('\n')[0] for chunk in stream if not chunk.startswith(':')]
+
+
+def test_job_events_are_streamed(app):
+    queue = JobQueue(app, workers=1, stale_after=5)
+    release = threading.Event()
+
+    def work(job, prompt):
+        job.progress('start', f'Working on {prompt}')
+        release.wait(5)
+        return {'prompt': prompt}
+
+    job = queue.submit(1, work, 'smoking')
+    release.set()
+    assert events(queue.get(job.id).stream()) == ['event: progress', 'event: done']
+    assert queue.get(job.id).to_dict()['result'] == {'prompt': 'smoking'}
+
+
+def test_stream_gives_up_on_a_job_without_a_worker(app):
+    queue = JobQueue(app, workers=1, stale_after=0.3)
+    # A job left running by a process that has since died
+    with queue.engine.begin() as conn:
+        conn.execute(insert(job_table).values(id='dead', owner_id=1, status='running', created_at=utcnow()))
+    job = queue.get('dead')
+    job.poll_interval = 0.05
+    stream = list(job.stream())
+    assert stream == ['event: error\ndata: {"error": "No progress for 0.3 seconds; the job was abandoned"}\n\n']
+    assert queue.get('dead').status == 'failed'
+
+
+def test_abandon_leaves_a_finished_job_alone(app):
+    queue = JobQueue(app, workers=1)
+    job = queue.submit(1, lambda job: 'ok')
+    queue._executor.shutdown(wait=True)
+    job.abandon('too late')
+    assert queue.get(job.id).to_dict()['status'] == 'done'
+    assert [event for _, event, _ in job.events_after(0)] == ['done']
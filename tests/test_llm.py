@@ -0,0 +1,138 @@
+"""GraphGenerator against a local fake of the OpenAI chat completions API."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cache import SQLiteTTLCache
+from llm import GraphGenerator
+
+GRAPH = {'nodes': [{'id': 1, 'label': 'Smoking'}, {'id': 2, 'label': 'Cancer'}], 'edges': [{'from': 1, 'to': 2}]}
+
+
+class FakeOpenAI(ThreadingHTTPServer):
+    """Streams `text` (GRAPH by default) as a chat completion once `release` is set.
+
+    `received` is set when a completion request arrives; `calls` counts them.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeOpenAIHandler)
+        self.text = json.dumps(GRAPH)
+        self.calls = 0
+        self.received = threading.Event()
+        self.release = threading.Event()
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.server_port}/v1'
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.server.calls += 1
+        self.server.received.set()
+        self.server.release.wait(10)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        text = self.server.text
+        for i in range(0, len(text), 16):
+            chunk = {'id': 'chunk', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'gpt-4',
+                     'choices': [{'index': 0, 'delta': {'content': text[i:i + 16]}, 'finish_reason': None}]}
+            self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode())
+        self.wfile.write(b'data: [DONE]\n\n')
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test')
+    server = FakeOpenAI()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+def test_generate(fake_openai):
+    fake_openai.release.set()
+    items = []
+    generator = GraphGenerator(base_url=fake_openai.base_url, timeout=5)
+    assert generator.generate('smoking', [], on_item=lambda kind, item: items.append(kind)) == GRAPH
+    assert items == ['node', 'node', 'edge']
+
+
+def test_identical_generations_are_coalesced(fake_openai):
+    generator = GraphGenerator(base_url=fake_openai.base_url, timeout=5)
+    results = []
+
+    def generate():
+        results.append(generator.generate('smoking', [{'title': 'T', 'abstract': 'A'}]))
+
+    leader = threading.Thread(target=generate)
+    leader.start()
+    assert fake_openai.received.wait(5)
+    follower = threading.Thread(target=generate)
+    follower.start()
+    deadline = time.monotonic() + 5
+    while generator.stats()['coalesced'] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    fake_openai.release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert results == [GRAPH, GRAPH]
+    assert fake_openai.calls == 1
+    assert generator.stats() == {'coalesced': 1, 'in_flight': 0}
+
+
+def test_different_prompts_are_not_coalesced(fake_openai):
+    fake_openai.release.set()
+    generator = GraphGenerator(base_url=fake_openai.base_url, timeout=5)
+    generator.generate('smoking', [])
+    generator.generate('drinking', [])
+    assert fake_openai.calls == 2
+    assert generator.stats()['coalesced'] == 0
+
+
+def test_repeated_prompts_are_served_from_the_cache(fake_openai, tmp_path):
+    fake_openai.release.set()
+    cache = SQLiteTTLCache(str(tmp_path / 'llm.db'), ttl=60)
+    assert GraphGenerator(base_url=fake_openai.base_url, timeout=5, cache=cache).generate('smoking', []) == GRAPH
+    # A new generator, as after a restart, still finds the stored response
+    generator = GraphGenerator(base_url=fake_openai.base_url, timeout=5, cache=cache)
+    assert generator.generate('smoking', []) == GRAPH
+    assert fake_openai.calls == 1
+    assert generator.stats()['hits'] == 1
+
+
+def test_expired_responses_are_fetched_again(fake_openai, tmp_path):
+    fake_openai.release.set()
+    generator = GraphGenerator(base_url=fake_openai.base_url, timeout=5,
+                               cache=SQLiteTTLCache(str(tmp_path / 'llm.db'), ttl=0.2))
+    generator.generate('smoking', [])
+    time.sleep(0.3)
+    assert generator.generate('smoking', []) == GRAPH
+    assert fake_openai.calls == 2
+
+
+def test_truncated_responses_are_not_cached(fake_openai, tmp_path):
+    fake_openai.release.set()
+    fake_openai.text = json.dumps(GRAPH)[:-20]
+    generator = GraphGenerator(base_url=fake_openai.base_url, timeout=5,
+                               cache=SQLiteTTLCache(str(tmp_path / 'llm.db'), ttl=60))
+    assert generator.generate('smoking', [])['truncated'] is True
+    fake_openai.text = json.dumps(GRAPH)
+    assert generator.generate('smoking', []) == GRAPH
+    assert fake_openai.calls == 2
+    assert generator.stats()['entries'] == 1
@@ -0,0 +1,141 @@
+"""OpenAlexClient against a local stub of the OpenAlex API."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import pytest
+
+from cache import SQLiteTTLCache
+from openalex import OpenAlexClient
+
+
+class StubOpenAlex(ThreadingHTTPServer):
+    """Answers /works searches and /works/doi:... lookups.
+
+    `failures` is how many requests get a 503 before the stub answers,
+    `delay` how long each answer takes. Every request path is recorded, and
+    so is the largest number of requests handled at once.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, papers=3, failures=0, delay=0):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.papers = papers
+        self.failures = failures
+        self.delay = delay
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # Clients that time out hang up before the answer is written
+        pass
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        stub = self.server
+        with stub.lock:
+            stub.requests.append(self.path)
+            stub.active += 1
+            stub.max_active = max(stub.max_active, stub.active)
+            failing = stub.failures > 0
+            stub.failures -= failing
+        try:
+            time.sleep(stub.delay)
+            if failing:
+                self.send_response(503)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            path = urlparse(self.path).path
+            if path == '/works':
+                body = {'results': [{'title': f'Paper {i}', 'publication_year': 2020, 'doi': f'10.1/{i}',
+                                     'authorships': []} for i in range(stub.papers)]}
+            else:
+                body = {'abstract': f'Abstract of {path}'}
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        finally:
+            with stub.lock:
+                stub.active -= 1
+
+
+@pytest.fixture
+def stub_server():
+    servers = []
+
+    def start(**options):
+        server = StubOpenAlex(**options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_find_papers(stub_server):
+    stub = stub_server(papers=3)
+    papers, research_context = OpenAlexClient(stub.url).find_papers('smoking')
+    assert [paper['title'] for paper in papers] == ['Paper 0', 'Paper 1', 'Paper 2']
+    assert research_context[0] == {'title': 'Paper 0', 'abstract': 'Abstract of /works/doi:10.1/0'}
+    assert len(stub.requests) == 4
+
+
+def test_retries_with_backoff(stub_server):
+    stub = stub_server(failures=2)
+    started = time.monotonic()
+    results = OpenAlexClient(stub.url, retries=3, backoff=0.1).search_works('smoking')
+    assert len(results) == 3
+    assert len(stub.requests) == 3
+    # urllib3 waits backoff * 2 ** (retry - 1) between retries: 0.1 s, then 0.2 s
+    assert time.monotonic() - started >= 0.2
+
+
+def test_gives_up_after_the_last_retry(stub_server):
+    stub = stub_server(failures=10)
+    assert OpenAlexClient(stub.url, retries=2, backoff=0).search_works('smoking') == []
+    assert len(stub.requests) == 3
+
+
+def test_timeout(stub_server):
+    stub = stub_server(delay=2)
+    client = OpenAlexClient(stub.url, timeout=0.2, retries=0)
+    started = time.monotonic()
+    assert client.search_works('smoking') == []
+    assert client.get_work_by_doi('10.1/0') is None
+    assert time.monotonic() - started < 1.5
+
+
+def test_doi_lookups_respect_the_concurrency_cap(stub_server):
+    stub = stub_server(papers=8, delay=0.1)
+    papers, research_context = OpenAlexClient(stub.url, concurrency=3).find_papers('smoking')
+    assert len(research_context) == 8
+    assert stub.max_active == 3
+
+
+def test_cache_is_keyed_on_the_base_url(stub_server, tmp_path):
+    first, second = stub_server(papers=1), stub_server(papers=2)
+    cache = SQLiteTTLCache(str(tmp_path / 'openalex.db'), ttl=60)
+    assert len(OpenAlexClient(first.url, cache=cache).search_works('smoking')) == 1
+    assert len(OpenAlexClient(second.url, cache=cache).search_works('smoking')) == 2
+    assert len(OpenAlexClient(first.url, cache=cache, offline=True).search_works('smoking')) == 1
@@ -0,0 +1,43 @@
+"""Reading project imports in each of the accepted layouts."""
+import gzip
+import io
+import json
+
+from project_io import iter_import_records
+
+GRAPH = {'nodes': [{'id': 1, 'label': 'A'}, {'id': 2, 'label': 'B'}], 'edges': [{'from': 1, 'to': 2}]}
+
+
+def records(data, filename='projects.json'):
+    return list(iter_import_records(io.BytesIO(json.dumps(data).encode()), filename))
+
+
+def test_single_project_is_named_after_the_file():
+    assert records(GRAPH, 'smoking.json') == [('smoking', GRAPH)]
+
+
+def test_single_project_with_a_leading_key():
+    content = {'meta': {'author': 'x'}, 'nodes': GRAPH['nodes'], 'edges': GRAPH['edges']}
+    assert records(content, 'smoking.json') == [('smoking', content)]
+
+
+def test_map_of_projects():
+    assert records({'first': GRAPH, 'second': GRAPH}) == [('first', GRAPH), ('second', GRAPH)]
+
+
+def test_map_with_a_project_called_nodes():
+    # A "nodes" key alone is not enough to make the file a single project
+    assert records({'nodes': GRAPH, 'other': GRAPH}) == [('nodes', GRAPH), ('other', GRAPH)]
+
+
+def test_array_and_ndjson_records():
+    exported = [{'name': 'first', 'content': GRAPH}, {'name': 'second', 'content': GRAPH}]
+    assert records(exported) == [('first', GRAPH), ('second', GRAPH)]
+    lines = ''.join(json.dumps(record) + '\n' for record in exported).encode()
+    assert list(iter_import_records(io.BytesIO(gzip.compress(lines)), 'projects.ndjson.gz')) == \
+        [('first', GRAPH), ('second', GRAPH)]
+
+
+def test_large_values_span_read_chunks():
+    big = {'nodes': [{'id': i, 'label': 'x' * 50} for i in range(5000)], 'edges': []}
+    assert records({'big': big, 'small': GRAPH}) == [('big', big), ('small', GRAPH)]
@@ -0,0 +1,35 @@
+"""Saving and patching projects through the projects blueprint."""
+import pytest
+
+GRAPH = {'nodes': [{'id': 1, 'label': 'A'}, {'id': 2, 'label': 'B'}], 'edges': [{'id': 'e1', 'from': 1, 'to': 2}]}
+
+
+def save(client, **data):
+    return client.post('/save_project', json=dict({'name': 'p', 'content': GRAPH}, **data))
+
+
+def test_patch_bumps_the_version(client):
+    project_id = save(client).json['id']
+    response = client.post(f'/projects/{project_id}/patch', json={
+        'version': 1, 'ops': [{'op': 'replace', 'path': '/nodes/1/label', 'value': 'AA'}]})
+    assert response.json == {'success': True, 'version': 2}
+    assert client.post(f'/projects/{project_id}/patch', json={'version': 1, 'ops': []}).status_code == 409
+
+
+@pytest.mark.parametrize('body', [{'ops': []}, {'version': 'x', 'ops': []}, {'version': 1.5, 'ops': []},
+                                  {'version': True, 'ops': []}, ['not', 'an', 'object']])
+def test_patch_rejects_a_bad_version(client, body):
+    project_id = save(client).json['id']
+    response = client.post(f'/projects/{project_id}/patch', json=body)
+    assert response.status_code == 400
+    assert response.json['success'] is False
+
+
+def test_save_checks_the_version(client):
+    save(client)
+    renamed = dict(GRAPH, nodes=[{'id': 1, 'label': 'AA'}, {'id': 2, 'label': 'B'}])
+    assert save(client, content=renamed, version='1').json['version'] == 2
+    assert save(client, version=1).status_code == 409
+    response = save(client, version='x')
+    assert response.status_code == 400
+    assert response.json['error'] == 'version must be a whole number'
@@ -0,0 +1,23 @@
+"""Blueprints for the web routes.
+
+- ``auth``: login, logout and registration.
+- ``projects``: the editor page, saving and patching projects, import and
+  export of single graphs, node suggestions.
+- ``analysis``: layout and adjustment sets.
+- ``admin``: user and project management, bulk import/export, metrics and
+  AI graph generation jobs.
+
+Endpoints are named after their blueprint, e.g. ``url_for('auth.login')``;
+the URLs themselves are unprefixed.
+"""
+from views.admin import bp as admin
+from views.analysis import bp as analysis
+from views.auth import bp as auth
+from views.projects import bp as projects
+
+BLUEPRINTS = (auth, projects, analysis, admin)
+
+
+def register_blueprints(app):
+    for blueprint in BLUEPRINTS:
+        app.register_blueprint(blueprint)
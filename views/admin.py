@@ -0,0 +1,218 @@
+from flask import Blueprint, Response, current_app, stream_with_context, render_template, request, jsonify, redirect, url_for, flash
+from flask_login import login_required, current_user
+from models import db, User, Project
+import hmac
+import logging
+import time
+from acyclic import drop_cycle_edges
+from project_io import iter_project_rows, iter_ndjson, iter_json_array, gzip_stream, iter_import_records, bulk_import_projects
+from metrics import REGISTRY, GENERATION_SECONDS
+from services import services
+
+bp = Blueprint('admin', __name__)
+
+@bp.route('/admin')
+@login_required
+def admin():
+    if not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('projects.index'))
+    users = User.query.all()
+    projects = Project.query.all()
+    return render_template('admin.html', users=users, projects=projects)
+
+@bp.route('/admin/delete_user/<int:user_id>', methods=['POST'])
+@login_required
+def delete_user(user_id):
+    if not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('projects.index'))
+
+    user = User.query.get_or_404(user_id)
+    if user == current_user:
+        flash('You cannot delete your own account')
+        return redirect(url_for('admin.admin'))
+
+    db.session.delete(user)
+    db.session.commit()
+    flash(f'User {user.username} has been deleted')
+    return redirect(url_for('admin.admin'))
+
+@bp.route('/admin/make_user_admin/<int:user_id>', methods=['POST'])
+@login_required
+def make_user_admin(user_id):
+    if not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('projects.index'))
+
+    user = User.query.get_or_404(user_id)
+    user.is_admin = True
+    db.session.commit()
+    flash(f'User {user.username} has been made an admin')
+    return redirect(url_for('admin.admin'))
+
+@bp.route('/admin/delete_project/<int:project_id>', methods=['POST'])
+@login_required
+def delete_project(project_id):
+    if not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('projects.index'))
+    project = Project.query.get_or_404(project_id)
+    db.session.delete(project)
+    db.session.commit()
+    flash(f'Project {project.name} has been deleted')
+    return redirect(url_for('admin.admin'))
+
+@bp.route('/admin/cache_stats')
+@login_required
+def cache_stats():
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'error': 'Access denied'})
+    return jsonify({'success': True, 'adjustment_sets': services().adjustment_cache.stats(),
+                    'llm': services().graph_generator_stats()})
+
+@bp.route('/metrics')
+def prometheus_metrics():
+    """Prometheus metrics for this process; for admins, or with `Authorization: Bearer <METRICS_TOKEN>`."""
+    token = current_app.config['METRICS_TOKEN']
+    authorised = token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not authorised and not (current_user.is_authenticated and current_user.is_admin):
+        return Response('Access denied\n', status=403, mimetype='text/plain')
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/admin/export_all_projects')
+@login_required
+def export_all_projects():
+    if not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('projects.index'))
+    # Streamed straight from the database: `format=ndjson` for one project
+    # per line instead of a JSON array, `gzip=1` to compress on the fly
+    ndjson = request.args.get('format') == 'ndjson'
+    chunks = (iter_ndjson if ndjson else iter_json_array)(iter_project_rows(db.session))
+    filename = 'all_projects_export.ndjson' if ndjson else 'all_projects_export.json'
+    mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+    if request.args.get('gzip', '').lower() in ('1', 'true', 'yes'):
+        chunks = gzip_stream(chunks)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+@bp.route('/admin/import_projects', methods=['POST'])
+@login_required
+def import_projects():
+    if not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('projects.index'))
+
+    if 'json_file' not in request.files:
+        flash('No file part')
+        return redirect(url_for('admin.admin'))
+
+    file = request.files['json_file']
+    if file.filename == '':
+        flash('No selected file')
+        return redirect(url_for('admin.admin'))
+
+    if not file.filename.endswith(('.json', '.ndjson', '.json.gz', '.ndjson.gz')):
+        flash('Invalid file type')
+        return redirect(url_for('admin.admin'))
+
+    # Everything goes in one transaction; a dry run only validates and counts
+    dry_run = request.form.get('dry_run', '').lower() in ('1', 'true', 'yes', 'on')
+    try:
+        records = iter_import_records(file.stream, file.filename)
+        report = bulk_import_projects(db.session, current_user.id, records, dry_run=dry_run)
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        report = {'error': f'Invalid JSON file: {str(e)}'}
+    except Exception as e:
+        db.session.rollback()
+        report = {'error': f'Error importing projects: {str(e)}'}
+
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(dict(report, success='error' not in report))
+    if 'error' in report:
+        flash(report['error'])
+    else:
+        prefix = 'Dry run: would have imported' if dry_run else 'Successfully imported'
+        flash(f"{prefix} {report['created'] + report['updated']} project(s) "
+              f"({report['created']} new, {report['updated']} updated, {report['skipped']} skipped) "
+              f"in {report['elapsed']:.2f}s")
+        for error in report['errors']:
+            flash(error)
+    return redirect(url_for('admin.admin'))
+
+@bp.route('/admin/generate_graph', methods=['POST'])
+@login_required
+def generate_graph():
+    """Queue an AI graph generation job and return its id straight away."""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'error': 'Access denied'})
+
+    prompt = request.json.get('prompt') if request.json else None
+    if not prompt:
+        return jsonify({'success': False, 'error': 'No prompt provided'})
+
+    job = services().generation_jobs.submit(current_user.id, generate_graph_for_job, prompt)
+    return jsonify({'success': True, 'job_id': job.id}), 202
+
+@bp.route('/admin/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    job = services().generation_jobs.get(job_id)
+    if job is None or job.owner_id != current_user.id:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify(dict(job.to_dict(), success=True))
+
+@bp.route('/admin/jobs/<job_id>/events')
+@login_required
+def job_events(job_id):
+    job = services().generation_jobs.get(job_id)
+    if job is None or job.owner_id != current_user.id:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return Response(job.stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def generate_graph_for_job(job, prompt):
+    """Background body of a generation job: OpenAlex lookup, then GPT."""
+    # Runs on a job thread, in an app context but outside any request
+    logging.info("Starting graph generation")
+    if current_app.config['PROFILING']:
+        logging.info(f"Original prompt: {prompt}")
+
+    # Step 1: Query OpenAlex API first
+    job.progress('openalex', 'Searching OpenAlex for related papers')
+    started = time.perf_counter()
+    papers, research_context = services().openalex_client.find_papers(prompt)
+    elapsed = time.perf_counter() - started
+    GENERATION_SECONDS.observe(elapsed, phase='openalex')
+    logging.info(f"Found {len(papers)} papers, {len(research_context)} with abstracts, in {elapsed:.2f}s")
+    job.progress('openalex', f'Found {len(papers)} related papers', papers=papers)
+
+    job.progress('gpt', 'Generating graph with GPT')
+    # Use OpenAI GPT to generate graph data with research context, passing
+    # each node and edge on to the client as soon as it has been parsed
+    started = time.perf_counter()
+    graph_data = services().graph_generator.generate(prompt, research_context, on_item=job.emit)
+    elapsed = time.perf_counter() - started
+    GENERATION_SECONDS.observe(elapsed, phase='gpt')
+    logging.info(f"Generated {len(graph_data.get('nodes', []))} nodes and {len(graph_data.get('edges', []))} edges "
+                 f"in {elapsed:.2f}s")
+
+    # GPT sometimes closes a loop; keep the graph a DAG and say what was dropped
+    kept, dropped = drop_cycle_edges(graph_data.get('edges', []))
+    graph_data = dict(graph_data, edges=kept)
+    if dropped:
+        logging.info(f"Dropped {len(dropped)} edges that would create cycles")
+
+    return {
+        'graph_data': graph_data,
+        'papers': papers,
+        'dropped_edges': dropped
+    }
@@ -0,0 +1,257 @@
+from flask import Blueprint, Response, current_app, request, jsonify
+from flask_login import current_user
+from models import db, Project, ProjectLayout
+import json
+import logging
+import time
+from graph import build_graph, structure_hash
+from acyclic import find_cycles
+from closure import ClosureIndex
+from adjustment import is_valid_adjustment_set, find_adjustment_sets, result_limit
+from metrics import STORED_LOOKUPS
+from services import services
+from views.common import cycle_error
+
+bp = Blueprint('analysis', __name__)
+
+def load_project_closure(project_id, graph, graph_hash):
+    """Attach the stored closure index of one of the user's projects to `graph` if it still matches.
+
+    `graph_hash` is the structure hash of `graph`; the stored index is only
+    read when it was built for the same hash, and kept parsed in memory.
+    """
+    if not project_id or not current_user.is_authenticated:
+        return
+    project = db.session.get(Project, int(project_id))
+    if project is None or project.user_id != current_user.id or project.closure is None:
+        return
+    if project.closure.structure_hash != graph_hash:
+        STORED_LOOKUPS.inc(index='closure', result='stale')
+        return
+    project_closures = services().project_closures
+    key = (project.id, graph_hash)
+    index = project_closures.get(key)
+    if index is None:
+        index = ClosureIndex.from_bytes(project.closure.data)
+        project_closures.put(key, index, size=len(index.ids) * (len(index.ids) + 7) // 4)
+    # The same structure may list its nodes in another order
+    if index.ids == graph.ids:
+        graph.closure = index
+        STORED_LOOKUPS.inc(index='closure', result='hit')
+    else:
+        STORED_LOOKUPS.inc(index='closure', result='stale')
+
+@bp.route('/layout', methods=['POST'])
+def layout_graph():
+    """Compute a layered layout for the posted graph.
+
+    With the `project_id` of one of the user's projects, the positions are
+    stored with the project and returned as they are until its structure
+    (node ids and edge endpoints) changes.
+    """
+    data = request.get_json()
+    nodes = data.get('nodes', [])
+    edges = data.get('edges', [])
+    graph_hash = structure_hash(nodes, edges)
+
+    project = None
+    project_id = data.get('project_id')
+    if project_id and current_user.is_authenticated:
+        project = db.session.get(Project, int(project_id))
+        if project is None or project.user_id != current_user.id:
+            project = None
+    if project is not None and project.layout is not None:
+        if project.layout.structure_hash == graph_hash:
+            STORED_LOOKUPS.inc(index='layout', result='hit')
+            return jsonify({'success': True, 'positions': json.loads(project.layout.data), 'cached': True})
+        STORED_LOOKUPS.inc(index='layout', result='stale')
+
+    # NumPy is only loaded once a layout actually has to be computed
+    from layout import sugiyama_layout
+
+    started = time.perf_counter()
+    positions = sugiyama_layout(build_graph(nodes, edges))
+    logging.info(f"Laid out {len(nodes)} nodes in {time.perf_counter() - started:.3f}s")
+    if project is not None:
+        if project.layout is None:
+            project.layout = ProjectLayout(structure_hash=graph_hash, data=json.dumps(positions))
+        else:
+            project.layout.structure_hash = graph_hash
+            project.layout.data = json.dumps(positions)
+        db.session.commit()
+    return jsonify({'success': True, 'positions': positions, 'cached': False})
+
+@bp.route('/get_adjustment_set', methods=['POST'])
+def get_adjustment_set():
+    try:
+        data = request.get_json()
+        nodes = data.get('nodes', [])
+        edges = data.get('edges', [])
+        outcome = data.get('outcome')
+        causes = data.get('causes', [])
+        effect_type = data.get('effect_type', 'total')  # Default to total effect
+        try:
+            limit = result_limit(data)  # mode='first' or limit=N stop after N sets, smallest first
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e), 'adjustment_sets': []}), 400
+        # An unknown node would look like a graph with no adjustment set, and be cached as one
+        known = {str(node['id']) for node in nodes}
+        unknown = [str(n) for n in causes + [outcome] if str(n) not in known]
+        if unknown:
+            return jsonify({'success': False, 'error': f'Unknown nodes: {unknown}', 'adjustment_sets': []}), 400
+        time_limit = data.get('time_limit')  # Optional wall time budget in seconds
+        deadline = time.monotonic() + float(time_limit) if time_limit else None
+        adjustment_cache = services().adjustment_cache
+
+        logging.info(f"Received request - Nodes: {len(nodes)}, Edges: {len(edges)}")
+        logging.info(f"Outcome: {outcome}, Causes: {causes}, Effect Type: {effect_type}")
+
+        # Results only depend on the structure, so cosmetic edits still hit the cache
+        graph_hash = structure_hash(nodes, edges)
+        cache_key = adjustment_cache_key(graph_hash, outcome, causes, effect_type, limit)
+        cached = adjustment_cache.get(cache_key)
+        if cached is not None:
+            return jsonify({
+                'success': True,
+                'adjustment_sets': cached['adjustment_sets'],
+                'truncated': cached['truncated'],
+                'cached': True
+            })
+
+        cycles = find_cycles(nodes, edges)
+        if cycles:
+            return cycle_error(cycles)
+        dag = build_graph(nodes, edges)
+        load_project_closure(data.get('project_id'), dag, graph_hash)
+
+        logging.info(f"Added {len(dag.nodes)} nodes and {len(dag.arcs)} edges to DAG")
+        if current_app.config['PROFILING']:
+            # Formatting whole graphs is expensive, so only when profiling
+            logging.info(f"DAG nodes: {dag.nodes}")
+            logging.info(f"DAG arcs: {dag.arcs}")
+
+        # Convert causes to list of strings
+        causes = [str(c) for c in causes]
+        outcome = str(outcome)
+
+        logging.info(f"Calculating {effect_type} effect adjustment set for outcome {outcome} and causes {causes}")
+
+        all_adjustment_sets, truncated = find_adjustment_sets(
+            dag, outcome, causes, effect_type, limit, deadline)
+
+        if current_app.config['PROFILING']:
+            logging.info(f"Final adjustment sets: {all_adjustment_sets}")
+        else:
+            logging.info(f"Found {len(all_adjustment_sets)} adjustment sets (truncated: {truncated})")
+
+        if is_reusable(all_adjustment_sets, truncated, limit):
+            adjustment_cache.put(cache_key, {'adjustment_sets': all_adjustment_sets, 'truncated': truncated})
+
+        return jsonify({
+            'success': True,
+            'adjustment_sets': all_adjustment_sets,
+            'truncated': truncated,
+            'cached': False
+        })
+
+    except Exception as e:
+        logging.error(f"Error in get_adjustment_set: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'adjustment_sets': []
+        })
+
+def adjustment_cache_key(graph_hash, outcome, causes, effect_type, limit):
+    return (graph_hash, str(outcome), tuple(sorted(str(c) for c in causes)), effect_type, limit)
+
+def is_reusable(adjustment_sets, truncated, limit):
+    """Results cut short by the time limit depend on timing and are not cached."""
+    return not truncated or (limit is not None and len(adjustment_sets) >= limit)
+
+@bp.route('/get_adjustment_sets_batch', methods=['POST'])
+def get_adjustment_sets_batch():
+    """Answer many (outcome, causes) queries on one graph, streamed back as NDJSON.
+
+    Each line is a query result tagged with its position in `queries`.
+    """
+    # The process pool machinery is only loaded for batches
+    from batch import run_batch
+
+    data = request.get_json()
+    nodes = data.get('nodes', [])
+    edges = data.get('edges', [])
+    queries = data.get('queries', [])
+    try:
+        timeout = float(data['timeout'] if data.get('timeout') is not None else current_app.config['BATCH_TIMEOUT'])
+    except (TypeError, ValueError):
+        timeout = None
+    if timeout is None or not 0 < timeout < float('inf'):
+        return jsonify({'success': False, 'error': 'timeout must be a positive number of seconds'}), 400
+    timeout = min(timeout, current_app.config['BATCH_TIMEOUT'])
+    try:
+        limits = [result_limit(query) for query in queries]
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    workers = current_app.config['BATCH_WORKERS']
+    adjustment_cache = services().adjustment_cache
+
+    cycles = find_cycles(nodes, edges)
+    if cycles:
+        return cycle_error(cycles)
+    graph_hash = structure_hash(nodes, edges)
+    dag = build_graph(nodes, edges)
+    dag.closure  # Build the index once here so every worker inherits it
+    logging.info(f"Batch of {len(queries)} adjustment set queries on {len(dag.nodes)} nodes")
+
+    def query_key(i):
+        query = queries[i]
+        return adjustment_cache_key(graph_hash, query.get('outcome'), query.get('causes', []),
+                                    query.get('effect_type', 'total'), limits[i])
+
+    def generate():
+        misses = []
+        for i, query in enumerate(queries):
+            cached = adjustment_cache.get(query_key(i))
+            if cached is not None:
+                yield json.dumps(dict(cached, index=i, success=True, cached=True)) + '\n'
+            else:
+                misses.append((i, query))
+        for j, result in run_batch(dag, [query for _, query in misses], timeout, workers):
+            i = misses[j][0]
+            if result['success'] and is_reusable(result['adjustment_sets'], result['truncated'], limits[i]):
+                adjustment_cache.put(query_key(i), {'adjustment_sets': result['adjustment_sets'],
+                                                    'truncated': result['truncated']})
+            yield json.dumps(dict(result, index=i, cached=False)) + '\n'
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@bp.route('/check_adjustment_set', methods=['POST'])
+def check_adjustment_set():
+    try:
+        data = request.get_json()
+        outcome = str(data.get('outcome'))
+        causes = [str(c) for c in data.get('causes', [])]
+        effect_type = data.get('effect_type', 'total')
+        adjustment_set = {str(n) for n in data.get('adjustment_set', [])}
+
+        cycles = find_cycles(data.get('nodes', []), data.get('edges', []))
+        if cycles:
+            return cycle_error(cycles)
+        dag = build_graph(data.get('nodes', []), data.get('edges', []))
+        unknown = [n for n in causes + [outcome] + sorted(adjustment_set) if n not in dag]
+        if unknown:
+            return jsonify({'success': False, 'error': f'Unknown nodes: {unknown}'}), 400
+
+        results = {
+            cause: is_valid_adjustment_set(dag, cause, outcome, adjustment_set, effect_type)
+            for cause in causes
+        }
+        return jsonify({
+            'success': True,
+            'valid': all(results.values()),
+            'causes': results
+        })
+    except Exception as e:
+        logging.error(f"Error in check_adjustment_set: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
@@ -0,0 +1,20 @@
+"""Responses shared by several blueprints."""
+from flask import jsonify
+
+
+def cycle_error(cycles):
+    """Reject a graph with cycles, listing one cycle per cyclic component."""
+    described = '; '.join(' -> '.join(cycle) for cycle in cycles[:5])
+    return jsonify({
+        'success': False,
+        'error': f'The graph must not contain cycles: {described}',
+        'cycles': cycles,
+    }), 400
+
+
+def version_conflict(project):
+    return jsonify({
+        'success': False,
+        'error': 'Project was changed elsewhere; reload it before saving',
+        'version': project.version,
+    }), 409
@@ -0,0 +1,278 @@
+from flask import Blueprint, Response, current_app, render_template, request, jsonify, send_file
+from flask_login import login_required, current_user
+from models import db, Project, ProjectNode, ProjectOrder
+import json
+from io import BytesIO
+import time
+from acyclic import CycleError, TopologicalOrder, find_cycles
+from patches import apply_patch, PatchError
+from graph_store import sync_graph_rows, refresh_project_closure, edges_touching, degree_histogram
+from suggestions import normalise
+from graph_format import MIMETYPE as PACKED_GRAPH_MIMETYPE, encode_graph, decode_graph, is_packed, GraphFormatError
+from services import services
+from views.common import cycle_error, version_conflict
+from sqlalchemy.orm import defer
+from sqlalchemy.orm.exc import StaleDataError
+
+bp = Blueprint('projects', __name__)
+
+@bp.route('/')
+@login_required
+def index():
+    return render_template('index.html')
+
+@bp.route('/save_project', methods=['POST'])
+@login_required
+def save_project():
+    """Save a whole project; `version`, if given, must match the stored one."""
+    data = request.json
+    cycles = find_cycles(data['content'].get('nodes', []), data['content'].get('edges', []))
+    if cycles:
+        return cycle_error(cycles)
+    version = data.get('version')
+    if version is not None:
+        version = parse_version(version)
+        if version is None:
+            return jsonify({'success': False, 'error': 'version must be a whole number'}), 400
+    project = Project.query.filter_by(name=data['name'], user_id=current_user.id).first()
+    if project:
+        if version is not None and version != project.version:
+            return version_conflict(project)
+    else:
+        project = Project(name=data['name'], user_id=current_user.id)
+        db.session.add(project)
+    write_project_content(project, data['content'])
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return version_conflict(db.session.get(Project, project.id))
+    return jsonify(success=True, id=project.id, version=project.version)
+
+@bp.route('/projects/<int:project_id>/patch', methods=['POST'])
+@login_required
+def patch_project(project_id):
+    """Apply node/edge operations to a project saved at the given version.
+
+    Expects {'version': n, 'ops': [...]} (see patches.py). A stale version
+    gets a 409 with the current one; otherwise the version is bumped.
+    """
+    data = request.get_json()
+    project = db.session.get(Project, project_id)
+    if project is None or project.user_id != current_user.id:
+        return jsonify({'success': False, 'error': 'Project not found'}), 404
+    if not isinstance(data, dict) or data.get('version') is None:
+        return jsonify({'success': False, 'error': 'A version is required'}), 400
+    version = parse_version(data['version'])
+    if version is None:
+        return jsonify({'success': False, 'error': 'version must be a whole number'}), 400
+    if version != project.version:
+        return version_conflict(project)
+    previous = json.loads(project.content)
+    try:
+        content = apply_patch(previous, data.get('ops'))
+    except PatchError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    try:
+        try:
+            order = load_project_order(project, previous)
+        except CycleError:
+            # Saved before cycles were rejected: check the new content as a whole
+            order = TopologicalOrder.from_graph_data(content.get('nodes', []), content.get('edges', []))
+        else:
+            # Only the edges the patch adds are checked against the stored order
+            order.apply_changes(previous, content)
+    except CycleError as e:
+        return cycle_error([e.cycle])
+    write_project_content(project, content, previous, order)
+    try:
+        # The UPDATE only matches the version read above, so a concurrent save wins
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return version_conflict(db.session.get(Project, project_id))
+    return jsonify({'success': True, 'version': project.version})
+
+def parse_version(value):
+    """Return a project version sent by the client as an int, or None if it is not a whole number."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return None
+
+def load_project_order(project, content):
+    """Return the topological order of `project`, whose parsed content is given.
+
+    The stored order is reused when it still fits the content; projects
+    written by the bulk import (or before orders were kept) get one built.
+    """
+    stored = json.loads(project.order.data)['order'] if project.order is not None else None
+    return TopologicalOrder.from_graph_data(content.get('nodes', []), content.get('edges', []), stored)
+
+def write_project_content(project, content, previous=None, order=None):
+    """Store new content for `project` with its derived indexes and node/edge rows.
+
+    `previous` is the parsed content being replaced, if the caller has it;
+    only the rows of elements that differ from it are rewritten. `order` is
+    the content's topological order if the caller already maintains it.
+    """
+    if previous is None and project.content:
+        previous = json.loads(project.content)
+    project.set_content(content)
+    refresh_project_closure(project, content)
+    if order is None:
+        order = TopologicalOrder.from_graph_data(content.get('nodes', []), content.get('edges', []))
+    if project.order is None:
+        project.order = ProjectOrder(data=json.dumps(order.to_dict()))
+    else:
+        project.order.data = json.dumps(order.to_dict())
+    if project.id is None:
+        # New projects need their id before rows can point at them
+        db.session.flush()
+    sync_graph_rows(db.session, project.id, previous, content)
+
+@bp.route('/get_projects')
+@login_required
+def get_projects():
+    projects = Project.query.filter_by(user_id=current_user.id).all()
+    return jsonify([{'id': p.id, 'name': p.name, 'version': p.version, 'content': json.loads(p.content)} for p in projects])
+
+@bp.route('/projects')
+@login_required
+def list_projects():
+    """Page through the user's projects, most recently updated first, without their content."""
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 50, type=int)
+    query = (Project.query
+             .filter_by(user_id=current_user.id)
+             .options(defer(Project.content))
+             .order_by(Project.updated_at.desc(), Project.id.desc()))
+    pagination = query.paginate(page=page, per_page=per_page, max_per_page=200, error_out=False)
+    return jsonify({
+        'projects': [p.to_summary() for p in pagination.items],
+        'page': pagination.page,
+        'per_page': pagination.per_page,
+        'total': pagination.total,
+        'pages': pagination.pages,
+    })
+
+@bp.route('/projects/<int:project_id>')
+@login_required
+def get_project(project_id):
+    project = db.session.get(Project, project_id)
+    if project is None or project.user_id != current_user.id:
+        return jsonify({'success': False, 'error': 'Project not found'}), 404
+    return jsonify(dict(project.to_summary(), success=True, content=json.loads(project.content)))
+
+@bp.route('/projects/<int:project_id>/edges')
+@login_required
+def project_edges(project_id):
+    """Edges of a project touching the node given as `?node=`, straight from the edge table."""
+    project = db.session.get(Project, project_id)
+    if project is None or project.user_id != current_user.id:
+        return jsonify({'success': False, 'error': 'Project not found'}), 404
+    node_id = request.args.get('node')
+    if node_id is None:
+        return jsonify({'success': False, 'error': 'A node is required'}), 400
+    return jsonify({'success': True, 'edges': edges_touching(db.session, project_id, node_id)})
+
+@bp.route('/projects/<int:project_id>/stats')
+@login_required
+def project_stats(project_id):
+    project = db.session.get(Project, project_id)
+    if project is None or project.user_id != current_user.id:
+        return jsonify({'success': False, 'error': 'Project not found'}), 404
+    return jsonify({
+        'success': True,
+        'node_count': project.node_count,
+        'edge_count': project.edge_count,
+        'in_degree': degree_histogram(db.session, project_id, 'in'),
+        'out_degree': degree_histogram(db.session, project_id, 'out'),
+    })
+
+@bp.route('/get_node_suggestions')
+def get_node_suggestions():
+    suggestion_index = services().suggestion_index
+    suggestion_index.reload_if_changed()
+    return jsonify(suggestion_index.data)
+
+@bp.route('/suggest')
+def suggest():
+    """Autocomplete node labels: `q`, optional `limit` and `fuzzy=1`.
+
+    For a logged-in user, labels they already use in their projects rank
+    higher among equally good matches.
+    """
+    limit = min(request.args.get('limit', 10, type=int), 100)
+    fuzzy = request.args.get('fuzzy', '').lower() in ('1', 'true', 'yes')
+    boosts = user_label_boosts(current_user.id) if current_user.is_authenticated else None
+    matches = services().suggestion_index.suggest(request.args.get('q', ''), limit, fuzzy, boosts)
+    return jsonify({'suggestions': matches})
+
+def user_label_boosts(user_id):
+    """Return {normalised label: uses} over the user's projects, recomputed every few minutes."""
+    suggestion_boosts = services().suggestion_boosts
+    ttl = current_app.config['SUGGESTION_BOOST_TTL']
+    key = (user_id, int(time.time() // ttl))
+    boosts = suggestion_boosts.get(key)
+    if boosts is None:
+        query = (db.select(ProjectNode.label, db.func.count())
+                 .join(Project, Project.id == ProjectNode.project_id)
+                 .where(Project.user_id == user_id, ProjectNode.label.is_not(None))
+                 .group_by(ProjectNode.label))
+        boosts = {}
+        for label, count in db.session.execute(query):
+            label = normalise(label)
+            boosts[label] = boosts.get(label, 0) + count
+        suggestion_boosts.put(key, boosts)
+    return boosts
+
+@bp.route('/export_graph', methods=['POST'])
+@login_required
+def export_graph():
+    # The graph may be posted as JSON or packed; the download is packed when
+    # the Accept header prefers it, JSON otherwise
+    try:
+        graph_data = decode_graph(request.get_data()) if request.mimetype == PACKED_GRAPH_MIMETYPE else request.json
+    except GraphFormatError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    if wants_packed_graph():
+        return send_file(BytesIO(encode_graph(graph_data, compress=packed_compression())),
+                         mimetype=PACKED_GRAPH_MIMETYPE, as_attachment=True, download_name='graph_export.dagb')
+    json_data = json.dumps(graph_data, indent=2)
+    return send_file(BytesIO(json_data.encode()), mimetype='application/json', as_attachment=True, download_name='graph_export.json')
+
+@bp.route('/import_graph', methods=['POST'])
+@login_required
+def import_graph():
+    # Either a file upload (JSON or packed, told apart by its first bytes) or
+    # a packed graph as the request body
+    if request.mimetype == PACKED_GRAPH_MIMETYPE:
+        data = request.get_data()
+    else:
+        if 'file' not in request.files:
+            return jsonify(success=False, error='No file part')
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify(success=False, error='No selected file')
+        data = file.read()
+    try:
+        graph_data = decode_graph(data) if is_packed(data) else json.loads(data)
+    except GraphFormatError as e:
+        return jsonify(success=False, error=f'Invalid graph file: {e}')
+    except ValueError:
+        return jsonify(success=False, error='Invalid JSON file')
+    cycles = find_cycles(graph_data.get('nodes', []), graph_data.get('edges', []))
+    if cycles:
+        return cycle_error(cycles)
+    if wants_packed_graph():
+        return Response(encode_graph(graph_data, compress=packed_compression()), mimetype=PACKED_GRAPH_MIMETYPE)
+    return jsonify(success=True, content=graph_data)
+
+def wants_packed_graph():
+    return request.accept_mimetypes.best_match(['application/json', PACKED_GRAPH_MIMETYPE]) == PACKED_GRAPH_MIMETYPE
+
+def packed_compression():
+    # Compressed unless `compress=0`: uncompressed data can be read in place
+    return request.args.get('compress', '1').lower() not in ('0', 'false', 'no')
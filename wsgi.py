@@ -0,0 +1,8 @@
+"""Production entry point: `gunicorn -c gunicorn.conf.py wsgi:app`.
+
+`python app.py` and `flask run` are for development only.
+"""
+from app import create_app
+from config import ProductionConfig
+
+app = create_app(ProductionConfig)